@@ -0,0 +1,84 @@
+"""Analytics over one profile with a million records: loading its set columns, then each computation.
+
+    python benchmarks/bench_analytics.py --records 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indexes import populate  # noqa: E402
+from workouttracer import analytics, columns, db, schema, store  # noqa: E402
+
+# Budget for computing the full report from loaded columns
+BUDGET = 1.0
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--exercises", type=int, default=30)
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    schema.migrate(path, target=1)
+    populate(path, 1, args.exercises, args.records, args.seed)
+    schema.migrate(path)
+    db.DATABASE = path
+
+    def cold_load(profile_id):
+        columns.invalidate(profile_id)
+        return analytics.load(profile_id)
+
+    def append_load(profile_id):
+        # One freshly logged session, then the read that picks it up
+        store.save_session(profile_id, "push", [("exercise0", 3, 5, 100, 90, 8, 120)])
+        t0 = time.perf_counter()
+        analytics.load(profile_id)
+        return time.perf_counter() - t0
+
+    t_cold, _ = best_of(args.repeat, cold_load, 1)
+    t_warm, data = best_of(args.repeat, analytics.load, 1)
+    t_append = min(append_load(1) for _ in range(args.repeat))
+    data = analytics.load(1)
+    est = analytics.estimated_1rm(data["weight"], data["reps"])
+    load = analytics.rpe_load(data["volume"], data["rpe"])
+    steps = {
+        "estimated_1rm": (analytics.estimated_1rm, data["weight"], data["reps"]),
+        "personal_records": (analytics.personal_records, data["day"], data["exercise"], est),
+        "rpe_load": (analytics.rpe_load, data["volume"], data["rpe"]),
+        "load_metrics": (analytics.load_metrics, data["day"], load),
+        "exercise_stats": (analytics.exercise_stats, data),
+        "report": (analytics.report, 1, None, "epley", data),
+    }
+
+    print(f"{args.records} records, {len(data['day'])} sets, {len(data['exercises'])} exercises")
+    print(f"load from SQLite: {t_cold * 1000:.1f} ms")
+    print(f"load, unchanged: {t_warm * 1000:.3f} ms")
+    print(f"load after logging a session: {t_append * 1000:.1f} ms")
+    for name, (fn, *fn_args) in steps.items():
+        elapsed, _ = best_of(args.repeat, fn, *fn_args)
+        print(f"{name}: {elapsed * 1000:.1f} ms")
+    verdict = "ok" if elapsed < BUDGET else "OVER BUDGET"
+    print(f"report from loaded columns: {elapsed * 1000:.1f} ms (budget {BUDGET * 1000:.0f} ms) {verdict}")
+    db.close_all()
+    if elapsed >= BUDGET:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Recent-range reads before and after archiving old records into yearly databases.
+
+Generates a multi-year history, times what ViewTrendsTab and the export dialog run for the last
+months (cold: set columns dropped first), archives everything but the history's last year, runs
+maintain() and times the same reads again. A full-history read shows what reaching into the
+archives costs.
+
+    python benchmarks/bench_archive.py --years 5 --profiles 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic  # noqa: E402
+from workouttracer import archive, columns, db, export, plotting  # noqa: E402
+
+
+def best(fn, repeat):
+    fastest, result = float("inf"), None
+    for _ in range(repeat):
+        columns.invalidate()
+        t0 = time.perf_counter()
+        result = fn()
+        fastest = min(fastest, time.perf_counter() - t0)
+    return fastest, result
+
+
+def reads(profile, recent, end, repeat):
+    first = (date.fromisoformat(end) - timedelta(days=365 * 10)).isoformat()
+    return {
+        "trends, recent": best(lambda: len(plotting.load_series(profile, recent, end)[0]), repeat),
+        "trends, all": best(lambda: len(plotting.load_series(profile, first, end)[0]), repeat),
+        "export count": best(lambda: export.count_rows(profile, recent, end), repeat),
+        "export rows": best(lambda: sum(map(len, export.iter_chunks(profile, recent, end))), repeat),
+        "export page": best(lambda: len(export.fetch_page(profile, recent, end, limit=100)), repeat),
+    }
+
+
+def used_mb(path):
+    conn = db.get_connection(path)
+    return conn.execute("SELECT (page_count - freelist_count) * page_size "
+                        "FROM pragma_page_count, pragma_freelist_count, pragma_page_size").fetchone()[0] / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=10)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--recent", type=int, default=90, help="days read by the recent-range queries")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = db.DATABASE = os.path.join(tempfile.mkdtemp(), "workouts.db")
+    t0 = time.perf_counter()
+    count = synthetic.generate(path, args.profiles, args.exercises, args.years, args.seed)
+    print(f"{count} records generated in {time.perf_counter() - t0:.2f} s")
+    end = (synthetic.END - timedelta(days=1)).date()
+    recent = (end - timedelta(days=args.recent)).isoformat()
+
+    before = reads(1, recent, end.isoformat(), args.repeat)
+    mb_before = used_mb(path)
+    # The history ends at synthetic.END, so the horizon is counted back from there, not from today
+    t0 = time.perf_counter()
+    moved = archive.run((date.today() - synthetic.END.date()).days + 365, path)
+    print(f"{sum(moved.values())} records archived into {len(moved)} years in {time.perf_counter() - t0:.2f} s")
+    t0 = time.perf_counter()
+    result = archive.maintain(path)
+    print(f"maintain: {result['freed']} pages freed, full VACUUM {result['vacuumed']}, "
+          f"{time.perf_counter() - t0:.2f} s")
+    after = reads(1, recent, end.isoformat(), args.repeat)
+
+    print(f"{'read':<16} {'before ms':>10} {'after ms':>10} {'speedup':>8} {'rows':>7}")
+    for name, (t_before, rows_before) in before.items():
+        t_after, rows_after = after[name]
+        rows = rows_before if rows_before == rows_after else f"{rows_before}/{rows_after}"
+        print(f"{name:<16} {t_before * 1000:>10.2f} {t_after * 1000:>10.2f} "
+              f"{t_before / max(t_after, 1e-9):>7.1f}x {rows:>7}")
+    print(f"main database in use: {mb_before:.1f} MB before, {used_mb(path):.1f} MB after "
+          f"({os.path.getsize(path) / 1e6:.1f} MB on disk)")
+    for year in moved:
+        archived = os.path.join(os.path.dirname(path), archive.archive_file(year, path))
+        print(f"  {os.path.basename(archived)}: {os.path.getsize(archived) / 1e6:.1f} MB")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Exercise autocomplete over a large catalog: the FTS5 index against LIKE prefix matching.
+
+Fills the catalog with generated exercises (each with aliases and muscle groups), then times the
+searches typed while entering a name, once through exercise_search and once through the LIKE
+fallback used on SQLite builds without FTS5.
+
+    python benchmarks/bench_catalog.py --exercises 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workouttracer import catalog, db, schema  # noqa: E402
+
+EQUIPMENT = ["Barbell", "Dumbbell", "Cable", "Machine", "Kettlebell", "Band", "Smith", "Landmine"]
+STYLES = ["Incline", "Decline", "Seated", "Standing", "Single-Arm", "Paused", "Tempo", "Deficit", "Wide", "Close"]
+MOVES = ["Press", "Row", "Curl", "Squat", "Lunge", "Raise", "Fly", "Pulldown", "Extension", "Deadlift", "Thrust"]
+MUSCLES = ["chest", "back", "shoulders", "biceps", "triceps", "quads", "hamstrings", "glutes", "calves", "core"]
+
+# What gets typed, one keystroke at a time
+TYPED = ["b", "be", "ben", "bench", "incl db", "seated cab", "sing arm row", "glutes", "zzz"]
+
+
+def populate(path, count, seed):
+    rng = random.Random(seed)
+    with db.transaction(path, ("exercises", "exercise_aliases", "exercise_search")) as c:
+        for i in range(count):
+            name = f"{rng.choice(STYLES)} {rng.choice(EQUIPMENT)} {rng.choice(MOVES)} {i}"
+            aliases = [f"{name.split()[1][:2]} {name.split()[2]} {i}", f"Variation {i}"]
+            catalog.add(c, name, aliases, rng.sample(MUSCLES, 2))
+
+
+def best(fn, repeat):
+    fastest = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = fn()
+        fastest = min(fastest, time.perf_counter() - t0)
+    return fastest, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--exercises", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "catalog.db")
+    schema.init_db(path)
+    if not catalog.has_search(path):
+        print("this SQLite has no FTS5; only the LIKE fallback can run")
+        return
+    t0 = time.perf_counter()
+    populate(path, args.exercises, args.seed)
+    print(f"{args.exercises} exercises added in {time.perf_counter() - t0:.2f} s")
+
+    def like(text):
+        # What search() runs without the index
+        prefix = text.strip() + "%"
+        return db.query('''SELECT id, name FROM exercises WHERE name LIKE ?
+                           OR id IN (SELECT exercise_id FROM exercise_aliases WHERE alias LIKE ?)
+                           ORDER BY name LIMIT ?''', (prefix, prefix, args.limit), path)
+
+    print(f"{'typed':<14} {'FTS5 ms':>9} {'LIKE ms':>9} {'speedup':>8} {'hits':>9}")
+    for text in TYPED:
+        t_fts, fts_rows = best(lambda: catalog.search(text, args.limit, path), args.repeat)
+        t_like, like_rows = best(lambda: like(text), args.repeat)
+        print(f"{text:<14} {t_fts * 1000:>9.3f} {t_like * 1000:>9.3f} {t_like / max(t_fts, 1e-9):>7.1f}x "
+              f"{fts_rows:>4}/{like_rows:<4}")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Date range filters and time bucketing on TEXT timestamps (schema v5) against epoch seconds (v6).
+
+Builds one synthetic history, keeps a copy at v5 and migrates the other to v6, then times the
+same questions asked the way each schema allows.
+
+    python benchmarks/bench_dates.py --records 200000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indexes import populate  # noqa: E402
+from workouttracer import db, schema  # noqa: E402
+
+_JOIN = "FROM records r JOIN workouts w ON r.workout_id = w.id WHERE w.profile_id = ?"
+
+# name -> (TEXT query, epoch query); params are (profile, start, end) as strings / epoch seconds
+QUERIES = {
+    "range volume": (
+        f"SELECT SUM(r.volume) {_JOIN} AND r.date BETWEEN ? AND ?",
+        f"SELECT SUM(r.volume) {_JOIN} AND r.date BETWEEN ? AND ?",
+    ),
+    "daily buckets": (
+        f"SELECT date(r.date) AS d, SUM(r.volume) {_JOIN} AND r.date BETWEEN ? AND ? GROUP BY d",
+        f"SELECT r.day, SUM(r.volume) {_JOIN} AND r.date BETWEEN ? AND ? GROUP BY r.day",
+    ),
+    "weekly buckets": (
+        f"SELECT date(r.date, '-6 days', 'weekday 1') AS wk, SUM(r.volume) {_JOIN} AND r.date BETWEEN ? AND ? "
+        "GROUP BY wk",
+        # 1970-01-01 was a Thursday, so +3 makes weeks start on Monday
+        f"SELECT (r.day + 3) / 7 AS wk, SUM(r.volume) {_JOIN} AND r.date BETWEEN ? AND ? GROUP BY wk",
+    ),
+    "sessions": (
+        f"SELECT r.date, COUNT(*) {_JOIN} AND r.date BETWEEN ? AND ? GROUP BY r.date",
+        f"SELECT r.session_id, COUNT(*) {_JOIN} AND r.date BETWEEN ? AND ? GROUP BY r.session_id",
+    ),
+    "set columns": (
+        "SELECT CAST(strftime('%s', r.date) AS INTEGER), s.reps, s.weight "
+        "FROM records r JOIN workouts w ON r.workout_id = w.id JOIN record_sets s ON s.record_id = r.id "
+        "WHERE w.profile_id = ? AND r.date BETWEEN ? AND ?",
+        "SELECT r.date, s.reps, s.weight "
+        "FROM records r JOIN workouts w ON r.workout_id = w.id JOIN record_sets s ON s.record_id = r.id "
+        "WHERE w.profile_id = ? AND r.date BETWEEN ? AND ?",
+    ),
+}
+
+
+def best(conn, sql, params, repeat):
+    rows, fastest = None, float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = conn.execute(sql, params).fetchall()
+        fastest = min(fastest, time.perf_counter() - t0)
+    return fastest, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=20)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--from", dest="start", default="2019-01-01")
+    parser.add_argument("--to", dest="end", default="2024-12-31")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    text_db, epoch_db = os.path.join(tmp, "text.db"), os.path.join(tmp, "epoch.db")
+    schema.migrate(text_db, target=1)
+    populate(text_db, args.profiles, args.exercises, args.records, args.seed)
+    schema.migrate(text_db, target=5)
+    db.close_all()
+    shutil.copy(text_db, epoch_db)
+    t0 = time.perf_counter()
+    schema.migrate(epoch_db)
+    print(f"migrating {args.records} records to epoch dates took {time.perf_counter() - t0:.2f} s")
+
+    text_conn, epoch_conn = db.get_connection(text_db), db.get_connection(epoch_db)
+    text_params = (1, args.start + " 00:00:00", args.end + " 23:59:59")
+    epoch_params = (1,) + epoch_conn.execute("SELECT CAST(strftime('%s', ?) AS INTEGER), "
+                                             "CAST(strftime('%s', ?, '+1 day') AS INTEGER) - 1",
+                                             text_params[1:]).fetchone()
+    print(f"{'query':<16} {'TEXT ms':>9} {'epoch ms':>9} {'speedup':>8} {'rows':>7}")
+    for name, (text_sql, epoch_sql) in QUERIES.items():
+        t_text, rows_text = best(text_conn, text_sql, text_params, args.repeat)
+        t_epoch, rows_epoch = best(epoch_conn, epoch_sql, epoch_params, args.repeat)
+        rows = rows_text if rows_text == rows_epoch else f"{rows_text}/{rows_epoch}"
+        print(f"{name:<16} {t_text * 1000:>9.2f} {t_epoch * 1000:>9.2f} {t_text / max(t_epoch, 1e-9):>7.1f}x "
+              f"{rows:>7}")
+    for label, conn in (("TEXT", text_conn), ("epoch", epoch_conn)):
+        # Pages in use; the migration's table rebuild leaves the old pages free until a VACUUM
+        used = conn.execute("SELECT (page_count - freelist_count) * page_size "
+                            "FROM pragma_page_count, pragma_freelist_count, pragma_page_size").fetchone()[0]
+        print(f"{label} database: {used / 1e6:.1f} MB")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Throughput of the bulk import path (store.import_records) on a synthetic CSV log.
+
+    python benchmarks/bench_import.py --records 200000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workouttracer import db, schema, store  # noqa: E402
+
+FIELDS = ["profile", "day_type", "exercise", "sets", "date", "reps", "weight", "rest", "rpe", "heart_rate"]
+
+
+def write_log(path, profiles, exercises, records, seed):
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for i in range(records):
+            e = rng.randrange(exercises)
+            date = start + timedelta(minutes=i)
+            writer.writerow([f"athlete{rng.randrange(profiles)}", ("push", "pull", "legs")[e % 3], f"exercise{e}",
+                             3, date.strftime(store.DATE_FORMAT), rng.randint(3, 12), rng.randint(20, 150), 90,
+                             rng.randint(6, 10), rng.randint(90, 170)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=10)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    log = os.path.join(tmp, "log.csv")
+    write_log(log, args.profiles, args.exercises, args.records, args.seed)
+    db.DATABASE = os.path.join(tmp, "bench.db")
+    schema.init_db()
+
+    t0 = time.perf_counter()
+    count = store.import_records(log)
+    elapsed = time.perf_counter() - t0
+    print(f"imported {count} records in {elapsed:.2f} s ({count / elapsed:,.0f} records/s)")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Query plans and timings for the hot queries before and after the index migration.
+
+    python benchmarks/bench_indexes.py --records 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workouttracer import db, schema  # noqa: E402
+
+QUERIES = {
+    "load_table": ("SELECT id, day_type, exercise, sets FROM workouts WHERE profile_id = ?", (1,)),
+    "load_exercises": ("SELECT id, exercise, sets FROM workouts WHERE profile_id=? AND day_type=?", (1, "push")),
+    "plot_data": ("""
+        SELECT w.day_type, r.date, SUM(r.volume) as total_volume
+        FROM records r
+        JOIN workouts w ON r.workout_id = w.id
+        WHERE w.profile_id=?
+          AND r.date BETWEEN ? AND ?
+          AND w.day_type=?
+        GROUP BY w.day_type, r.date ORDER BY r.date
+    """, None),
+    "show_summary": ("""
+        SELECT r.date, r.volume
+        FROM records r
+        JOIN workouts w ON r.workout_id = w.id
+        WHERE w.profile_id=?
+    """, (1,)),
+    "export": ("""
+        SELECT p.name as profile, w.day_type, w.exercise, w.sets, r.date, r.reps, r.weight, r.rest, r.rpe,
+               r.heart_rate, r.volume
+        FROM records r
+        JOIN workouts w ON r.workout_id = w.id
+        JOIN profiles p ON w.profile_id = p.id
+        WHERE p.id=?
+        ORDER BY r.date DESC
+    """, (1,)),
+}
+
+
+def populate(path, profiles, exercises, records, seed):
+    rng = random.Random(seed)
+    with db.transaction(path) as c:
+        c.executemany("INSERT INTO profiles (name) VALUES (?)", [(f"athlete{i}",) for i in range(profiles)])
+        workouts = []
+        for pid in range(1, profiles + 1):
+            for e in range(exercises):
+                workouts.append((pid, ("push", "pull", "legs")[e % 3], f"exercise{e}", 3))
+        c.executemany("INSERT INTO workouts (profile_id, day_type, exercise, sets) VALUES (?,?,?,?)", workouts)
+        start = datetime(2015, 1, 1)
+        span = int((datetime(2025, 1, 1) - start).total_seconds())
+        batch = []
+        for _ in range(records):
+            wid = rng.randint(1, len(workouts))
+            date = (start + timedelta(seconds=rng.randrange(span))).strftime("%Y-%m-%d %H:%M:%S")
+            reps, weight = rng.randint(3, 12), rng.randint(20, 150)
+            batch.append((wid, date, reps, weight, 90, 8, 120, 3 * reps * weight))
+            if len(batch) >= 50000:
+                c.executemany("INSERT INTO records (workout_id, date, reps, weight, rest, rpe, heart_rate, volume) "
+                              "VALUES (?,?,?,?,?,?,?,?)", batch)
+                batch.clear()
+        c.executemany("INSERT INTO records (workout_id, date, reps, weight, rest, rpe, heart_rate, volume) "
+                      "VALUES (?,?,?,?,?,?,?,?)", batch)
+
+
+def run_queries(path, repeat):
+    conn = db.get_connection(path)
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        if params is None:
+            params = (1, "2023-01-01 00:00:00", "2023-01-31 23:59:59", "push")
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            best = min(best, time.perf_counter() - t0)
+        results[name] = (best, plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=20)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    schema.migrate(path, target=1)
+    populate(path, args.profiles, args.exercises, args.records, args.seed)
+
+    before = run_queries(path, args.repeat)
+    # The queries compare TEXT dates, which v6 turns into epoch seconds
+    schema.migrate(path, target=2)
+    after = run_queries(path, args.repeat)
+
+    for name in QUERIES:
+        (t_before, plan_before), (t_after, plan_after) = before[name], after[name]
+        print(f"{name}: {t_before * 1000:.2f} ms -> {t_after * 1000:.2f} ms "
+              f"({t_before / max(t_after, 1e-9):.1f}x)")
+        print("  before: " + "; ".join(plan_before))
+        print("  after:  " + "; ".join(plan_after))
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Redraw latency of the trend plot: clear-and-replot versus the cached, downsampled TrendPlot.
+
+    python benchmarks/bench_render.py --points 1000 10000 100000 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import numpy as np  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workouttracer import plotting  # noqa: E402
+
+
+def make_canvas():
+    fig = Figure(figsize=(8, 6), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    return canvas, fig.add_subplot(111)
+
+
+def series(n, seed):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype=float) + 16000.0  # days since the matplotlib epoch
+    return x, np.abs(np.cumsum(rng.normal(0, 50, n))) + 1000
+
+
+def replot(canvas, ax, x, y):
+    # What ViewTrendsTab.plot_data used to do on every "Apply Filter"
+    ax.clear()
+    ax.plot(x, y, marker='o')
+    ax.set_title("Volume Over Time")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Volume (kg)")
+    ax.grid(True)
+    canvas.draw()
+
+
+def timed(fn, repeat):
+    samples = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.points:
+        data = [series(n, seed) for seed in range(2)]
+
+        canvas, ax = make_canvas()
+        baseline = timed(lambda i: replot(canvas, ax, *data[i % 2]), args.repeat)
+
+        canvas, ax = make_canvas()
+        plot = plotting.TrendPlot(canvas, ax)
+        plot.show(*data[0], "Volume Over Time")
+        # Same series and limits (e.g. a cached filter re-applied): blit only the line
+        cached = timed(lambda i: plot.show(*data[0], "Volume Over Time"), args.repeat)
+        # New data with new limits: in-place update plus one full draw
+        changed = timed(lambda i: plot.show(*data[i % 2], "Volume Over Time"), args.repeat)
+
+        print(f"{n:>8} points: replot {baseline:8.1f} ms | TrendPlot same range {cached:7.1f} ms, "
+              f"new data {changed:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
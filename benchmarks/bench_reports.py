@@ -0,0 +1,64 @@
+"""Monthly reports for many profiles: serial against the process pool, and a check that both write the same bytes.
+
+    python benchmarks/bench_reports.py --profiles 16 --workers 4
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indexes import populate  # noqa: E402
+from workouttracer import db, reports, schema  # noqa: E402
+
+
+def digests(files):
+    out = {}
+    for fname in files:
+        with open(fname, "rb") as f:
+            out[os.path.basename(fname)] = hashlib.sha256(f.read()).hexdigest()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=16)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--records", type=int, default=400000, help="across all profiles")
+    parser.add_argument("--month", default="2024-06")
+    parser.add_argument("--format", nargs="+", choices=reports.FORMATS, default=list(reports.FORMATS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "bench.db")
+    schema.migrate(path, target=1)
+    populate(path, args.profiles, args.exercises, args.records, args.seed)
+    schema.migrate(path)
+    db.DATABASE = path
+    db.close_all()
+
+    timings, hashes = {}, {}
+    for label, workers in (("serial", 1), (f"{args.workers} workers", args.workers)):
+        out_dir = os.path.join(tmp, label.replace(" ", "_"))
+        t0 = time.perf_counter()
+        files = reports.generate(args.month, out_dir, args.format, workers)
+        timings[label] = time.perf_counter() - t0
+        hashes[label] = digests(files)
+        print(f"{label}: {len(files)} files in {timings[label]:.2f} s")
+        db.close_all()
+
+    serial, parallel = timings.values()
+    print(f"speedup: {serial / parallel:.2f}x on {os.cpu_count()} CPUs")
+    same = len({tuple(sorted(h.items())) for h in hashes.values()}) == 1
+    print("outputs identical" if same else "OUTPUTS DIFFER")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Load test for the HTTP API: concurrent keep-alive clients logging sessions and reading summaries.
+
+Starts `python -m workouttracer serve` on a scratch database and reports throughput and latency
+percentiles per request kind.
+
+    python benchmarks/bench_server.py --clients 32 --requests 200
+    python benchmarks/bench_server.py --clients 32 --requests 200 --batch 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        payload = await self.reader.readexactly(length)
+        if status != 200:
+            raise RuntimeError(f"{method} {path}: {status} {payload[:200]!r}")
+        return json.loads(payload)
+
+    def close(self):
+        self.writer.close()
+
+
+def session(rng):
+    return {"day_type": "push", "rows": [[f"exercise{e}", 1, rng.randint(3, 12), rng.randint(20, 150), 90,
+                                          rng.randint(6, 10), 130] for e in range(3) for _ in range(3)]}
+
+
+def pick(rng, profiles):
+    pid = rng.choice(profiles)
+    roll = rng.random()
+    if roll < 0.5:
+        return "log", "POST", f"/profiles/{pid}/sessions", session(rng)
+    if roll < 0.8:
+        return "summary", "GET", f"/profiles/{pid}/summary?period=weekly", None
+    return "workouts", "GET", f"/profiles/{pid}/workouts", None
+
+
+async def run_client(host, port, profiles, requests, batch, seed, latencies):
+    rng = random.Random(seed)
+    client = Client(host, port)
+    await client.connect()
+    try:
+        for _ in range(0, requests, batch):
+            picks = [pick(rng, profiles) for _ in range(batch)]
+            t0 = time.perf_counter()
+            if batch == 1:
+                kind, method, path, body = picks[0]
+                await client.request(method, path, body)
+            else:
+                kind = "batch"
+                results = await client.request("POST", "/batch", [{"method": m, "path": p, "body": b}
+                                                                  for _, m, p, b in picks])
+                bad = [r for r in results if r["status"] != 200]
+                if bad:
+                    raise RuntimeError(f"batch item failed: {bad[0]}")
+            latencies.setdefault(kind, []).append(time.perf_counter() - t0)
+    finally:
+        client.close()
+
+
+async def setup(host, port, profiles):
+    client = Client(host, port)
+    await client.connect()
+    ids = []
+    for i in range(profiles):
+        pid = (await client.request("POST", "/profiles", {"name": f"athlete{i}"}))["id"]
+        for e in range(3):
+            await client.request("POST", f"/profiles/{pid}/workouts",
+                                 {"day_type": "push", "exercise": f"exercise{e}", "sets": 3})
+        ids.append(pid)
+    client.close()
+    return ids
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def load(host, port, args):
+    profiles = await setup(host, port, args.profiles)
+    latencies = {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, profiles, args.requests, args.batch, args.seed + i, latencies)
+                           for i in range(args.clients)))
+    elapsed = time.perf_counter() - t0
+    total = args.clients * (args.requests // args.batch) * args.batch
+    print(f"{args.clients} clients x {args.requests} requests (batch {args.batch}), {args.readers} readers: "
+          f"{total / elapsed:,.0f} req/s over {elapsed:.2f} s")
+    for kind, samples in sorted(latencies.items()):
+        print(f"  {kind:>9}: n={len(samples):<6} p50 {statistics.median(samples) * 1000:7.2f} ms   "
+              f"p99 {percentile(samples, 0.99) * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="per client")
+    parser.add_argument("--batch", type=int, default=1, help="requests per POST /batch (1 = no batching)")
+    parser.add_argument("--profiles", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    proc = subprocess.Popen([sys.executable, "-m", "workouttracer", "--db", path, "serve", "--port", "0",
+                             "--readers", str(args.readers)], cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    try:
+        # "Serving <db> on http://host:port"
+        address = proc.stderr.readline().rsplit("//", 1)[-1].strip()
+        host, port = address.rsplit(":", 1)
+        asyncio.run(load(host, int(port), args))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
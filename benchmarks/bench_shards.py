@@ -0,0 +1,106 @@
+"""One athlete's sessions logged during another's bulk import, in a single database and in shards.
+
+Generates a multi-year history and a copy of it split into per-profile shards. In each, one thread
+imports a log for athlete0 (one transaction) while the main thread logs sessions for athlete1 and
+times them: in the single file they wait for the import's lock, in shards they don't. Also times
+the all-athlete totals (one query per database, run in parallel when sharded), split() and merge().
+
+    python benchmarks/bench_shards.py --profiles 8 --records 300000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_import  # noqa: E402
+import synthetic  # noqa: E402
+from workouttracer import db, shards, store  # noqa: E402
+
+
+def best(fn, repeat):
+    fastest, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        fastest = min(fastest, time.perf_counter() - t0)
+    return fastest, result
+
+
+def contention(log, profile):
+    # Sessions for `profile` logged back to back while another thread imports `log`
+    done = threading.Event()
+
+    def load():
+        try:
+            store.import_records(log)
+        finally:
+            done.set()
+
+    day = store.day_types(profile)[0][0]
+    rows = [[exercise, 1, 5, 100, 90, 8, 140] for exercise, _ in store.day_exercises(profile, day)]
+    thread = threading.Thread(target=load)
+    thread.start()
+    latencies, failed = [], 0
+    while not done.is_set():
+        t0 = time.perf_counter()
+        try:
+            store.save_session(profile, day, rows)
+        except sqlite3.OperationalError:
+            failed += 1  # still locked after busy_timeout
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(0.01)
+    thread.join()
+    return sorted(latencies), failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=8)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--records", type=int, default=300000, help="rows in athlete0's import log")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    single, sharded = os.path.join(tmp, "single.db"), os.path.join(tmp, "sharded.db")
+    count = synthetic.generate(single, args.profiles, args.exercises, args.years, args.seed)
+    db.get_connection(single).execute("VACUUM INTO ?", (sharded,))
+    log = os.path.join(tmp, "athlete0.csv")
+    bench_import.write_log(log, 1, args.exercises, args.records, args.seed)
+    print(f"{count} records generated, {args.records} rows in the import log")
+
+    db.DATABASE = sharded
+    t0 = time.perf_counter()
+    shards.split()
+    print(f"split into {args.profiles} shards in {time.perf_counter() - t0:.2f} s")
+
+    results = {}
+    for name, path in (("single file", single), ("shards", sharded)):
+        db.DATABASE = path
+        t_totals, totals = best(shards.totals, args.repeat)
+        latencies, failed = contention(log, store.find_profile("athlete1"))
+        results[name] = (t_totals, totals, latencies, failed)
+    assert results["single file"][1] == results["shards"][1]
+
+    print(f"{'':<12} {'totals ms':>10} {'sessions':>9} {'median ms':>10} {'p95 ms':>9} {'max ms':>9} {'failed':>7}")
+    for name, (t_totals, _, latencies, failed) in results.items():
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<12} {t_totals * 1000:>10.2f} {len(latencies):>9} {latencies[len(latencies) // 2] * 1000:>10.2f} "
+              f"{p95 * 1000:>9.2f} {latencies[-1] * 1000:>9.2f} {failed:>7}")
+
+    db.DATABASE = sharded
+    t0 = time.perf_counter()
+    merged = shards.merge()
+    print(f"merged {sum(merged.values())} records back in {time.perf_counter() - t0:.2f} s")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cold loads of a profile's sets: pandas over SQL, the set columns query, and Arrow snapshots.
+
+Generates a multi-year history, then times loading one profile's sets the way the app did before
+the set columns (pd.read_sql_query), through columns from SQLite, and through columns from a
+memory-mapped snapshot. Also times writing the snapshot, and the delta written after one more
+session.
+
+    python benchmarks/bench_snapshot.py --years 10 --profiles 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic  # noqa: E402
+from workouttracer import columns, db, snapshot, store  # noqa: E402
+
+
+def best(fn, repeat):
+    fastest, result = float("inf"), None
+    for _ in range(repeat):
+        columns.invalidate()
+        t0 = time.perf_counter()
+        result = fn()
+        fastest = min(fastest, time.perf_counter() - t0)
+    return fastest, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=4)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = db.DATABASE = os.path.join(tempfile.mkdtemp(), "workouts.db")
+    count = synthetic.generate(path, args.profiles, args.exercises, args.years, args.seed)
+    print(f"{count} records generated")
+
+    t_frame, frame = best(lambda: db.read_frame(columns.SETS_QUERY, (1, 0)), args.repeat)
+    t_sql, sql = best(lambda: columns.for_profile(1).arrays(), args.repeat)
+    t0 = time.perf_counter()
+    written = columns.save_snapshot(1)
+    t_save = time.perf_counter() - t0
+    snapshot.enable()
+    t_snap, snap = best(lambda: columns.for_profile(1).arrays(), args.repeat)
+    assert all((sql[name] == snap[name]).all() or name in ("rpe", "heart_rate") for name in sql)
+
+    store.save_session(1, "push", [["exercise0", 4, 5, 100, 90, 8, 140]])
+    t0 = time.perf_counter()
+    delta = columns.save_snapshot(1)
+    t_delta = time.perf_counter() - t0
+    t_pieces, _ = best(lambda: columns.for_profile(1).arrays(), args.repeat)
+
+    size = sum(os.path.getsize(os.path.join(snapshot.directory(path), f))
+               for f in os.listdir(snapshot.directory(path)))
+    print(f"{len(frame)} sets for profile 1, snapshot {size / 1e6:.1f} MB")
+    print(f"{'cold load':<28} {'ms':>9}")
+    for name, seconds in (("pandas read_sql_query", t_frame), ("columns from SQLite", t_sql),
+                          ("columns from snapshot", t_snap), ("snapshot base + delta", t_pieces)):
+        print(f"{name:<28} {seconds * 1000:>9.2f}")
+    print(f"snapshot written in {t_save * 1000:.1f} ms ({written} sets), "
+          f"delta in {t_delta * 1000:.1f} ms ({delta} sets)")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Cold-start time of the CLI versus loading the full GUI stack, in fresh interpreters.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    # What every script paid before the split: pandas, matplotlib and PyQt5 at import
+    "gui import": ["-c", "import workouttracer.gui"],
+    "cli --help": ["-m", "workouttracer", "--help"],
+    "cli profiles": ["-m", "workouttracer", "--db", "{db}", "profiles"],
+    "cli summary": ["-m", "workouttracer", "--db", "{db}", "summary", "athlete"],
+}
+
+
+def time_case(argv, runs, env):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable] + argv, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    subprocess.run([sys.executable, "-m", "workouttracer", "--db", path, "add-exercise", "athlete", "push", "bench"],
+                   cwd=ROOT, env=env, check=True)
+
+    baseline = None
+    for name, argv in CASES.items():
+        median = time_case([a.format(db=path) for a in argv], args.runs, env)
+        baseline = baseline or median
+        print(f"{name:>14}: {median * 1000:7.1f} ms  ({baseline / median:.1f}x vs gui import)")
+
+
+if __name__ == "__main__":
+    main()
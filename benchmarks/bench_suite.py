@@ -0,0 +1,262 @@
+"""Benchmark suite over the app's hot paths, on seeded synthetic data, with JSON results and regression checks.
+
+Times schema setup, logging a session, the trend and summary reads, xlsx/pdf export and table
+population in an offscreen Qt view. Save a run, then compare later runs against it:
+
+    python benchmarks/bench_suite.py --out baseline.json
+    python benchmarks/bench_suite.py --out new.json --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic  # noqa: E402
+from workouttracer import analytics, columns, db, export, plotting, querycache, schema, store  # noqa: E402
+
+# A case regresses when its best run is this much slower than the baseline's (0.25 = 25%)...
+THRESHOLD = 0.25
+# ...and at least this many seconds slower, so sub-millisecond cases don't flag on noise
+MIN_DELTA = 0.002
+# Cases noisier than the rest, e.g. because they fsync
+CASE_THRESHOLDS = {"init_db": 0.5, "save_session": 0.5}
+
+CASES = {}
+
+
+def session(exercises):
+    """Rows of a push session over every push exercise synthetic.generate() gives a profile."""
+    return [(f"exercise{e}", 4, 8, 60 + e, 90, 8, 140) for e in range(0, exercises, len(synthetic.DAY_TYPES))]
+
+
+def case(fn):
+    """Register a case. It is called once with the context and returns the function to time."""
+    CASES[fn.__name__] = fn
+    return fn
+
+
+@case
+def init_db(ctx):
+    count = iter(range(1 << 30))
+
+    def run():
+        schema.init_db(os.path.join(ctx["tmp"], f"init{next(count)}.db"))
+    return run
+
+
+@case
+def save_session(ctx):
+    return lambda: store.save_session(1, "push", ctx["session"])
+
+
+def _trend(ctx):
+    # The View Trends tab's default range: the last year, one day type
+    return plotting.load_series(1, str(ctx["end"] - timedelta(days=365)), str(ctx["end"]), "push")
+
+
+@case
+def plot_data_cold(ctx):
+    def run():
+        columns.invalidate()
+        _trend(ctx)
+    return run
+
+
+@case
+def plot_data_warm(ctx):
+    _trend(ctx)
+    return lambda: _trend(ctx)
+
+
+def _summary():
+    for period in ("weekly", "monthly"):
+        analytics.suggestion(analytics.period_summary(1, period))
+
+
+@case
+def show_summary_cold(ctx):
+    def run():
+        columns.invalidate()
+        _summary()
+    return run
+
+
+@case
+def show_summary_warm(ctx):
+    _summary()
+    return _summary
+
+
+def _export(ctx, fmt):
+    start = str(ctx["end"] - timedelta(days=ctx["export_days"]))
+    return lambda: export.export(1, os.path.join(ctx["tmp"], f"export.{fmt}"), fmt, start=start)
+
+
+@case
+def export_xlsx(ctx):
+    return _export(ctx, "xlsx")
+
+
+@case
+def export_pdf(ctx):
+    return _export(ctx, "pdf")
+
+
+def _qt_view(model):
+    from workouttracer.gui import make_table_view
+
+    view = make_table_view(model)
+    view.resize(800, 600)
+    return view
+
+
+@case
+def table_manage_days(ctx):
+    from workouttracer.models import ColumnTableModel
+
+    model = ColumnTableModel(["id", "day_type", "exercise", "sets"], ["ID", "Day", "Exercise", "Sets"])
+    view = _qt_view(model)
+
+    def run():
+        querycache.clear()
+        model.set_rows(querycache.query(store.WORKOUTS_QUERY, (1,)))
+        view.grab()  # forces a paint
+    return run
+
+
+@case
+def table_history(ctx):
+    from workouttracer.models import HistoryModel
+
+    model = HistoryModel()
+    view = _qt_view(model)
+
+    def run():
+        # Open the History tab and scroll through every row
+        model.load(1)
+        while model.canFetchMore():
+            model.fetchMore()
+        view.scrollToBottom()
+        view.grab()
+    return run
+
+
+QT_CASES = ("table_manage_days", "table_history")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_cases(names, ctx, repeat):
+    results = {}
+    for name in names:
+        fn = CASES[name](ctx)
+        runs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - t0)
+        results[name] = {"median": statistics.median(runs), "min": min(runs), "runs": runs}
+        print(f"{name:<20} median {results[name]['median'] * 1000:9.2f} ms   min {min(runs) * 1000:9.2f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline. Returns the names of the cases that regressed."""
+    regressed = []
+    print(f"\n{'case (best run)':<20} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        # The best run: scheduling noise only ever adds time, so it moves least between runs
+        now, before = result["min"], base["min"]
+        change = now / before - 1 if before else 0.0
+        limit = threshold if threshold is not None else CASE_THRESHOLDS.get(name, THRESHOLD)
+        bad = change > limit and now - before > MIN_DELTA
+        if bad:
+            regressed.append(name)
+        print(f"{name:<20} {before * 1000:>12.2f} {now * 1000:>10.2f} {change:>+8.1%}{'  REGRESSION' if bad else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=10)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--export-days", type=int, default=365, help="days of history exported")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="run just these cases")
+    parser.add_argument("--out", help="write the results here as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON from an earlier run; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float,
+                        help=f"allowed slowdown for every case (default {THRESHOLD}, more for noisy cases)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "bench.db")
+    t0 = time.perf_counter()
+    records = synthetic.generate(path, args.profiles, args.exercises, args.years, args.seed)
+    print(f"{records} records for {args.profiles} profiles generated in {time.perf_counter() - t0:.1f} s")
+    db.DATABASE = path
+
+    ctx = {"tmp": tmp, "end": synthetic.END.date(), "export_days": args.export_days,
+           "session": session(args.exercises)}
+    names = args.only or list(CASES)
+    try:
+        from PyQt5.QtWidgets import QApplication
+        ctx["app"] = QApplication.instance() or QApplication([])
+    except ImportError:
+        print("PyQt5 not installed; skipping the table cases")
+        names = [name for name in names if name not in QT_CASES]
+
+    results = run_cases(names, ctx, args.repeat)
+    db.close_all()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "generator": {"profiles": args.profiles, "exercises": args.exercises, "years": args.years,
+                          "seed": args.seed, "records": records},
+            "export_days": args.export_days,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"]["generator"] != report["meta"]["generator"]:
+            print("warning: the baseline was run on different generator settings")
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} regression(s): {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Seeded synthetic training history: N profiles x M exercises x years of daily sessions.
+
+Each profile trains most days on a push/pull/legs rotation. Every exercise of the day's type gets a
+record of 3-5 sets, with working weight climbing slowly and reps falling as it rises. The same
+arguments always produce the same database.
+
+    python benchmarks/synthetic.py out.db --profiles 10 --exercises 12 --years 5
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workouttracer import db, schema, store  # noqa: E402
+
+DAY_TYPES = ("push", "pull", "legs")
+# Histories end here rather than today, so reruns on other days give the same data
+END = datetime(2025, 1, 1)
+# Chance that a profile trains on any given day
+TRAIN_PROBABILITY = 0.8
+
+
+def generate(path, profiles=10, exercises=12, years=5, seed=0):
+    """Create (or extend) the database at `path`. Returns the number of records written."""
+    rng = random.Random(seed)
+    schema.migrate(path)
+    count = 0
+    start = END - timedelta(days=int(years * 365))
+    with db.transaction(path) as c:
+        last_id = c.execute("SELECT COALESCE(MAX(id), 0) FROM records").fetchone()[0]
+        session_id = store.new_session(c)
+        for p in range(profiles):
+            pid = c.execute("INSERT INTO profiles (name) VALUES (?)", (f"athlete{p}",)).lastrowid
+            by_day = {day_type: [] for day_type in DAY_TYPES}
+            for e in range(exercises):
+                day_type = DAY_TYPES[e % len(DAY_TYPES)]
+                wid = store.ensure_workout(c, pid, day_type, f"exercise{e}", 3)
+                # Starting weight and weekly gain in kg
+                by_day[day_type].append((wid, rng.uniform(20, 100), rng.uniform(0.05, 0.5)))
+            batch = []
+            session = 0
+            for d in range((END - start).days):
+                if rng.random() > TRAIN_PROBABILITY:
+                    continue
+                day = store.timestamp(start + timedelta(days=d, hours=rng.randint(6, 20), minutes=rng.randint(0, 59)))
+                for wid, base, gain in by_day[DAY_TYPES[session % len(DAY_TYPES)]]:
+                    weight = round(base + gain * d / 7 + rng.uniform(-5, 5), 1)
+                    reps = max(1, int(12 - weight / 25 + rng.randint(-2, 2)))
+                    sets = rng.randint(3, 5)
+                    batch.append((wid, day, reps, weight, rng.choice((60, 90, 120)), rng.randint(6, 10),
+                                  rng.randint(110, 170), reps * weight * sets, sets, reps * sets, session_id))
+                session += 1
+                session_id += 1
+            c.executemany(store.INSERT_RECORD, batch)
+            count += len(batch)
+        store.expand_sets(c, last_id)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--profiles", type=int, default=10)
+    parser.add_argument("--exercises", type=int, default=12)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    count = generate(args.path, args.profiles, args.exercises, args.years, args.seed)
+    db.close_all()
+    print(f"{count} records written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
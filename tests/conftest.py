@@ -0,0 +1,15 @@
+import pytest
+
+from workouttracer import columns, db, querycache, schema
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh, fully migrated database, made the default for the test."""
+    path = str(tmp_path / "workouts.db")
+    monkeypatch.setattr(db, "DATABASE", path)
+    schema.init_db(path)
+    yield path
+    db.close_all()
+    columns.invalidate()
+    querycache.clear()
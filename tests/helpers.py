@@ -0,0 +1,28 @@
+from workouttracer import db, shards, store
+
+# Exercise rows as save_session takes them: exercise, sets, reps, weight, rest, rpe, heart rate
+PUSH = [("Bench Press", 3, 5, 100, 90, 8, 140), ("Overhead Press", 3, 8, 50, 60, 7, 130)]
+
+
+def profile(name, day_type="push", exercises=("Bench Press", "Overhead Press")):
+    """Create a profile with a day of exercises, returning its id."""
+    store.create_profile(name)
+    pid = store.find_profile(name)
+    for exercise in exercises:
+        store.add_workout(pid, day_type, exercise, 3)
+    return pid
+
+
+def log(pid, when, rows=PUSH, day_type="push"):
+    return store.save_session(pid, day_type, rows, when)
+
+
+def records(pid=None, path=None):
+    """The logged records as comparable tuples, profile names and exercise names instead of ids."""
+    sql = '''SELECT p.name, w.day_type, e.name, r.date, r.reps, r.weight, r.volume, r.set_count, r.total_reps,
+                    (SELECT group_concat(s.reps || 'x' || s.weight) FROM record_sets s WHERE s.record_id = r.id)
+             FROM records r JOIN workouts w ON w.id = r.workout_id JOIN profiles p ON p.id = w.profile_id
+             JOIN exercises e ON e.id = w.exercise_id'''
+    if pid is None:
+        return sorted(db.query(sql, path=path))
+    return sorted(db.query(sql + " WHERE p.id = ?", (pid,), path or shards.database(pid)))
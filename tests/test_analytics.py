@@ -0,0 +1,18 @@
+import math
+
+from workouttracer import analytics
+
+
+def test_report_prints_missing_load_figures_as_na():
+    load = {"date": "2024-05-01", "load": 1500.0, "acute": 214.3, "chronic": 53.6,
+            "acwr": math.nan, "monotony": math.inf, "strain": math.nan}
+    text = analytics.format_report({"exercises": [], "load": load})
+    assert "ACWR n/a" in text and "monotony n/a   strain n/a" in text
+    assert "nan" not in text and "inf" not in text
+
+
+def test_report_formats_load_figures():
+    load = {"date": "2024-05-01", "load": 1500.0, "acute": 214.3, "chronic": 53.6,
+            "acwr": 4.0, "monotony": 0.41, "strain": 612.5}
+    text = analytics.format_report({"exercises": [], "load": load})
+    assert "ACWR 4.00" in text and "monotony 0.41   strain 612" in text
@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from workouttracer import archive, db, export
+
+from .helpers import log, profile, records
+
+
+def _rollups(path):
+    return db.query("SELECT profile_id, day_type, period, period_start, volume, sets, reps, entries "
+                    "FROM volume_rollups ORDER BY 1, 2, 3, 4", path=path)
+
+
+def test_archive_and_restore(database):
+    pid = profile("alice")
+    old = datetime.combine(date.today() - timedelta(days=3 * 365), datetime.min.time())
+    log(pid, old)
+    log(pid, datetime.now())
+    before, rollups = records(pid), _rollups(database)
+    rows = export.count_rows(pid)
+
+    moved = archive.run(365, database)
+    assert moved == {old.year: 2}
+    assert archive.years(database) == [old.year]
+    assert db.query_one("SELECT COUNT(*) FROM records", path=database)[0] == 2
+    c = db.get_connection(database)
+    assert c.execute("SELECT COUNT(*) FROM all_records").fetchone()[0] == 4
+    assert c.execute("SELECT COUNT(*) FROM all_record_sets").fetchone()[0] == 12
+    # Reads still see every record, and the rollups keep the archived volume
+    assert export.count_rows(pid) == rows
+    assert _rollups(database) == rollups
+
+    assert archive.restore_all(database) == 2
+    assert archive.years(database) == []
+    assert records(pid) == before
+    assert _rollups(database) == rollups
+
+
+def test_archived_ids_are_not_reused(database):
+    pid = profile("alice")
+    log(pid, datetime.now() - timedelta(days=800))
+    top = db.query_one("SELECT MAX(id) FROM records", path=database)[0]
+    archive.run(365, database)
+    log(pid, datetime.now())
+    assert db.query_one("SELECT MIN(id) FROM records", path=database)[0] > top
+
+
+def test_background_archiving_is_opt_in(database):
+    pid = profile("alice")
+    log(pid, datetime.now() - timedelta(days=800))
+    assert archive.horizon(database) is None
+    assert archive.housekeeping(archive.horizon(database), database)["archived"] == {}
+    assert db.query_one("SELECT COUNT(*) FROM records", path=database)[0] == 2
+
+    archive.set_horizon(365, database)
+    assert archive.horizon(database) == 365
+    assert sum(archive.housekeeping(archive.horizon(database), database)["archived"].values()) == 2
+    archive.set_horizon(None, database)
+    assert archive.horizon(database) is None
+
+
+def test_interrupted_move_is_finished(database, monkeypatch):
+    pid = profile("alice")
+    old = datetime.now() - timedelta(days=800)
+    log(pid, old)
+    log(pid, datetime.now())
+    before, rollups = records(pid), _rollups(database)
+
+    def crash(c, years, path):
+        raise KeyboardInterrupt
+
+    # Stopped after the copies committed and before main let go of the records
+    with monkeypatch.context() as patch:
+        patch.setattr(archive, "_finish", crash)
+        with pytest.raises(KeyboardInterrupt):
+            archive.run(365, database)
+    assert db.query_one("SELECT COUNT(*) FROM records", path=database)[0] == 4
+    assert archive.years(database) == []
+
+    assert archive.recover(database) == [old.year]
+    assert archive.recover(database) == []
+    assert archive.years(database) == [old.year]
+    assert db.query_one("SELECT COUNT(*) FROM records", path=database)[0] == 2
+    assert db.get_connection(database).execute("SELECT COUNT(*) FROM all_records").fetchone()[0] == 4
+    assert _rollups(database) == rollups
+    assert archive.restore_all(database) == 2
+    assert records(pid) == before
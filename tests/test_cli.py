@@ -0,0 +1,9 @@
+import subprocess
+import sys
+
+
+def test_import_leaves_numpy_unloaded():
+    # Commands that never touch the set columns shouldn't pay for importing numpy
+    code = "import sys, workouttracer.cli; print('numpy' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    assert out.strip() == "False"
@@ -0,0 +1,51 @@
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+
+from workouttracer import analytics, columns
+
+from .helpers import log, profile
+
+
+def weekly(pid):
+    return dict(analytics.period_summary(pid, "weekly"))
+
+
+def test_sees_sessions_logged_by_another_process(database):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    assert weekly(pid) == {"2024-04-29": 2700.0}
+    subprocess.run([sys.executable, "-m", "workouttracer", "--db", database, "log", "alice", "push",
+                    "Bench Press,3,5,100", "--date", "2024-05-02T18:00"], check=True, capture_output=True)
+    assert weekly(pid) == {"2024-04-29": 4200.0}
+
+
+def test_sees_sets_changed_and_removed_by_another_connection(database):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    log(pid, datetime(2024, 5, 8, 18))
+    assert weekly(pid) == {"2024-04-29": 2700.0, "2024-05-06": 2700.0}
+    other = sqlite3.connect(database)
+    with other:
+        other.execute("UPDATE record_sets SET weight = 110, volume = 550 WHERE record_id = 1")
+    assert weekly(pid) == {"2024-04-29": 2850.0, "2024-05-06": 2700.0}
+    with other:
+        other.execute("DELETE FROM records WHERE id = 1")
+    other.close()
+    assert weekly(pid) == {"2024-04-29": 1200.0, "2024-05-06": 2700.0}
+
+
+def test_external_appends_keep_the_loaded_sets(database, monkeypatch):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    cols = columns.for_profile(pid)
+    cols.refresh()
+    appended = []
+    append_rows = cols._append_rows
+    monkeypatch.setattr(cols, "_append_rows", lambda rows, archived=False: (appended.append(len(rows)),
+                                                                             append_rows(rows, archived)))
+    subprocess.run([sys.executable, "-m", "workouttracer", "--db", database, "log", "alice", "push",
+                    "Bench Press,3,5,100", "--date", "2024-05-02T18:00"], check=True, capture_output=True)
+    assert weekly(pid) == {"2024-04-29": 4200.0}
+    assert appended == [3]
@@ -0,0 +1,32 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from workouttracer import db, schema, shards
+
+from .helpers import log, profile
+
+SLOW = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 1000000) SELECT COUNT(*) FROM n"
+
+
+def test_progress_reaches_every_connection(database, tmp_path):
+    other = str(tmp_path / "other.db")
+    schema.init_db(other)
+    db.get_connection(database)
+    with db.progress(lambda: True, 1000):
+        for path in (database, other, str(tmp_path / "opened-inside.db")):
+            with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+                db.query(SLOW, path=path)
+    assert db.progress_handler() == (None, 0)
+    assert db.query(SLOW, path=other) == [(1000000,)]
+
+
+def test_progress_reaches_shard_queries(database):
+    for name in ("alice", "bob"):
+        log(profile(name), datetime(2024, 5, 1, 18))
+    shards.split()
+    with db.progress(lambda: True, 1):
+        with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+            shards.totals()
+    assert len(shards.totals()) == 2
@@ -0,0 +1,69 @@
+import csv
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from workouttracer import export
+
+from .helpers import log, profile
+
+
+@pytest.fixture
+def logged(database):
+    """A profile with 30 push sessions, one a day from 2024-03-01; 60 records."""
+    pid = profile("alice")
+    for day in range(30):
+        log(pid, datetime(2024, 3, 1, 18) + timedelta(days=day))
+    return pid
+
+
+def rows(pid, **filters):
+    return [list(row) for chunk in export.iter_chunks(pid, **filters) for row in chunk]
+
+
+def test_csv(logged, tmp_path):
+    fname = export.export(logged, str(tmp_path / "log.csv"))
+    with open(fname, newline="", encoding="utf-8") as f:
+        header, *body = list(csv.reader(f))
+    assert header == export.COLUMNS
+    assert body == [[str(v) for v in row] for row in rows(logged)]
+
+
+def test_xlsx(logged, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    fname = export.export(logged, str(tmp_path / "log.xlsx"))
+    sheet = openpyxl.load_workbook(fname, read_only=True)["Workout Log"]
+    header, *body = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert header == export.COLUMNS
+    assert body == rows(logged)
+
+
+def test_parquet(logged, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    fname = export.export(logged, str(tmp_path / "log.parquet"))
+    table = pq.read_table(fname)
+    assert table.column_names == export.COLUMNS
+    assert [list(row.values()) for row in table.to_pylist()] == rows(logged)
+
+
+def test_pdf_streams_every_chunk(logged, tmp_path, monkeypatch):
+    pytest.importorskip("reportlab")
+    # Several chunks, and more tables than fit on a page
+    monkeypatch.setattr(export, "CHUNK_SIZE", 7)
+    monkeypatch.setattr(export, "PDF_ROWS_PER_TABLE", 3)
+    calls = []
+    fname = export.export(logged, str(tmp_path / "log.pdf"), progress=lambda done, total: calls.append(done))
+    assert calls[-1] == 60
+    with open(fname, "rb") as f:
+        data = f.read()
+    assert data.startswith(b"%PDF")
+    assert len(re.findall(rb"/Type /Page\b", data)) > 1
+
+
+def test_filters_and_format(logged, tmp_path):
+    fname = export.export(logged, str(tmp_path / "march.txt"), fmt="csv", start="2024-03-10", end="2024-03-11")
+    with open(fname, newline="", encoding="utf-8") as f:
+        assert len(list(csv.reader(f))) == 1 + 4
+    with pytest.raises(ValueError):
+        export.export(logged, str(tmp_path / "log.txt"))
@@ -0,0 +1,99 @@
+import json
+import logging
+import pstats
+import sqlite3
+
+import pytest
+
+from workouttracer import instrument
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(instrument, "ENABLED", True)
+    instrument.reset()
+    yield
+    instrument.reset()
+
+
+def test_disabled_records_nothing(monkeypatch):
+    monkeypatch.setattr(instrument, "ENABLED", False)
+    instrument.reset()
+    with instrument.timed("export.csv") as span:
+        span.rows = 10
+    assert instrument.snapshot() == {}
+
+
+def test_timed_counts_calls_and_rows(enabled):
+    for rows in (3, 4):
+        with instrument.timed("export.csv") as span:
+            span.rows = rows
+    with instrument.timed("job.plot"):
+        pass
+    stats = instrument.snapshot()
+    assert stats["export.csv"]["count"] == 2 and stats["export.csv"]["rows"] == 7
+    assert stats["job.plot"]["count"] == 1 and stats["job.plot"]["rows"] == 0
+    s = stats["export.csv"]
+    assert s["p50_ms"] <= s["p99_ms"] <= s["max_ms"]
+
+
+def test_snapshot_puts_the_slowest_total_first(enabled):
+    instrument.record("fast", 0.001)
+    instrument.record("slow", 0.5)
+    instrument.record("fast", 0.002)
+    assert list(instrument.snapshot()) == ["slow", "fast"]
+    assert instrument.format_table().splitlines()[1].startswith("slow")
+
+
+def test_traced_drops_extra_signal_arguments(enabled):
+    class Tab:
+        @instrument.traced
+        def save(self):
+            return "saved"
+
+    # As when connected to QPushButton.clicked, which passes `checked`
+    assert Tab().save(False) == "saved"
+    assert instrument.snapshot()["ui.test_traced_drops_extra_signal_arguments.<locals>.Tab.save"]["count"] == 1
+
+
+def test_connection_times_statements_until_fetched(enabled):
+    conn = sqlite3.connect(":memory:", factory=instrument.Connection)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(5)])
+    assert len(conn.execute("SELECT x FROM t").fetchall()) == 5
+    cursor = conn.execute("SELECT x FROM t WHERE x > ?", (1,))
+    assert [row for row in cursor] == [(2,), (3,), (4,)]
+    stats = instrument.snapshot()
+    assert stats["sql INSERT INTO t VALUES (?)"]["rows"] == 5
+    assert stats["sql SELECT x FROM t"]["rows"] == 5
+    assert stats["sql SELECT x FROM t WHERE x > ?"]["rows"] == 3
+    conn.close()
+
+
+def test_slow_queries_are_logged_with_their_plan(enabled, monkeypatch, caplog):
+    monkeypatch.setattr(instrument, "SLOW_QUERY_MS", 0)
+    conn = sqlite3.connect(":memory:", factory=instrument.Connection)
+    conn.execute("CREATE TABLE t (x INTEGER PRIMARY KEY)")
+    with caplog.at_level(logging.WARNING, logger=instrument.__name__):
+        conn.execute("SELECT x FROM t WHERE x = ?", (1,)).fetchall()
+    message = caplog.records[-1].getMessage()
+    assert "slow query" in message and "SEARCH t" in message
+    conn.close()
+
+
+def test_profile_next_profiles_one_call(enabled, monkeypatch, tmp_path):
+    monkeypatch.setattr(instrument, "PROFILE_DIR", str(tmp_path))
+    instrument.profile_next("job.report")
+    for _ in range(2):
+        with instrument.timed("job.report"):
+            sum(range(1000))
+    files = list(tmp_path.glob("job.report-*.prof"))
+    assert len(files) == 1
+    pstats.Stats(str(files[0]))
+
+
+def test_dump_writes_the_snapshot(enabled, tmp_path):
+    instrument.record("job.plot", 0.01, rows=2)
+    fname = tmp_path / "stats.json"
+    instrument.dump(str(fname))
+    assert json.loads(fname.read_text())["job.plot"]["rows"] == 2
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from workouttracer import models, store, workers  # noqa: E402
+
+from .helpers import log, profile  # noqa: E402
+
+
+@pytest.fixture
+def jobs():
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    runner = workers.JobRunner()
+    yield runner
+    runner.cancel_all()
+    QtCore.QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+
+
+def settle():
+    QtCore.QThreadPool.globalInstance().waitForDone()
+    QtCore.QCoreApplication.processEvents()
+
+
+def test_history_pages_through_records(database, jobs, monkeypatch):
+    monkeypatch.setattr(models, "HISTORY_FETCH_SIZE", 4)
+    pid = profile("alice")
+    for day in (1, 2, 3):
+        log(pid, datetime(2024, 5, day, 18))
+    model = models.HistoryModel(jobs)
+    model.load(pid)
+    assert not model.canFetchMore()
+    settle()
+    assert model.rowCount() == 4 and model.canFetchMore()
+    model.fetchMore()
+    settle()
+    assert model.rowCount() == 6 and not model.canFetchMore()
+    dates = model.buffer[model.columns.index("date")]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_history_leaves_no_read_open(database, jobs, monkeypatch):
+    monkeypatch.setattr(models, "HISTORY_FETCH_SIZE", 2)
+    pid = profile("alice")
+    for day in (1, 2, 3):
+        log(pid, datetime(2024, 5, day, 18))
+    model = models.HistoryModel(jobs)
+    model.load(pid)
+    settle()
+    assert model.canFetchMore()
+    other = sqlite3.connect(database)
+    with other:
+        other.execute("INSERT INTO profiles (name) VALUES ('bob')")
+    other.close()
+    # A statement left pending between pages would pin a snapshot older than bob, and this write
+    # would fail with "database is locked"
+    store.create_profile("carol")
+    model.fetchMore()
+    settle()
+    assert model.rowCount() == 4
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+matplotlib = pytest.importorskip("matplotlib")
+matplotlib.use("Agg")
+
+import matplotlib.dates as mdates  # noqa: E402
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+from workouttracer import columns, plotting  # noqa: E402
+
+from .helpers import log, profile  # noqa: E402
+
+
+def test_lttb_keeps_ends_and_extremes():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[437] = 10
+    y[612] = -10
+    sx, sy = plotting.lttb(x, y, 50)
+    assert len(sx) == 50
+    assert (sx[0], sx[-1]) == (0, 999)
+    assert np.all(np.diff(sx) > 0)
+    assert 10 in sy and -10 in sy
+
+
+def test_lttb_leaves_short_series_alone():
+    x, y = np.arange(10.0), np.arange(10.0)
+    assert plotting.lttb(x, y, 10)[0] is x
+    assert plotting.lttb(x, y, 2)[0] is x
+
+
+def test_series_sums_days_in_range(database):
+    pid = profile("alice")
+    for day in (1, 1, 2, 5):
+        log(pid, datetime(2024, 5, day, 7 + day))
+    x, y = plotting.load_series(pid, "2024-05-01", "2024-05-04")
+    assert list(x) == [mdates.datestr2num(d) for d in ("2024-05-01", "2024-05-02")]
+    assert list(y) == [5400, 2700]
+    x, y = plotting.load_series(pid, "2024-06-01", "2024-06-30")
+    assert len(x) == len(y) == 0
+
+
+def test_series_cache_drops_entries_after_writes(database):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    cache = plotting.SeriesCache(maxsize=2)
+    key = (pid, "2024-05-01", "2024-05-31", None)
+    cache.put(key, "series", columns.profile_generation(pid))
+    assert cache.get(key) == "series"
+    log(pid, datetime(2024, 5, 2, 18))
+    assert cache.get(key) is None and key not in cache.entries
+
+
+def test_series_cache_evicts_least_recently_used(database):
+    pid = profile("alice")
+    cache = plotting.SeriesCache(maxsize=2)
+    generation = columns.profile_generation(pid)
+    for month in ("05", "06"):
+        cache.put((pid, month), month, generation)
+    cache.get((pid, "05"))
+    cache.put((pid, "07"), "07", generation)
+    assert list(cache.entries) == [(pid, "05"), (pid, "07")]
+
+
+def test_trend_plot_draws_at_most_a_point_per_pixel(monkeypatch):
+    fig = Figure(figsize=(4, 3), dpi=50)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    plot = plotting.TrendPlot(canvas, ax)
+    x = mdates.datestr2num("2024-01-01") + np.arange(5000.0)
+    y = np.random.default_rng(0).random(5000) * 1000
+    y[0], y[-1] = 0, 1000
+    plot.show(x, y, "Volume")
+    canvas.draw()
+    assert 3 <= len(plot.line.get_xdata()) <= ax.bbox.width
+    assert ax.get_title() == "Volume" and plot.background is not None
+    # Same limits and title: the line is blitted over the cached background, without a redraw
+    draws = []
+    monkeypatch.setattr(canvas, "draw_idle", lambda: draws.append(1))
+    plot.show(x, y[::-1].copy(), "Volume")
+    assert draws == []
+    plot.show(x, y * 2, "Volume")
+    assert draws == [1]
@@ -0,0 +1,57 @@
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+
+from workouttracer import db, querycache, store
+
+from .helpers import log, profile
+
+PROFILES = "SELECT name FROM profiles ORDER BY name"
+
+
+def test_reused_until_a_read_table_is_written(database):
+    profile("alice")
+    sql = "SELECT p.name, COUNT(*) FROM profiles p, workouts w WHERE w.profile_id = p.id GROUP BY p.id"
+    assert querycache.query(sql) == (("alice", 2),)
+    hits = querycache.stats()["hits"]
+    assert querycache.query(sql) == (("alice", 2),)
+    assert querycache.stats()["hits"] == hits + 1
+    # workouts only appears after the comma of the FROM list
+    store.add_workout(store.find_profile("alice"), "pull", "Row", 3)
+    assert querycache.query(sql) == (("alice", 3),)
+
+
+def test_read_tables():
+    assert querycache.read_tables("SELECT * FROM a, main.b AS x, [c] y WHERE 1") == ("a", "b", "c")
+    assert querycache.read_tables("SELECT * FROM a INDEXED BY i CROSS JOIN b ON 1") == ("a", "b")
+    assert querycache.read_tables("SELECT * FROM (SELECT x FROM t1) JOIN t2 USING (id)") == ("t1", "t2")
+
+
+def test_sees_writes_from_another_connection(database):
+    profile("alice")
+    assert querycache.query(PROFILES) == (("alice",),)
+    other = sqlite3.connect(database)
+    with other:
+        other.execute("INSERT INTO profiles (name) VALUES ('bob')")
+    other.close()
+    assert querycache.query(PROFILES) == (("alice",), ("bob",))
+
+
+def test_sees_writes_from_another_process(database):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    sql = "SELECT COUNT(*) FROM workouts WHERE profile_id = ?"
+    assert querycache.query(sql, (pid,)) == ((2,),)
+    subprocess.run([sys.executable, "-m", "workouttracer", "--db", database, "add-exercise", "alice", "pull", "Row"],
+                   check=True, capture_output=True)
+    assert querycache.query(sql, (pid,)) == ((3,),)
+    assert querycache.query(PROFILES) == (("alice",),)
+
+
+def test_own_commits_do_not_look_external(database):
+    profile("alice")
+    db.poll(database)
+    external = db.external_generation(database)
+    store.create_profile("bob")
+    assert db.external_generation(database) == external
@@ -0,0 +1,59 @@
+import math
+import os
+from datetime import datetime
+
+import pytest
+
+from workouttracer import cli, reports
+
+from .helpers import log, profile
+
+pytest.importorskip("reportlab")
+pytest.importorskip("openpyxl")
+
+
+@pytest.fixture
+def two_profiles(database):
+    for name in ("alice", "bob"):
+        pid = profile(name)
+        for day in (1, 3, 20):
+            log(pid, datetime(2024, 5, day, 18))
+
+
+def read(files):
+    out = {}
+    for fname in files:
+        with open(fname, "rb") as f:
+            out[os.path.basename(fname)] = f.read()
+    return out
+
+
+def test_load_line_prints_missing_acwr_as_na():
+    line = reports.load_line({"acute": 385.7, "chronic": 0.0, "acwr": math.nan})
+    assert line.endswith("ACWR n/a") and "nan" not in line
+
+
+def test_reports_are_reproducible(two_profiles, tmp_path):
+    files = reports.generate("2024-05", str(tmp_path / "a"), ("pdf", "xlsx"), workers=1)
+    assert sorted(os.path.basename(f) for f in files) == ["1_alice_2024-05.pdf", "1_alice_2024-05.xlsx",
+                                                          "2_bob_2024-05.pdf", "2_bob_2024-05.xlsx"]
+    again = reports.generate("2024-05", str(tmp_path / "b"), ("pdf", "xlsx"), workers=2)
+    assert read(files) == read(again)
+
+
+def test_xlsx_leaves_missing_figures_empty(two_profiles, tmp_path):
+    from openpyxl import load_workbook
+
+    fname, = reports.generate("2024-05", str(tmp_path), ("xlsx",), workers=1, profile_ids={1})
+    summary, log_sheet = load_workbook(fname).worksheets
+    values = {row[0]: row[1] for row in summary.iter_rows(min_row=2, max_row=4 + 6, values_only=True)}
+    assert values["sets"] == 18 and values["volume"] == 8100
+    assert values["acwr"] == 0 and values["monotony"] is None
+    assert log_sheet.max_row == 1 + 6
+
+
+def test_cli_counts_reports_and_files(two_profiles, tmp_path, capsys):
+    out = str(tmp_path / "out")
+    cli.main(["--db", reports.db.DATABASE, "report", "--month", "2024-05", "--out", out,
+              "--format", "pdf", "xlsx", "--workers", "1"])
+    assert capsys.readouterr().out.strip() == f"2 reports (4 files) written to {out}"
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from workouttracer import archive, cli, db, rollups, store
+
+from .helpers import log, profile
+
+
+def _rollups(path):
+    return db.query("SELECT profile_id, day_type, period, period_start, round(volume, 3), sets, reps, entries "
+                    "FROM volume_rollups ORDER BY 1, 2, 3, 4", path=path)
+
+
+def test_rebuild_matches_triggers(database):
+    alice = profile("alice")
+    store.add_workout(alice, "pull", "Barbell Row", 3)
+    # Several days in one week and month, two day types on one of them
+    for day in (1, 2, 3):
+        log(alice, datetime(2024, 5, day, 18))
+    log(alice, datetime(2024, 5, 3, 19), [("Barbell Row", 3, 8, 70, 90, 8, 140)], "pull")
+    expected = _rollups(database)
+    with db.transaction(database) as c:
+        rollups.rebuild(c)
+    assert _rollups(database) == expected
+
+
+def test_rebuild_command_counts_archived_records(database):
+    alice = profile("alice")
+    log(alice, datetime.now() - timedelta(days=800))
+    log(alice, datetime.now() - timedelta(days=799))
+    log(alice, datetime.now())
+    expected = _rollups(database)
+    archive.run(365, database)
+    db.execute("DELETE FROM volume_rollups", path=database)
+
+    cli.main(["--db", database, "rebuild-rollups"])
+    assert _rollups(database) == expected
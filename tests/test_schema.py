@@ -0,0 +1,71 @@
+from workouttracer import db, schema
+
+
+def test_migrate_from_v1(tmp_path):
+    path = str(tmp_path / "old.db")
+    assert schema.migrate(path, target=1) == 1
+    with db.transaction(path) as c:
+        c.execute("INSERT INTO profiles (id, name) VALUES (1, 'alice')")
+        # The same exercise twice on one day, differing in case; v7 merges them
+        c.executemany("INSERT INTO workouts (id, profile_id, day_type, exercise, sets) VALUES (?, 1, 'push', ?, 3)",
+                      [(1, "Bench Press"), (2, "bench press"), (3, "Dips")])
+        c.executemany("INSERT INTO records (workout_id, date, reps, weight, volume) VALUES (?, ?, ?, ?, ?)",
+                      [(1, "2024-05-01 18:00:00", 5, 100.0, 1500.0), (3, "2024-05-01 18:00:00", 10, 0.0, 0.0),
+                       (2, "2024-05-03 18:30:00", 5, 102.5, 1537.5)])
+
+    assert schema.migrate(path) == schema.SCHEMA_VERSION
+    assert schema.get_version(path) == schema.SCHEMA_VERSION
+    assert db.query_one("PRAGMA integrity_check", path=path)[0] == "ok"
+
+    workouts = db.query("SELECT w.id, e.name, w.sets FROM workouts w JOIN exercises e ON e.id = w.exercise_id "
+                        "ORDER BY w.id", path=path)
+    assert workouts == [(1, "Bench Press", 3), (3, "Dips", 3)]
+    rows = db.query("SELECT workout_id, date, day, session_id, set_count, total_reps FROM records ORDER BY id",
+                    path=path)
+    assert [row[0] for row in rows] == [1, 3, 1]
+    assert [row[1] for row in rows] == [1714586400, 1714586400, 1714761000]
+    assert [row[2] for row in rows] == [19844, 19844, 19846]
+    # Records logged at the same time share a session
+    assert rows[0][3] == rows[1][3] != rows[2][3]
+    assert [row[4:] for row in rows] == [(3, 15), (3, 30), (3, 15)]
+    assert db.query("SELECT record_id, COUNT(*), SUM(reps) FROM record_sets GROUP BY 1", path=path) == [
+        (1, 3, 15), (2, 3, 30), (3, 3, 15)]
+    assert db.query("SELECT period_start, volume, entries FROM volume_rollups WHERE period = 'day' ORDER BY 1",
+                    path=path) == [("2024-05-01", 1500.0, 2), ("2024-05-03", 1537.5, 1)]
+    assert db.query("SELECT shard FROM profiles", path=path) == [(None,)]
+
+
+def test_migrations_are_idempotent(database):
+    assert schema.migrate(database) == schema.SCHEMA_VERSION
+    schema.init_db(database)
+    assert schema.get_version(database) == schema.SCHEMA_VERSION
+
+
+def test_v6_converts_text_dates(tmp_path):
+    path = str(tmp_path / "v5.db")
+    assert schema.migrate(path, target=5) == 5
+    with db.transaction(path) as c:
+        c.executemany("INSERT INTO profiles (id, name) VALUES (?, ?)", [(1, "alice"), (2, "bob")])
+        c.executemany("INSERT INTO workouts (id, profile_id, day_type, exercise, sets) VALUES (?, ?, 'push', ?, 1)",
+                      [(1, 1, "Bench Press"), (2, 1, "Dips"), (3, 2, "Bench Press")])
+        c.executemany("INSERT INTO records (id, workout_id, date, reps, weight, volume, set_count, total_reps) "
+                      "VALUES (?, ?, ?, 5, 100, 500, 1, 5)",
+                      [(1, 1, "2024-05-01 18:00:00"), (2, 2, "2024-05-01 18:00:00"), (3, 3, "2024-05-01 18:00:00"),
+                       (4, 1, "2024-05-01 23:59:59"), (5, 1, "2024-05-02 00:00:00")])
+
+    assert schema.migrate(path, target=6) == 6
+    rows = db.query("SELECT id, date, day, session_id FROM records ORDER BY id", path=path)
+    assert [row[1] for row in rows] == [1714586400, 1714586400, 1714586400, 1714607999, 1714608000]
+    assert [row[2] for row in rows] == [19844, 19844, 19844, 19844, 19845]
+    sessions = [row[3] for row in rows]
+    # alice's two records at 18:00 are one session; bob's at the same time is his own
+    assert sessions[0] == sessions[1] and len({sessions[0], sessions[2], sessions[3], sessions[4]}) == 4
+    assert db.query("SELECT profile_id, period_start, volume FROM volume_rollups WHERE period = 'day' ORDER BY 1, 2",
+                    path=path) == [(1, "2024-05-01", 1500.0), (1, "2024-05-02", 500.0), (2, "2024-05-01", 500.0)]
+
+    # The rollup triggers come back reading epoch seconds
+    with db.transaction(path) as c:
+        c.execute("INSERT INTO records (workout_id, date, session_id, reps, weight, volume, set_count, total_reps) "
+                  "VALUES (1, 1714694400, 99, 5, 100, 500, 1, 5)")
+    assert db.query_one("SELECT volume FROM volume_rollups WHERE period = 'day' AND period_start = '2024-05-03'",
+                        path=path) == (500.0,)
@@ -0,0 +1,117 @@
+import asyncio
+import csv
+import io
+import json
+import os
+
+from workouttracer import server
+
+from .helpers import PUSH, profile
+
+
+async def fetch(reader, writer, method, path, body=None, raw=None):
+    """One request over an open connection; returns (status, headers, body bytes)."""
+    payload = raw if raw is not None else b"" if body is None else json.dumps(body).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(payload)}\r\n\r\n".encode()
+                 + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers, await reader.readexactly(int(headers["content-length"]))
+
+
+def run(scenario):
+    """Run scenario(request) against a fresh server; request(method, path, body) returns (status, JSON)."""
+    async def main():
+        srv = server.Server()
+        host, port = await srv.start(port=0)
+        reader, writer = await asyncio.open_connection(host, port)
+
+        async def request(method, path, body=None):
+            status, _, data = await fetch(reader, writer, method, path, body)
+            return status, json.loads(data)
+
+        try:
+            return await scenario(request, reader, writer)
+        finally:
+            writer.close()
+            await srv.close()
+
+    return asyncio.run(main())
+
+
+def test_log_and_read_back_on_one_connection(database):
+    async def scenario(request, reader, writer):
+        assert await request("POST", "/profiles", {"name": "alice"}) == (200, {"id": 1})
+        for exercise, *_ in PUSH:
+            assert (await request("POST", "/profiles/1/workouts", {"day_type": "push", "exercise": exercise}))[0] == 200
+        status, body = await request("POST", "/profiles/1/sessions",
+                                     {"day_type": "push", "date": "2024-05-01T18:00:00", "rows": PUSH})
+        assert (status, body) == (200, {"records": 2})
+        status, rows = await request("GET", "/profiles/1/records?from=2024-05-01&to=2024-05-01")
+        assert status == 200
+        assert sorted((r["exercise"], r["volume"]) for r in rows) == [("Bench Press", 1500), ("Overhead Press", 1200)]
+        status, totals = await request("GET", "/totals")
+        assert totals == [{"id": 1, "name": "alice", "volume": 2700, "sets": 6, "reps": 39, "records": 2}]
+
+    run(scenario)
+
+
+def test_batch_rolls_back_only_the_failing_write(database):
+    profile("alice")
+
+    async def scenario(request, reader, writer):
+        status, results = await request("POST", "/batch", [
+            {"method": "POST", "path": "/profiles/1/sessions", "body": {"day_type": "push", "rows": PUSH}},
+            {"method": "POST", "path": "/profiles/1/sessions", "body": {"day_type": "push", "rows": [["Curl", 1]]}},
+            {"method": "POST", "path": "/profiles", "body": {"name": "bob"}},
+        ])
+        assert status == 200
+        assert [r["status"] for r in results] == [200, 400, 200]
+        _, rows = await request("GET", "/profiles/1/records")
+        assert len(rows) == 2
+        _, profiles = await request("GET", "/profiles")
+        assert [p["name"] for p in profiles] == ["alice", "bob"]
+
+    run(scenario)
+
+
+def test_errors(database):
+    async def scenario(request, reader, writer):
+        assert (await request("GET", "/nowhere"))[0] == 404
+        assert (await request("PUT", "/profiles"))[0] == 405
+        assert (await request("GET", "/profiles/7/workouts"))[0] == 404
+        assert (await request("POST", "/profiles", {}))[0] == 400
+        status, _, data = await fetch(reader, writer, "POST", "/profiles", raw=b"{not json")
+        assert status == 400 and "JSON" in json.loads(data)["error"]
+
+    run(scenario)
+
+
+def test_export_streams_a_file_and_removes_it(database, monkeypatch):
+    pid = profile("alice")
+    made = []
+    mkstemp = server.tempfile.mkstemp
+
+    def tracked(**kwargs):
+        fd, fname = mkstemp(**kwargs)
+        made.append(fname)
+        return fd, fname
+
+    monkeypatch.setattr(server.tempfile, "mkstemp", tracked)
+
+    async def scenario(request, reader, writer):
+        await request("POST", f"/profiles/{pid}/sessions", {"day_type": "push", "rows": PUSH})
+        return await fetch(reader, writer, "GET", f"/profiles/{pid}/export?format=csv")
+
+    status, headers, data = run(scenario)
+    assert status == 200 and headers["content-type"] == "text/csv"
+    header, *rows = list(csv.reader(io.StringIO(data.decode())))
+    assert header == server.export.COLUMNS and len(rows) == 2
+    assert made and not any(os.path.exists(f) for f in made)
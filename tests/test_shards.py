@@ -0,0 +1,91 @@
+import os
+from datetime import date, datetime, timedelta
+
+from workouttracer import archive, db, export, schema, shards, store, sync
+
+from .helpers import log, profile, records
+
+
+def test_split_and_merge(database):
+    alice, bob = profile("alice"), profile("bob")
+    log(alice, datetime(2024, 5, 1, 18))
+    log(bob, datetime(2024, 5, 2, 18))
+    before = {pid: records(pid) for pid in (alice, bob)}
+
+    shards.split([alice])
+    assert shards.sharded(database)
+    target = shards.database(alice)
+    assert os.path.exists(target) and shards.database(bob) is None
+    assert records(alice) == before[alice] and records(bob) == before[bob]
+    assert db.query_one("SELECT COUNT(*) FROM workouts WHERE profile_id = ?", (alice,), database)[0] == 0
+
+    # Writes go to the shard, and new profiles get one
+    log(alice, datetime(2024, 5, 3, 18))
+    assert export.count_rows(alice) == len(before[alice]) + 2
+    carol = profile("carol")
+    assert shards.database(carol) is not None
+    log(carol, datetime(2024, 5, 4, 18))
+    after = {pid: records(pid) for pid in (alice, bob, carol)}
+    assert shards.totals()[alice] != shards.totals()[bob]
+
+    shards.merge()
+    assert not shards.sharded(database)
+    assert not os.path.exists(target)
+    assert shards.database(alice) is None and shards.database(carol) is None
+    assert {pid: records(pid) for pid in after} == after
+    assert store.day_exercises(alice, "push")
+
+
+def test_changes_made_in_a_shard_sync_after_merge(database, tmp_path):
+    alice = profile("alice")
+    log(alice, datetime(2024, 5, 1, 18))
+    # A peer that saw the profile before the split
+    peer = str(tmp_path / "peer.db")
+    schema.init_db(peer)
+    sync.sync(database, peer)
+    ids = db.query("SELECT id FROM records ORDER BY id", path=database)
+
+    shards.split()
+    log(alice, datetime(2024, 5, 3, 18))
+    store.delete_workout(alice, "push", "Overhead Press")
+    log(alice, datetime(2024, 5, 5, 18), [("Bench Press", 1, 3, 110, 120, 9, 150)])
+    shards.merge()
+
+    # Records keep their ids through the split and merge
+    merged = db.query("SELECT id FROM records ORDER BY id", path=database)
+    assert merged[:len(ids)] == ids
+    empty = str(tmp_path / "empty.db")
+    schema.init_db(empty)
+    sync.sync(database, empty)
+    assert records(path=empty) == records(path=database)
+    assert len(records(path=empty)) == 3
+    sync.sync(database, peer)
+    assert records(path=peer) == records(path=database)
+
+
+def test_split_and_merge_archived_profiles(database):
+    def rows(pid):
+        # Archived records included
+        return sorted(row for chunk in export.iter_chunks(pid) for row in chunk)
+
+    alice, bob = profile("alice"), profile("bob")
+    old = datetime.combine(date.today() - timedelta(days=3 * 365), datetime.min.time())
+    log(alice, old)
+    log(bob, old - timedelta(days=365))
+    log(bob, datetime.now())
+    archive.run(365, database)
+    assert archive.years(database) == [old.year - 1, old.year]
+    before = {pid: rows(pid) for pid in (alice, bob)}
+    files = [os.path.join(os.path.dirname(database), archive.archive_file(year, database))
+             for year in archive.years(database)]
+
+    shards.split([alice])
+    # Alice's year is left without records and goes; bob's stays archived
+    assert archive.years(database) == [old.year - 1]
+    assert not os.path.exists(files[1]) and os.path.exists(files[0])
+    assert {pid: rows(pid) for pid in before} == before
+
+    shards.merge()
+    assert archive.years(database) == [old.year - 1]
+    assert {pid: rows(pid) for pid in before} == before
+    assert len(before[alice]) == 2 and len(before[bob]) == 4
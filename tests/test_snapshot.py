@@ -0,0 +1,89 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from workouttracer import columns, db, snapshot
+
+from .helpers import log, profile
+
+pytest.importorskip("pyarrow")
+
+
+def save(pid):
+    return columns.save_snapshot(pid)
+
+
+def pieces(pid):
+    return [os.path.basename(p) for p in snapshot._pieces(pid, None)]
+
+
+def assert_columns_equal(loaded, expected):
+    assert loaded.keys() == expected.keys()
+    for name in expected:
+        np.testing.assert_array_equal(loaded[name], expected[name])
+
+
+def test_round_trip_from_one_mapped_piece(database):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    assert save(pid) == 6
+    loaded, last = snapshot.load(pid)
+    assert last == 2
+    assert_columns_equal(loaded, columns.for_profile(pid).arrays())
+    # A view of the memory map, not a copy
+    assert not loaded["volume"].flags.writeable
+
+
+def test_newer_records_are_appended_as_deltas(database):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    save(pid)
+    assert save(pid) == 0
+    log(pid, datetime(2024, 5, 2, 18))
+    assert save(pid) == 6
+    assert pieces(pid) == [f"profile-{pid}-000001.arrow", f"profile-{pid}-000002.arrow"]
+    loaded, last = snapshot.load(pid)
+    assert last == 4
+    assert_columns_equal(loaded, columns.for_profile(pid).arrays())
+
+
+def test_a_rewritten_or_deleted_record_makes_it_stale(database):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    log(pid, datetime(2024, 5, 2, 18))
+    save(pid)
+    db.execute("UPDATE records SET rest = 30 WHERE id = 1")
+    assert snapshot.load(pid) is None
+    # The next save starts a new base and removes the old one
+    assert save(pid) == 12
+    assert pieces(pid) == [f"profile-{pid}-000002.arrow"]
+    assert snapshot.load(pid) is not None
+    db.execute("DELETE FROM records WHERE id = 4")
+    assert snapshot.load(pid) is None
+
+
+def test_a_new_base_after_max_pieces(database, monkeypatch):
+    monkeypatch.setattr(snapshot, "MAX_PIECES", 2)
+    pid = profile("alice")
+    for day in (1, 2, 3):
+        log(pid, datetime(2024, 5, day, 18))
+        save(pid)
+    assert pieces(pid) == [f"profile-{pid}-000003.arrow"]
+    assert snapshot.load(pid)[1] == 6
+
+
+def test_cold_load_reads_the_snapshot_and_newer_sets(database, monkeypatch):
+    monkeypatch.setattr(snapshot, "ENABLED", True)
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    save(pid)
+    log(pid, datetime(2024, 5, 2, 18))
+    expected = {name: column.copy() for name, column in columns.for_profile(pid).arrays().items()}
+    columns.invalidate()
+    loads = []
+    load = snapshot.load
+    monkeypatch.setattr(snapshot, "load", lambda *args: loads.append(args) or load(*args))
+    assert_columns_equal(columns.for_profile(pid).arrays(), expected)
+    assert len(loads) == 1
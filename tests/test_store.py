@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import pytest
+
+from workouttracer import db, store
+
+from .helpers import profile
+
+
+def test_validate_session_lists_every_bad_cell():
+    with pytest.raises(ValueError) as error:
+        store.validate_session([("Bench Press", 0, 5, 100, 90, 8, 140), ("", 3, "x", -1, 90, 8, 140)])
+    assert str(error.value).splitlines() == [
+        "Row 1, Sets: must be at least 1",
+        "Row 2: exercise is missing",
+        "Row 2, Reps: 'x' is not a valid number",
+        "Row 2, Weight(kg): must not be negative",
+    ]
+
+
+def test_validate_session_converts_cells():
+    assert store.validate_session([(" Bench Press ", "3", "5", "100", "90", "8", "140")]) == [
+        ("Bench Press", 3, 5, 100.0, 90, 8, 140)]
+
+
+def test_save_session_matches_names_through_the_catalog(database):
+    pid = profile("alice")
+    rows = [("bench press", 2, 5, 100, 90, 8, 140), ("ohp", 1, 8, 50, 60, 7, 130), ("BENCH", 1, 3, 105, 90, 9, 150)]
+    assert store.save_session(pid, "push", rows, datetime(2024, 5, 1, 18)) == 2
+    # Bench Press under any of its names is one record of three sets
+    assert db.query("SELECT e.name, r.set_count FROM records r JOIN workouts w ON w.id = r.workout_id "
+                    "JOIN exercises e ON e.id = w.exercise_id ORDER BY 1", path=database) == [
+        ("Bench Press", 3), ("Overhead Press", 1)]
+    with pytest.raises(ValueError, match="Unknown exercise.*Squat"):
+        store.save_session(pid, "push", [("Squat", 3, 5, 140, 120, 8, 150)])
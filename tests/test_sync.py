@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from workouttracer import db, schema, store, sync
+
+from .helpers import log, profile, records
+
+
+def test_round_trip(database, tmp_path, monkeypatch):
+    peer = str(tmp_path / "peer.db")
+    schema.init_db(peer)
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    log(pid, datetime(2024, 5, 3, 18), [("OHP", 2, 6, 52.5, 60, 8, 135)])
+
+    sync.sync(database, peer)
+    assert records(path=peer) == records(path=database)
+    assert len(records(path=peer)) == 3
+
+    # Changes made on the peer come back, and once both are current nothing more is applied
+    monkeypatch.setattr(db, "DATABASE", peer)
+    store.delete_workout(store.find_profile("alice"), "push", "Overhead Press")
+    store.create_profile("bob")
+    sync.sync(database, peer)
+    assert records(path=database) == records(path=peer)
+    assert {name for _, _, name, *_ in records(path=database)} == {"Bench Press"}
+    assert sorted(db.query("SELECT name FROM profiles", path=database)) == [("alice",), ("bob",)]
+    sync.sync(database, peer)
+    assert all(result["applied"] == 0 for result in sync.sync(database, peer))
+
+
+def test_changes_are_not_echoed_back(database, tmp_path):
+    peer = str(tmp_path / "peer.db")
+    schema.init_db(peer)
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    to_peer, back = sync.sync(database, peer)
+    assert to_peer["applied"] == 5 and back == {"applied": 0, "skipped": 0, "conflicts": 0}
+    assert sync.export_changes(0, peer, sync.device_id(database))["entries"] == []
+    # Without a peer to leave out, the peer's copies of alice's rows would go back
+    assert len(sync.export_changes(0, peer)["entries"]) == 5
+    assert sync.sync(database, peer) == ({"applied": 0, "skipped": 0, "conflicts": 0},) * 2
+
+
+def test_bundle_to_empty_database(database, tmp_path):
+    pid = profile("alice")
+    log(pid, datetime(2024, 5, 1, 18))
+    fname = str(tmp_path / "alice.bundle")
+    sync.write_bundle(fname, 0, database)
+
+    peer = str(tmp_path / "peer.db")
+    schema.init_db(peer)
+    sync.apply_changes(sync.read_bundle(fname), peer)
+    assert records(path=peer) == records(path=database)
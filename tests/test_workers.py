@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from workouttracer import db, workers  # noqa: E402
+
+
+@pytest.fixture
+def jobs():
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    runner = workers.JobRunner()
+    yield runner
+    runner.cancel_all()
+    QtCore.QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+
+
+def settle():
+    QtCore.QThreadPool.globalInstance().waitForDone()
+    QtCore.QCoreApplication.processEvents()
+
+
+def test_cancel_stops_a_job_at_its_next_progress_report(jobs):
+    started = threading.Event()
+    steps = []
+
+    def count(progress):
+        for i in range(1000):
+            started.set()
+            progress(i, 1000)
+            steps.append(i)
+            time.sleep(0.01)
+        return "finished"
+
+    results, errors = [], []
+    jobs.submit("count", count, on_result=results.append, on_error=errors.append, on_progress=lambda *_: None)
+    started.wait(5)
+    jobs.cancel("count")
+    settle()
+    assert results == [] and errors == []
+    assert len(steps) < 1000
+    assert not jobs.running
+
+
+def test_cancel_interrupts_running_sql(database, jobs):
+    started = threading.Event()
+
+    def spin():
+        started.set()
+        return db.query_one("WITH RECURSIVE n(k) AS (SELECT 1 UNION ALL SELECT k + 1 FROM n) SELECT COUNT(*) FROM n")
+
+    results, errors = [], []
+    jobs.submit("spin", spin, on_result=results.append, on_error=errors.append)
+    started.wait(5)
+    time.sleep(0.05)
+    start = time.monotonic()
+    jobs.cancel("spin")
+    settle()
+    assert time.monotonic() - start < 5
+    # The interrupted query is a cancellation, not a failure
+    assert results == [] and errors == []
+
+
+def test_a_superseded_job_delivers_nothing(jobs):
+    release = threading.Event()
+    results = []
+    jobs.submit("search", lambda: release.wait(5) and "old", on_result=results.append)
+    jobs.submit("search", lambda: "new", on_result=results.append)
+    release.set()
+    settle()
+    assert results == ["new"]
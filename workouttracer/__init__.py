@@ -0,0 +1,5 @@
+"""Workout tracker core: storage, summaries and exports, usable without the GUI.
+
+Submodules are imported on demand so scripts only pay for what they use; the PyQt5 window lives in
+`workouttracer.gui` and the command line in `workouttracer.cli`.
+"""
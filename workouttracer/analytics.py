@@ -0,0 +1,247 @@
+"""Per-exercise strength and training-load analytics.
+
+Everything here works on whole NumPy columns of a profile's sets. Grouping uses sort order and
+bincount rather than Python loops over rows, so a million records costs tens of milliseconds.
+"""
+from datetime import date
+
+import numpy as np
+
+from . import columns
+
+# Estimated one-rep max from a set of `r` reps at weight `w`
+FORMULAS = {
+    "epley": lambda w, r: w * (1 + r / 30),
+    "brzycki": lambda w, r: w * 36 / np.maximum(37 - r, 1),
+}
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+# Progression is the e1RM trend over this many days, ending at the profile's latest record
+PROGRESSION_DAYS = 84
+
+_EPOCH = date(1970, 1, 1)
+
+
+def load(profile_id, day_type=None, path=None):
+    """A profile's sets as columns: day (days since 1970-01-01), exercise (index into `exercises`),
+    reps, weight, rpe (NaN when not logged) and volume. Read from the in-memory set columns.
+    """
+    cols = columns.for_profile(profile_id, path)
+    data = cols.arrays(day_type)
+    # Exercises are grouped by catalog id, so the same lift on two day types shares its PRs; they are
+    # numbered in name order
+    ids = sorted({exercise_id for _, exercise_id in cols.workouts.values()}, key=lambda e: cols.exercises[e] or "")
+    index = {exercise_id: i for i, exercise_id in enumerate(ids)}
+    exercises = [cols.exercises[e] for e in ids]
+    lookup = np.zeros(max(cols.workouts, default=0) + 1, dtype=np.int64)
+    for wid, (_, exercise_id) in cols.workouts.items():
+        lookup[wid] = index[exercise_id]
+    return {
+        "day": columns.days(data["date"]),
+        "exercise": lookup[data["workout_id"]],
+        "reps": data["reps"],
+        "weight": data["weight"],
+        "rpe": data["rpe"],
+        "volume": data["volume"],
+        "exercises": exercises,
+    }
+
+
+def estimated_1rm(weight, reps, formula="epley"):
+    """Per-set estimated 1RM. A single is its own max, and sets without reps estimate 0."""
+    weight, reps = np.asarray(weight, dtype=float), np.asarray(reps, dtype=float)
+    est = FORMULAS[formula](weight, reps)
+    return np.where(reps > 1, est, np.where(reps == 1, weight, 0.0))
+
+
+def rpe_load(volume, rpe):
+    """Volume scaled by effort (RPE/10). Records without an RPE count at full volume."""
+    rpe = np.asarray(rpe, dtype=float)
+    return np.asarray(volume, dtype=float) * np.where(np.isnan(rpe) | (rpe <= 0), 10.0, rpe) / 10
+
+
+def personal_records(day, exercise, est):
+    """Best e1RM per exercise per day, and which of those days set a PR.
+
+    Returns (exercise, day, best, is_pr) with one entry per (exercise, day) that has sets, sorted by
+    exercise and then day. A day is a PR when its best beats every earlier day of the same exercise;
+    an exercise's first day always counts as one.
+    """
+    if not len(est):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), np.zeros(0, dtype=bool)
+    # One integer key sorts several times faster than np.lexsort over the two columns
+    first_day = day.min()
+    key = exercise * (day.max() - first_day + 1) + (day - first_day)
+    order = np.argsort(key)
+    key = key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ex, d = exercise[order][starts], day[order][starts]
+    best = np.maximum.reduceat(est[order], starts)
+
+    first = np.r_[True, ex[1:] != ex[:-1]]
+    # Lift each exercise's values above every earlier exercise's, so one cumulative max runs
+    # across all groups without mixing them. Comparing lifted values keeps ties exact.
+    lifted = best + (np.cumsum(first) - 1) * (best.max() + 1)
+    previous = np.r_[-np.inf, np.maximum.accumulate(lifted)[:-1]]
+    previous[first] = -np.inf
+    return ex, d, best, lifted > previous
+
+
+def rolling_sum(x, window):
+    """Trailing `window`-day sums, counting days before the series as zero."""
+    c = np.cumsum(np.r_[np.zeros(window), x])
+    return c[window:] - c[:-window]
+
+
+def load_metrics(day, load, until=None):
+    """Daily training-load series from the first record to `until` (a day number, default the last record).
+
+    Returns (first_day, columns). The columns are daily load, acute (7-day) and chronic (28-day)
+    mean load, their ratio (ACWR), Foster's monotony (weekly mean / standard deviation) and strain
+    (weekly load x monotony).
+    """
+    if not len(day):
+        return None, {}
+    first = int(day.min())
+    length = max(int(day.max()), until if until is not None else 0) - first + 1
+    daily = np.bincount(day - first, weights=load, minlength=length)
+    weekly = rolling_sum(daily, ACUTE_DAYS)
+    acute = weekly / ACUTE_DAYS
+    chronic = rolling_sum(daily, CHRONIC_DAYS) / CHRONIC_DAYS
+    spread = np.sqrt(np.maximum(rolling_sum(daily ** 2, ACUTE_DAYS) / ACUTE_DAYS - acute ** 2, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        acwr = np.where(chronic > 0, acute / chronic, np.nan)
+        monotony = np.where(spread > 0, acute / spread, np.nan)
+    return first, {
+        "load": daily,
+        "acute": acute,
+        "chronic": chronic,
+        "acwr": acwr,
+        "monotony": monotony,
+        "strain": weekly * monotony,
+    }
+
+
+def exercise_stats(data, formula="epley"):
+    """One row per exercise that has sets: (exercise, best e1RM, date of best, latest day's best e1RM,
+    number of PR days, e1RM trend in kg/week over the last PROGRESSION_DAYS).
+    """
+    est = estimated_1rm(data["weight"], data["reps"], formula)
+    ex, d, best, is_pr = personal_records(data["day"], data["exercise"], est)
+    if not len(ex):
+        return []
+    first = np.r_[True, ex[1:] != ex[:-1]]
+    group = np.cumsum(first) - 1
+    starts = np.flatnonzero(first)
+    ends = np.r_[starts[1:], len(ex)] - 1
+
+    top = np.maximum.reduceat(best, starts)
+    prs = np.add.reduceat(is_pr.astype(np.int64), starts)
+    # The top e1RM was first reached by the earliest PR day equal to it
+    hits = np.flatnonzero(is_pr & (best == top[group]))
+    _, first_hit = np.unique(group[hits], return_index=True)
+    top_at = hits[first_hit]
+
+    # Least-squares slope of the daily best against day over the recent window, per exercise
+    recent = d >= d.max() - PROGRESSION_DAYS
+    g, x, y = group[recent], (d[recent] - d.max()).astype(float), best[recent]
+    n = np.bincount(g, minlength=len(starts))
+    sx, sy = np.bincount(g, x, len(starts)), np.bincount(g, y, len(starts))
+    sxx, sxy = np.bincount(g, x * x, len(starts)), np.bincount(g, x * y, len(starts))
+    denom = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denom > 0, (n * sxy - sx * sy) / denom * 7, np.nan)
+
+    names = data["exercises"]
+    return [(names[ex[starts[i]]], float(top[i]), day_string(d[top_at[i]]), float(best[ends[i]]), int(prs[i]),
+             float(slope[i])) for i in range(len(starts))]
+
+
+def period_totals(day, volume, period):
+    """Volume per 'day', 'week' (starting on the ISO Monday) or 'month' from the first to the last
+    bucket with data, empty buckets included as zero. Returns (bucket start day numbers, totals).
+    """
+    if not len(day):
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    if period == "month":
+        bucket = day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    elif period == "week":
+        # 1970-01-01 was a Thursday; shifting by 3 days makes each bucket start on a Monday
+        bucket = (day + 3) // 7
+    else:
+        bucket = day
+    first = int(bucket.min())
+    totals = np.bincount(bucket - first, weights=volume)
+    index = np.arange(first, first + len(totals))
+    if period == "month":
+        starts = index.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    elif period == "week":
+        starts = index * 7 - 3
+    else:
+        starts = index
+    return starts, totals
+
+
+def period_summary(profile_id, period):
+    """[(period_start, volume)] for 'weekly' or 'monthly' totals, with empty periods filled in as zero."""
+    data = columns.for_profile(profile_id).arrays()
+    starts, totals = period_totals(columns.days(data["date"]), data["volume"],
+                                   "week" if period == "weekly" else "month")
+    return [(day_string(start), float(total)) for start, total in zip(starts, totals)]
+
+
+def suggestion(summary):
+    # Compare the last two periods
+    if len(summary) < 2:
+        return None
+    if summary[-1][1] < summary[-2][1]:
+        return "Suggestion: Volume decreased. Consider adding more sets or weight next session."
+    return "Great job! Volume increased or stayed consistent."
+
+
+def format_slope(slope):
+    # NaN when an exercise has fewer than two recent days to fit a trend through
+    return "-" if np.isnan(slope) else f"{slope:+.2f}"
+
+
+def format_metric(value, spec):
+    # ACWR, monotony and strain are NaN without chronic load or with no spread in the week
+    return f"{value:{spec}}" if np.isfinite(value) else "n/a"
+
+
+def day_string(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+def report(profile_id, day_type=None, formula="epley", data=None):
+    """Per-exercise stats plus today's training-load figures for one profile.
+
+    Returns {"exercises": exercise_stats(...), "load": {metric: value}}, where "load" also has
+    the "date" it describes and is empty when the profile has no records.
+    """
+    if data is None:
+        data = load(profile_id, day_type)
+    today = (date.today() - _EPOCH).days
+    first, metrics = load_metrics(data["day"], rpe_load(data["volume"], data["rpe"]), until=today)
+    latest = {}
+    if metrics:
+        latest = {name: float(series[-1]) for name, series in metrics.items()}
+        latest["date"] = day_string(first + len(metrics["load"]) - 1)
+    return {"exercises": exercise_stats(data, formula), "load": latest}
+
+
+def format_report(result):
+    lines = [f"{'Exercise':<20} {'Best e1RM':>10} {'on':>11} {'Latest':>8} {'PRs':>5} {'kg/week':>8}"]
+    for name, best, best_date, latest, prs, slope in result["exercises"]:
+        lines.append(f"{name[:20]:<20} {best:>10.1f} {best_date:>11} {latest:>8.1f} {prs:>5} {format_slope(slope):>8}")
+    load = result["load"]
+    if load:
+        lines.append("")
+        lines.append(f"Training load on {load['date']}:")
+        lines.append(f"  acute (7d) {load['acute']:.0f}   chronic (28d) {load['chronic']:.0f}   "
+                     f"ACWR {format_metric(load['acwr'], '.2f')}")
+        lines.append(f"  monotony {format_metric(load['monotony'], '.2f')}   "
+                     f"strain {format_metric(load['strain'], '.0f')}")
+    return "\n".join(lines)
@@ -0,0 +1,423 @@
+"""Yearly archive databases for old records, and background database maintenance.
+
+run() moves records older than a horizon (with their sets) out of the main database into one
+SQLite file per year next to it, e.g. workouts-2019.db. The `archives` table lists them. Readers
+whose date range reaches archived years ATTACH those files (attach()) and read them alongside
+main: the temp views `all_records` and `all_record_sets` are the UNION ALL of main and every
+attached archive, and heavier readers (exports, set columns) query each attached schema in turn.
+
+Archived records keep their ids (records ids are AUTOINCREMENT, so they are never handed out
+again) and stay counted in volume_rollups. They are moved back into main if a sync changes them.
+
+maintain() reclaims free pages with incremental vacuum and refreshes planner statistics. The app
+runs it in the background, and archives there too once a horizon is set with set_horizon().
+"""
+import calendar
+import os
+from contextlib import contextmanager
+from datetime import date, timedelta
+from urllib.parse import quote
+
+from . import db, querycache, rollups
+
+# Default age, in days, of the records run() archives; the app only archives once set_horizon() is called
+HORIZON_DAYS = 365
+# SQLite's default limit on databases attached to one connection; years past it stay in main
+MAX_ARCHIVES = 10
+# Free pages handed back to the filesystem per maintain() call
+VACUUM_PAGES = 4096
+
+# Columns copied between main and archives; `day` is generated from `date`
+FIELDS = ("id, workout_id, date, session_id, reps, weight, rest, rpe, heart_rate, volume, set_count, "
+          "total_reps, origin, origin_id")
+SET_FIELDS = "record_id, set_no, reps, weight, rpe, heart_rate, volume"
+
+
+def create_table(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS archives (
+                 year INTEGER PRIMARY KEY,
+                 file TEXT NOT NULL, -- relative to the main database's directory
+                 records INTEGER NOT NULL DEFAULT 0,
+                 last_session INTEGER, -- highest session_id in it
+                 last_date INTEGER -- newest records.date in it
+                 )''')
+
+
+def _create(c, schema):
+    # Same columns as main's records (schema v6 on), without the foreign key into main's workouts
+    c.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.records (
+                  id INTEGER PRIMARY KEY,
+                  workout_id INTEGER,
+                  date INTEGER,
+                  day INTEGER GENERATED ALWAYS AS (date / 86400) VIRTUAL,
+                  session_id INTEGER,
+                  reps INTEGER,
+                  weight REAL,
+                  rest INTEGER,
+                  rpe INTEGER,
+                  heart_rate INTEGER,
+                  volume REAL,
+                  set_count INTEGER NOT NULL DEFAULT 0,
+                  total_reps INTEGER NOT NULL DEFAULT 0,
+                  origin TEXT,
+                  origin_id INTEGER
+                  )''')
+    c.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.record_sets (
+                  record_id INTEGER NOT NULL,
+                  set_no INTEGER NOT NULL,
+                  reps INTEGER,
+                  weight REAL,
+                  rpe INTEGER,
+                  heart_rate INTEGER,
+                  volume REAL,
+                  PRIMARY KEY (record_id, set_no)
+                  ) WITHOUT ROWID''')
+    c.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_records_workout_date "
+              f"ON records(workout_id, date, volume, session_id)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_records_date ON records(date, workout_id, volume)")
+    c.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_records_origin ON records(origin, origin_id) "
+              f"WHERE origin IS NOT NULL")
+
+
+def _schema(year):
+    return f"archive_{year}"
+
+
+def archive_file(year, path=None):
+    root, ext = os.path.splitext(os.path.basename(path or db.DATABASE))
+    return f"{root}-{year}{ext or '.db'}"
+
+
+def years(path=None):
+    """Archived years, oldest first."""
+    return [year for (year,) in querycache.query("SELECT year FROM archives ORDER BY year", path=path)]
+
+
+def needed(start, path=None):
+    """Whether records dated `start` (YYYY-MM-DD) or later may be in an archive."""
+    newest = querycache.query("SELECT MAX(last_date) FROM archives", path=path)[0][0]
+    if newest is None:
+        return False
+    return start is None or calendar.timegm(date.fromisoformat(str(start)[:10]).timetuple()) <= newest
+
+
+def _attached(c):
+    return [name for _, name, _ in c.execute("PRAGMA database_list") if name.startswith("archive_")]
+
+
+def _attach(c, year, file, path):
+    target = os.path.join(os.path.dirname(os.path.abspath(path or db.DATABASE)), file)
+    if db.READ_ONLY:
+        # Read-only connections are opened from a URI, so ATTACH takes one too
+        c.execute("ATTACH DATABASE ? AS " + _schema(year), (f"file:{quote(target)}?mode=ro",))
+    else:
+        c.execute("ATTACH DATABASE ? AS " + _schema(year), (target,))
+
+
+def _create_views(c):
+    schemas = ["main"] + sorted(_attached(c))
+    c.execute("DROP VIEW IF EXISTS temp.all_records")
+    c.execute("DROP VIEW IF EXISTS temp.all_record_sets")
+    c.execute("CREATE TEMP VIEW all_records AS "
+              + " UNION ALL ".join(f"SELECT {FIELDS}, day FROM {s}.records" for s in schemas))
+    c.execute("CREATE TEMP VIEW all_record_sets AS "
+              + " UNION ALL ".join(f"SELECT {SET_FIELDS} FROM {s}.record_sets" for s in schemas))
+
+
+def attach(first_year=None, last_year=None, path=None):
+    """Attach the archives of the years in [first_year, last_year] (None = unbounded) to this thread's
+    connection and return their schema names, newest first.
+
+    The temp views all_records and all_record_sets then cover main and every attached archive. Inside
+    a write transaction nothing can be attached; the archives attached before it are returned.
+    """
+    c = db.get_connection(path)
+    wanted = {year: file for year, file in querycache.query("SELECT year, file FROM archives", path=path)
+              if (first_year is None or year >= first_year) and (last_year is None or year <= last_year)}
+    attached = _attached(c)
+    missing = [year for year in wanted if _schema(year) not in attached]
+    if missing and not db.in_transaction(path):
+        for year in missing:
+            _attach(c, year, wanted[year], path)
+        _create_views(c)
+    elif c.execute("SELECT 1 FROM temp.sqlite_master WHERE name = 'all_records'").fetchone() is None:
+        _create_views(c)
+    attached = set(_attached(c))
+    return [_schema(year) for year in sorted(wanted, reverse=True) if _schema(year) in attached]
+
+
+def detach(path=None):
+    """Detach every archive from this thread's connection, to make room for another attachment;
+    attach() brings them back.
+    """
+    c = db.get_connection(path)
+    for schema in _attached(c):
+        c.execute(f"DETACH DATABASE {schema}")
+    c.execute("DROP VIEW IF EXISTS temp.all_records")
+    c.execute("DROP VIEW IF EXISTS temp.all_record_sets")
+
+
+@contextmanager
+def _untracked(c):
+    # Moving a record between databases is neither an insert nor a delete: rollups keep counting it
+    # and the change log doesn't see it. The triggers that would are dropped for the move and
+    # recreated after it, inside the caller's transaction, so a failure rolls them back too.
+    saved = c.execute("SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger' AND tbl_name = 'records' "
+                      "AND name != 'trg_record_sets_delete'").fetchall()
+    for name, _ in saved:
+        c.execute(f"DROP TRIGGER main.{name}")
+    yield
+    for _, sql in saved:
+        c.execute(sql)
+
+
+def _move(c, source, target, ids):
+    # Copy records and sets with ids in temp table `ids` from one schema to another, then remove them
+    c.execute(f"INSERT OR REPLACE INTO {target}.records ({FIELDS}) "
+              f"SELECT {FIELDS} FROM {source}.records WHERE id IN (SELECT id FROM temp.{ids})")
+    c.execute(f"INSERT OR REPLACE INTO {target}.record_sets ({SET_FIELDS}) "
+              f"SELECT {SET_FIELDS} FROM {source}.record_sets WHERE record_id IN (SELECT id FROM temp.{ids})")
+    c.execute(f"DELETE FROM {source}.record_sets WHERE record_id IN (SELECT id FROM temp.{ids})")
+    c.execute(f"DELETE FROM {source}.records WHERE id IN (SELECT id FROM temp.{ids})")
+
+
+def _count(c, schema):
+    c.execute(f"UPDATE archives SET (records, last_session, last_date) = "
+              f"(SELECT COUNT(*), MAX(session_id), MAX(date) FROM {schema}.records) WHERE year = ?",
+              (int(schema.rsplit("_", 1)[1]),))
+
+
+def _year_bounds(year):
+    return calendar.timegm((year, 1, 1, 0, 0, 0)), calendar.timegm((year + 1, 1, 1, 0, 0, 0))
+
+
+def horizon(path=None):
+    """Days after which the app archives records in the background, or None while that is off (the default)."""
+    rows = querycache.query("SELECT value FROM settings WHERE key = 'archive_days'", path=path)
+    return int(rows[0][0]) if rows else None
+
+
+def set_horizon(days, path=None):
+    """Turn background archiving on for records `days` old or older, or off with None."""
+    if days is not None and days < 0:
+        raise ValueError("The archive horizon can't be negative.")
+    with db.transaction(path, ("settings",)) as c:
+        if days is None:
+            c.execute("DELETE FROM settings WHERE key = 'archive_days'")
+        else:
+            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('archive_days', ?)", (str(int(days)),))
+
+
+def _finish(c, years, path):
+    # Second half of a move (see run()): list the archives, and drop from main the records that are
+    # now in them. Main commits this on its own, so it either all happens or not at all.
+    with _untracked(c):
+        for year in years:
+            schema = _schema(year)
+            if c.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE name = 'records'").fetchone() is None:
+                continue  # the copy never committed; the records are all still in main
+            c.execute("INSERT OR IGNORE INTO archives (year, file) VALUES (?, ?)", (year, archive_file(year, path)))
+            # trg_record_sets_delete takes their sets along
+            c.execute(f"DELETE FROM main.records WHERE id IN (SELECT id FROM {schema}.records)")
+            _count(c, schema)
+    c.execute("DELETE FROM settings WHERE key = 'archive_pending'")
+
+
+def recover(path=None):
+    """Finish a run() that stopped between copying records into their archives and removing them from
+    main. Returns the years it finished.
+    """
+    rows = querycache.query("SELECT value FROM settings WHERE key = 'archive_pending'", path=path)
+    if not rows:
+        return []
+    years = [int(year) for year in rows[0][0].split(",") if year]
+    c = db.get_connection(path)
+    for year in years:
+        if _schema(year) not in _attached(c):
+            _attach(c, year, archive_file(year, path), path)
+    with db.transaction(path, ("records", "record_sets", "archives", "settings")) as c:
+        _finish(c, years, path)
+    _create_views(c)
+    return years
+
+
+def run(days=HORIZON_DAYS, path=None):
+    """Move records dated `days` or more before today into their year's archive.
+
+    Oldest years go first; once MAX_ARCHIVES archives exist, newer years stay in main. Returns
+    {year: records moved}.
+    """
+    recover(path)
+    before = calendar.timegm((date.today() - timedelta(days=days)).timetuple())
+    c = db.get_connection(path)
+    archived = years(path)
+    pending = []
+    for (year,) in c.execute("SELECT DISTINCT CAST(strftime('%Y', date, 'unixepoch') AS INTEGER) FROM records "
+                             "WHERE date < ? ORDER BY 1", (before,)).fetchall():
+        if year not in archived:
+            if len(archived) >= MAX_ARCHIVES:
+                break
+            archived.append(year)
+        pending.append(year)
+    if not pending:
+        return {}
+    for year in pending:
+        if _schema(year) not in _attached(c):
+            _attach(c, year, archive_file(year, path), path)
+    # SQLite commits each attached file on its own, so a move is two transactions. The first copies the
+    # records into the archives, checks the copies and marks the move pending in main; the second
+    # removes them from main. Stopped in between, the records are in both, and recover() (which the
+    # next run starts with) finishes the move.
+    moved = {}
+    with db.transaction(path, ("settings",)) as c:
+        for year in pending:
+            schema = _schema(year)
+            _create(c, schema)
+            first, end = _year_bounds(year)
+            c.execute("CREATE TEMP TABLE moving AS SELECT id FROM main.records WHERE date >= ? AND date < ?",
+                      (first, min(end, before)))
+            moved[year] = c.execute("SELECT COUNT(*) FROM temp.moving").fetchone()[0]
+            c.execute(f"INSERT OR REPLACE INTO {schema}.records ({FIELDS}) "
+                      f"SELECT {FIELDS} FROM main.records WHERE id IN (SELECT id FROM temp.moving)")
+            c.execute(f"INSERT OR REPLACE INTO {schema}.record_sets ({SET_FIELDS}) "
+                      f"SELECT {SET_FIELDS} FROM main.record_sets WHERE record_id IN (SELECT id FROM temp.moving)")
+            copied = c.execute(f"""
+                SELECT (SELECT COUNT(*) FROM {schema}.records WHERE id IN (SELECT id FROM temp.moving)),
+                       (SELECT COUNT(*) FROM {schema}.record_sets WHERE record_id IN (SELECT id FROM temp.moving)),
+                       (SELECT COUNT(*) FROM main.record_sets WHERE record_id IN (SELECT id FROM temp.moving))
+            """).fetchone()
+            c.execute("DROP TABLE temp.moving")
+            if copied[0] != moved[year] or copied[1] != copied[2]:
+                raise RuntimeError(f"Archiving {year}: {copied[0]} of {moved[year]} records and {copied[1]} "
+                                   f"of {copied[2]} sets copied; nothing was moved.")
+        c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('archive_pending', ?)",
+                  (",".join(map(str, pending)),))
+    with db.transaction(path, ("records", "record_sets", "archives", "settings")) as c:
+        _finish(c, pending, path)
+    for year in pending:
+        c.execute(f"ANALYZE {_schema(year)}")
+    _create_views(c)
+    return moved
+
+
+def restore(c, record_ids):
+    """Move these records back from whichever attached archive holds them into main, on the caller's
+    connection and transaction. Ids already in main are left alone.
+    """
+    schemas = _attached(c)
+    if not schemas:
+        return
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS restoring (id INTEGER PRIMARY KEY)")
+    c.executemany("INSERT OR IGNORE INTO temp.restoring VALUES (?)", [(rid,) for rid in record_ids])
+    holding = [schema for schema in schemas if c.execute(
+        f"SELECT 1 FROM {schema}.records WHERE id IN (SELECT id FROM temp.restoring) LIMIT 1").fetchone()]
+    if holding:
+        with _untracked(c):
+            for schema in holding:
+                _move(c, schema, "main", "restoring")
+                _count(c, schema)
+    c.execute("DELETE FROM temp.restoring")
+
+
+def restore_all(path=None):
+    """Move every archived record back into main and delete the archive files. Returns the number
+    of records moved.
+    """
+    schemas = attach(path=path)
+    files = [file for _, file in querycache.query("SELECT year, file FROM archives", path=path)]
+    moved = 0
+    with db.transaction(path, ("records", "record_sets", "archives")) as c, _untracked(c):
+        for schema in schemas:
+            c.execute(f"CREATE TEMP TABLE moving AS SELECT id FROM {schema}.records")
+            moved += c.execute("SELECT COUNT(*) FROM temp.moving").fetchone()[0]
+            _move(c, schema, "main", "moving")
+            c.execute("DROP TABLE temp.moving")
+        c.execute("DELETE FROM archives")
+    detach(path)
+    for file in files:
+        try:
+            os.remove(os.path.join(os.path.dirname(os.path.abspath(path or db.DATABASE)), file))
+        except OSError:
+            pass  # attached elsewhere (Windows); it is no longer listed, so nothing reads it
+    return moved
+
+
+def drop_empty(path=None):
+    """Delete the archives left without records, e.g. once their profiles moved to shards (see shards),
+    and their files. Returns the years dropped.
+    """
+    empty = querycache.query("SELECT year, file FROM archives WHERE records = 0", path=path)
+    if not empty or db.in_transaction(path):
+        return []
+    detach(path)
+    with db.transaction(path, ("archives",)) as c:
+        c.executemany("DELETE FROM archives WHERE year = ? AND records = 0", [(year,) for year, _ in empty])
+    root = os.path.dirname(os.path.abspath(path or db.DATABASE))
+    for _, file in empty:
+        for fname in (file, file + "-wal", file + "-shm"):
+            try:
+                os.remove(os.path.join(root, fname))
+            except OSError:
+                pass  # attached elsewhere (Windows); it is no longer listed, so nothing reads it
+    return [year for year, _ in empty]
+
+
+def forget_workouts(c, workout_ids):
+    """Delete the archived records of workouts about to be deleted, taking them out of the rollups.
+
+    The rollup triggers only see main, so this runs before the workouts go, on the caller's
+    connection and transaction, over the archives attached before it began.
+    """
+    marks = ",".join("?" * len(workout_ids))
+    for schema in _attached(c):
+        rollups.remove(c, f"{schema}.records", f"r.workout_id IN ({marks})", workout_ids)
+        c.execute(f"DELETE FROM {schema}.record_sets WHERE record_id IN "
+                  f"(SELECT id FROM {schema}.records WHERE workout_id IN ({marks}))", workout_ids)
+        c.execute(f"DELETE FROM {schema}.records WHERE workout_id IN ({marks})", workout_ids)
+        _count(c, schema)
+
+
+def last_session(c):
+    """Highest session_id in any archive (0 if none), so new sessions never reuse an archived one."""
+    return c.execute("SELECT COALESCE(MAX(last_session), 0) FROM archives").fetchone()[0]
+
+
+def maintain(path=None, pages=VACUUM_PAGES):
+    """Give free pages back to the filesystem and refresh the query planner's statistics.
+
+    Meant for a background thread. Databases created before incremental vacuum was turned on get
+    one full VACUUM to switch over, when a tenth or more of the file is free. Returns
+    {"freed": pages, "vacuumed": whether a full VACUUM ran}.
+    """
+    c = db.get_connection(path)
+    free, total = c.execute("SELECT freelist_count, page_count FROM pragma_freelist_count, pragma_page_count"
+                            ).fetchone()
+    vacuumed = False
+    if c.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        if free * 10 >= total > 0:
+            c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            c.execute("VACUUM")
+            vacuumed = True
+    elif free:
+        # Each step frees one page and returns no row, so execute() would stop after the first;
+        # executescript() steps it to the end
+        c.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    c.execute("PRAGMA analysis_limit = 1000")
+    c.execute("PRAGMA optimize")
+    remaining = c.execute("PRAGMA freelist_count").fetchone()[0]
+    if remaining < free:
+        # The file only shrinks once the WAL is copied back into it
+        c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {"freed": free - remaining, "vacuumed": vacuumed}
+
+
+def housekeeping(days=None, path=None):
+    """run() for records `days` old or older, then maintain(), as the app does in the background.
+    With `days` None nothing is archived; an interrupted move is still finished. Returns both results.
+    """
+    if days is None:
+        recover(path)
+        archived = {}
+    else:
+        archived = run(days, path)
+    return {"archived": archived, **maintain(path)}
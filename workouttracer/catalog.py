@@ -0,0 +1,207 @@
+"""Exercise catalog: one row per exercise with an integer id, aliases and muscle-group tags.
+
+workouts refer to exercises by id. Names match case-insensitively, and an alias resolves to the
+exercise it names, so "bench" and "Bench Press" share one id. `exercise_search` is an FTS5 index
+over names, aliases and tags for autocomplete; on SQLite builds without FTS5, search() falls back
+to prefix LIKE matching on names and aliases.
+"""
+import csv
+import json
+import os
+import re
+import sqlite3
+
+from . import db
+
+# Built into every catalog: (name, aliases, muscle groups)
+SEED = [
+    ("Bench Press", ["Bench", "Flat Bench", "Barbell Bench Press"], ["chest", "triceps", "shoulders"]),
+    ("Incline Bench Press", ["Incline Bench"], ["chest", "shoulders", "triceps"]),
+    ("Dumbbell Bench Press", ["DB Bench"], ["chest", "triceps", "shoulders"]),
+    ("Overhead Press", ["OHP", "Military Press", "Shoulder Press"], ["shoulders", "triceps"]),
+    ("Dumbbell Shoulder Press", ["DB Shoulder Press"], ["shoulders", "triceps"]),
+    ("Push-up", ["Pushup", "Press-up"], ["chest", "triceps", "shoulders"]),
+    ("Dip", ["Dips", "Parallel Bar Dip"], ["chest", "triceps"]),
+    ("Chest Fly", ["Dumbbell Fly", "Pec Fly", "Cable Fly"], ["chest"]),
+    ("Lateral Raise", ["Side Raise", "Lateral Raises"], ["shoulders"]),
+    ("Front Raise", [], ["shoulders"]),
+    ("Triceps Pushdown", ["Pushdown", "Cable Pushdown"], ["triceps"]),
+    ("Skull Crusher", ["Lying Triceps Extension"], ["triceps"]),
+    ("Overhead Triceps Extension", ["French Press"], ["triceps"]),
+    ("Close-Grip Bench Press", ["CGBP"], ["triceps", "chest"]),
+    ("Deadlift", ["Conventional Deadlift", "DL"], ["back", "hamstrings", "glutes"]),
+    ("Sumo Deadlift", [], ["glutes", "quads", "back"]),
+    ("Romanian Deadlift", ["RDL", "Stiff-Leg Deadlift"], ["hamstrings", "glutes", "back"]),
+    ("Pull-up", ["Pullup", "Chin-up", "Chinup"], ["back", "biceps"]),
+    ("Lat Pulldown", ["Pulldown"], ["back", "biceps"]),
+    ("Barbell Row", ["Bent-Over Row", "BB Row"], ["back", "biceps"]),
+    ("Dumbbell Row", ["One-Arm Row", "DB Row"], ["back", "biceps"]),
+    ("Seated Cable Row", ["Cable Row"], ["back", "biceps"]),
+    ("Face Pull", [], ["shoulders", "back"]),
+    ("Shrug", ["Shrugs"], ["traps"]),
+    ("Barbell Curl", ["Curl", "Biceps Curl"], ["biceps"]),
+    ("Dumbbell Curl", ["DB Curl"], ["biceps"]),
+    ("Hammer Curl", [], ["biceps", "forearms"]),
+    ("Back Squat", ["Squat", "Barbell Squat"], ["quads", "glutes"]),
+    ("Front Squat", [], ["quads", "glutes"]),
+    ("Leg Press", [], ["quads", "glutes"]),
+    ("Lunge", ["Lunges", "Walking Lunge"], ["quads", "glutes"]),
+    ("Bulgarian Split Squat", ["Split Squat", "BSS"], ["quads", "glutes"]),
+    ("Leg Extension", [], ["quads"]),
+    ("Leg Curl", ["Hamstring Curl"], ["hamstrings"]),
+    ("Hip Thrust", ["Barbell Hip Thrust"], ["glutes", "hamstrings"]),
+    ("Calf Raise", ["Standing Calf Raise"], ["calves"]),
+    ("Plank", [], ["core"]),
+    ("Hanging Leg Raise", ["Leg Raise"], ["core"]),
+    ("Cable Crunch", ["Crunch"], ["core"]),
+]
+
+_SEARCH_TRIGGERS = {
+    "trg_exercises_insert": ("AFTER INSERT ON exercises", "NEW.id"),
+    "trg_exercises_update": ("AFTER UPDATE ON exercises", "NEW.id"),
+    "trg_exercise_aliases_insert": ("AFTER INSERT ON exercise_aliases", "NEW.exercise_id"),
+    "trg_exercise_aliases_delete": ("AFTER DELETE ON exercise_aliases", "OLD.exercise_id"),
+}
+
+
+def _reindex(exercise_id):
+    # Replace one exercise's search row; only the FTS table is written, never the catalog itself
+    return (f"DELETE FROM exercise_search WHERE rowid = {exercise_id}; "
+            f"INSERT INTO exercise_search (rowid, name, aliases, muscles) "
+            f"SELECT id, name, (SELECT group_concat(alias, ' ') FROM exercise_aliases "
+            f"WHERE exercise_id = exercises.id), muscles FROM exercises WHERE id = {exercise_id};")
+
+
+def create(c):
+    """The catalog tables and their search index (when SQLite has FTS5)."""
+    c.execute('''CREATE TABLE IF NOT EXISTS exercises (
+                 id INTEGER PRIMARY KEY,
+                 name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                 muscles TEXT NOT NULL DEFAULT '' -- comma-separated muscle groups
+                 )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS exercise_aliases (
+                 alias TEXT PRIMARY KEY COLLATE NOCASE,
+                 exercise_id INTEGER NOT NULL,
+                 FOREIGN KEY(exercise_id) REFERENCES exercises(id)
+                 ) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_exercise_aliases_exercise ON exercise_aliases(exercise_id)")
+    try:
+        # Prefix indexes make "ben*" a lookup rather than a scan of every term
+        c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS exercise_search USING fts5("
+                  "name, aliases, muscles, prefix='1 2 3', tokenize='unicode61 remove_diacritics 2')")
+    except sqlite3.OperationalError:
+        pass  # no FTS5 in this SQLite; search() uses LIKE
+    else:
+        for name, (event, exercise_id) in _SEARCH_TRIGGERS.items():
+            c.execute(f"DROP TRIGGER IF EXISTS {name}")
+            c.execute(f"CREATE TRIGGER {name} {event} BEGIN {_reindex(exercise_id)} END")
+        c.execute("DROP TRIGGER IF EXISTS trg_exercises_delete")
+        c.execute("CREATE TRIGGER trg_exercises_delete AFTER DELETE ON exercises "
+                  "BEGIN DELETE FROM exercise_search WHERE rowid = OLD.id; END")
+
+
+def seed(c):
+    """Add the SEED exercises. Names already in the catalog keep their spelling and gain the aliases."""
+    for name, aliases, muscles in SEED:
+        add(c, name, aliases, muscles)
+
+
+def has_search(path=None):
+    return db.query_one("SELECT 1 FROM sqlite_master WHERE name = 'exercise_search'", path=path) is not None
+
+
+def lookup(c, name):
+    """Id of the exercise called `name` or with it as an alias, or None. Runs on the caller's connection."""
+    row = c.execute("SELECT id FROM exercises WHERE name = ?", (name,)).fetchone() \
+        or c.execute("SELECT exercise_id FROM exercise_aliases WHERE alias = ?", (name,)).fetchone()
+    return None if row is None else row[0]
+
+
+def intern(c, name):
+    """Id of the exercise `name` resolves to, adding it to the catalog if it is new."""
+    exercise_id = lookup(c, name)
+    if exercise_id is None:
+        exercise_id = c.execute("INSERT INTO exercises (name) VALUES (?)", (name,)).lastrowid
+    return exercise_id
+
+
+def add(c, name, aliases=(), muscles=()):
+    """Add an exercise, or merge aliases and muscle groups into the one `name` already resolves to.
+
+    Aliases that already belong to another exercise are left with it. Returns the exercise id.
+    """
+    exercise_id = intern(c, name)
+    if muscles:
+        current = c.execute("SELECT muscles FROM exercises WHERE id = ?", (exercise_id,)).fetchone()[0]
+        tags = [t for t in current.split(",") if t]
+        tags += [t for t in (m.strip().lower() for m in muscles) if t and t not in tags]
+        if ",".join(tags) != current:
+            c.execute("UPDATE exercises SET muscles = ? WHERE id = ?", (",".join(tags), exercise_id))
+    c.executemany("INSERT OR IGNORE INTO exercise_aliases (alias, exercise_id) "
+                  "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM exercises WHERE name = ?)",
+                  [(alias, exercise_id, alias) for alias in (a.strip() for a in aliases) if alias])
+    return exercise_id
+
+
+def _match_query(text):
+    # Every word typed must prefix-match some term; quoting keeps FTS5 syntax characters literal
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+
+def search(text, limit=20, path=None):
+    """[(id, name)] of exercises matching what has been typed so far, best match first.
+
+    Each word matches the start of a word in the name, an alias or a muscle group; name hits rank
+    above alias hits, which rank above muscle groups.
+    """
+    match = _match_query(text)
+    if not match:
+        return []
+    if has_search(path):
+        # The index holds the names too, so every hit is ranked without a join back to exercises
+        return db.query('''SELECT rowid, name FROM exercise_search WHERE exercise_search MATCH ?
+                           ORDER BY bm25(exercise_search, 10.0, 5.0, 1.0) LIMIT ?''',
+                        (match, limit), path)
+    prefix = text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return db.query('''SELECT id, name FROM exercises
+                       WHERE name LIKE ? ESCAPE '\\'
+                          OR id IN (SELECT exercise_id FROM exercise_aliases WHERE alias LIKE ? ESCAPE '\\')
+                       ORDER BY name LIMIT ?''', (prefix, prefix, limit), path)
+
+
+def info(exercise_id, path=None):
+    """(name, [aliases], [muscle groups]) of one exercise, or None."""
+    row = db.query_one("SELECT name, muscles FROM exercises WHERE id = ?", (exercise_id,), path)
+    if row is None:
+        return None
+    aliases = [a for (a,) in db.query("SELECT alias FROM exercise_aliases WHERE exercise_id = ? ORDER BY alias",
+                                      (exercise_id,), path)]
+    return row[0], aliases, [t for t in row[1].split(",") if t]
+
+
+def _split(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [part for part in str(value or "").split(";") if part.strip()]
+
+
+def import_catalog(path):
+    """Load exercises from CSV or JSON with name, aliases and muscles (lists, or ';'-separated in CSV).
+
+    Entries merge into existing exercises by name or alias. Returns the number of entries read.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if ext == ".csv":
+            entries = list(csv.DictReader(f))
+        elif ext == ".json":
+            entries = json.load(f)
+        else:
+            raise ValueError(f"Unsupported catalog format: {path}")
+    with db.transaction(tables=("exercises", "exercise_aliases", "exercise_search")) as c:
+        for line, entry in enumerate(entries, 1):
+            name = str(entry.get("name") or "").strip()
+            if not name:
+                raise ValueError(f"{path}, entry {line}: name is missing")
+            add(c, name, _split(entry.get("aliases")), _split(entry.get("muscles")))
+    return len(entries)
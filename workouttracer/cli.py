@@ -0,0 +1,397 @@
+import argparse
+import sys
+from datetime import datetime
+
+from . import catalog, db, instrument, shards, store
+from .schema import init_db
+
+
+def _profile(name, create=False):
+    pid = store.find_profile(name)
+    if pid is None:
+        if not create:
+            raise ValueError(f"No such profile: {name}")
+        store.create_profile(name)
+        pid = store.find_profile(name)
+    return pid
+
+
+def cmd_profiles(args):
+    for pid, name in db.query("SELECT id, name FROM profiles ORDER BY name"):
+        print(f"{pid}\t{name}")
+
+
+def cmd_add_exercise(args):
+    store.add_workout(_profile(args.profile, create=True), args.day, args.exercise, args.sets)
+
+
+def cmd_log(args):
+    # Each row is "exercise,sets,reps,weight[,rest,rpe,heart_rate]"; omitted trailing fields are 0
+    rows = []
+    for text in args.rows:
+        fields = [f.strip() for f in text.split(",")]
+        rows.append(fields + ["0"] * (len(store.SESSION_COLUMNS) - len(fields)))
+    date = datetime.fromisoformat(args.date) if args.date else None
+    pid = _profile(args.profile)
+    count = store.save_session(pid, args.day, rows, date)
+    print(f"{count} records saved")
+    _refresh_snapshots([pid])
+
+
+def cmd_summary(args):
+    from . import analytics
+
+    summary = analytics.period_summary(_profile(args.profile), args.period)
+    if not summary:
+        print("No data to summarize.")
+        return
+    print(f"{args.period.capitalize()} Summary:\n")
+    for start, volume in summary:
+        print(f"{start}    {volume:.1f}")
+    advice = analytics.suggestion(summary)
+    if advice:
+        print("\n" + advice)
+
+
+def cmd_analytics(args):
+    from . import analytics
+
+    result = analytics.report(_profile(args.profile), args.day, args.formula)
+    if not result["exercises"]:
+        print("No data to analyze.")
+        return
+    print(analytics.format_report(result))
+
+
+def cmd_export(args):
+    from . import export
+
+    export.export(_profile(args.profile), args.file, args.format, args.start, args.end, args.day)
+    print(f"Data exported to {args.file}")
+
+
+def cmd_import(args):
+    for fname in args.files:
+        print(f"{fname}: {store.import_records(fname)} records imported")
+    _refresh_snapshots()
+
+
+def _refresh_snapshots(profile_ids=None):
+    # After writes, when snapshots are on (--snapshots or WORKOUTTRACER_SNAPSHOTS=1)
+    from . import snapshot
+
+    if snapshot.ENABLED:
+        _save_snapshots(profile_ids)
+
+
+def _save_snapshots(profile_ids=None):
+    from . import columns
+
+    if profile_ids is None:
+        profile_ids = [pid for (pid,) in db.query("SELECT id FROM profiles ORDER BY id")]
+    return {pid: columns.save_snapshot(pid) for pid in profile_ids}
+
+
+def cmd_snapshot(args):
+    from . import snapshot
+
+    profile_ids = [_profile(name) for name in args.profiles] or None
+    for pid, count in _save_snapshots(profile_ids).items():
+        print(f"profile {pid}: {count} sets written to {snapshot.directory(shards.database(pid))}")
+
+
+def cmd_exercises(args):
+    for eid, name in catalog.search(args.text, args.limit):
+        _, aliases, muscles = catalog.info(eid)
+        print(f"{eid}\t{name}\t{', '.join(aliases)}\t{', '.join(muscles)}")
+
+
+def cmd_import_exercises(args):
+    for fname in args.files:
+        print(f"{fname}: {catalog.import_catalog(fname)} exercises read")
+
+
+def cmd_report(args):
+    from . import reports
+
+    files = reports.generate(args.month, args.out, args.format, args.workers, formula=args.formula)
+    # One file per profile and format
+    print(f"{len(files) // len(args.format)} reports ({len(files)} files) written to {args.out}")
+
+
+def cmd_sync(args):
+    from . import schema, sync
+
+    schema.init_db(args.other)
+    for direction, stats in zip(("to", "from"), sync.sync(db.DATABASE, args.other)):
+        print(f"{direction} {args.other}: {stats['applied']} applied, {stats['skipped']} unchanged, "
+              f"{stats['conflicts']} conflicts")
+
+
+def cmd_sync_export(args):
+    from . import sync
+
+    since = sync.export_for(args.peer) if args.peer else args.since
+    bundle = sync.write_bundle(args.file, since, peer=args.peer)
+    print(f"{len(bundle['entries'])} changes after {since} written to {args.file} (cursor {bundle['cursor']})")
+
+
+def cmd_sync_apply(args):
+    from . import sync
+
+    for fname in args.files:
+        stats = sync.apply_changes(sync.read_bundle(fname))
+        print(f"{fname}: {stats['applied']} applied, {stats['skipped']} unchanged, {stats['conflicts']} conflicts")
+
+
+def cmd_sync_status(args):
+    from . import sync
+
+    print(f"device {sync.device_id()}, last change {sync.cursor()}")
+    for device, received, acked in sync.peers():
+        print(f"peer {device}: received up to {received}, acknowledged up to {acked}")
+    for _, table, key, device, winner, _, _, _ in sync.conflicts():
+        print(f"conflict on {table} {key} with {device}: {winner} version kept")
+
+
+def _databases():
+    # Main, then every shard
+    return [None] + [target for target in shards.databases() if target is not None]
+
+
+def cmd_archive(args):
+    from . import archive
+
+    for target in _databases():
+        moved = archive.run(args.days, target)
+        for year, count in moved.items():
+            print(f"{year}: {count} records moved to {archive.archive_file(year, target)}")
+        if not moved:
+            print(f"{target or db.DATABASE}: nothing older than {args.days} days left to archive")
+
+
+def cmd_auto_archive(args):
+    from . import archive
+
+    if args.days == "off":
+        archive.set_horizon(None)
+    elif args.days is not None:
+        if not args.days.isdigit():
+            raise ValueError(f"Expected a number of days or \"off\", not {args.days!r}")
+        archive.set_horizon(int(args.days))
+    days = archive.horizon()
+    print("background archiving is off" if days is None else
+          f"the app archives records older than {days} days in the background")
+
+
+def cmd_maintain(args):
+    from . import archive
+
+    for target in _databases():
+        result = archive.maintain(target)
+        print(f"{target or db.DATABASE}: {result['freed']} free pages released"
+              + (" (full VACUUM)" if result["vacuumed"] else "") + ", statistics refreshed")
+
+
+def cmd_rebuild_rollups(args):
+    from . import archive, rollups
+
+    profile_ids = [_profile(name) for name in args.profiles] or None
+    for target, ids in shards.databases(profile_ids).items():
+        # Archived records stay counted, so the rebuild reads them too
+        archive.attach(path=target)
+        with db.transaction(target, ("volume_rollups",)) as c:
+            for pid in ids:
+                rollups.rebuild(c, pid, records="all_records")
+        print(f"{target or db.DATABASE}: rollups rebuilt for {len(ids)} profiles")
+
+
+def cmd_shard_split(args):
+    profile_ids = [_profile(name) for name in args.profiles] or None
+    moved = shards.split(profile_ids)
+    for pid, file in moved.items():
+        print(f"profile {pid} moved to {file}")
+    print(f"{len(moved)} profiles split out; new profiles get a shard of their own")
+
+
+def cmd_shard_merge(args):
+    profile_ids = [_profile(name) for name in args.profiles] or None
+    for pid, count in shards.merge(profile_ids).items():
+        print(f"profile {pid}: {count} records merged back")
+
+
+def cmd_totals(args):
+    totals = shards.totals(args.start, args.end)
+    print(f"{'profile':<20} {'volume':>12} {'sets':>8} {'reps':>9} {'records':>8}")
+    for pid, name in store.get_profiles():
+        volume, sets, reps, records = totals.get(pid, (0, 0, 0, 0))
+        print(f"{name:<20} {volume or 0:>12.1f} {sets or 0:>8} {reps or 0:>9} {records or 0:>8}")
+
+
+def cmd_serve(args):
+    from . import server
+
+    server.serve(args.host, args.port, args.readers)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="workouttracer", description="Workout tracker command line.")
+    parser.add_argument("--db", default=db.DATABASE, help="database file (default: %(default)s)")
+    parser.add_argument("--cache-stats", action="store_true", help="print query cache statistics on exit")
+    parser.add_argument("--instrument", nargs="?", const="-", metavar="FILE",
+                        help="time SQL statements and other hot paths; print the stats on exit, or write "
+                             "them to FILE as JSON (also enabled by WORKOUTTRACER_INSTRUMENT=1)")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="read set columns from Arrow snapshots and refresh them after writes (also enabled "
+                             "by WORKOUTTRACER_SNAPSHOTS=1)")
+    parser.add_argument("--cprofile", metavar="FILE", help="run the command under cProfile and save the stats to FILE")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("profiles", help="list profiles")
+    p.set_defaults(func=cmd_profiles)
+
+    p = sub.add_parser("add-exercise", help="add an exercise to a day (creates the profile if needed)")
+    p.add_argument("profile")
+    p.add_argument("day", help="day type, e.g. push/pull/legs")
+    p.add_argument("exercise")
+    p.add_argument("--sets", type=int, default=3)
+    p.set_defaults(func=cmd_add_exercise)
+
+    p = sub.add_parser("log", help="log a session")
+    p.add_argument("profile")
+    p.add_argument("day")
+    p.add_argument("rows", nargs="+", metavar="ROW", help="exercise,sets,reps,weight[,rest,rpe,heart_rate]")
+    p.add_argument("--date", help="session time, ISO format (default: now)")
+    p.set_defaults(func=cmd_log)
+
+    p = sub.add_parser("summary", help="weekly or monthly volume summary")
+    p.add_argument("profile")
+    p.add_argument("--period", choices=["weekly", "monthly"], default="weekly")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("analytics", help="estimated 1RM, PRs, progression and training load per exercise")
+    p.add_argument("profile")
+    p.add_argument("--day", help="only this day type")
+    p.add_argument("--formula", choices=["epley", "brzycki"], default="epley", help="1RM estimate")
+    p.set_defaults(func=cmd_analytics)
+
+    p = sub.add_parser("export", help="export records to xlsx/pdf/csv/parquet")
+    p.add_argument("profile")
+    p.add_argument("file")
+    p.add_argument("--format", choices=["xlsx", "pdf", "csv", "parquet"], help="default: from the file extension")
+    p.add_argument("--from", dest="start", help="first date, YYYY-MM-DD")
+    p.add_argument("--to", dest="end", help="last date, YYYY-MM-DD")
+    p.add_argument("--day", help="only this day type")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="bulk-import CSV/JSON/JSON-lines logs")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("exercises", help="search the exercise catalog by name, alias or muscle group")
+    p.add_argument("text")
+    p.add_argument("--limit", type=int, default=20)
+    p.set_defaults(func=cmd_exercises)
+
+    p = sub.add_parser("import-exercises", help="add exercises, aliases and muscle groups from CSV/JSON")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=cmd_import_exercises)
+
+    p = sub.add_parser("report", help="monthly PDF/XLSX reports for every profile, built in parallel")
+    p.add_argument("--month", required=True, help="YYYY-MM")
+    p.add_argument("--out", default="reports", help="output directory (default: %(default)s)")
+    p.add_argument("--format", nargs="+", choices=["pdf", "xlsx"], default=["pdf"])
+    p.add_argument("--workers", type=int, help="worker processes (default: one per CPU, 1 = no pool)")
+    p.add_argument("--formula", choices=["epley", "brzycki"], default="epley", help="1RM estimate")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("sync", help="two-way sync with another database file")
+    p.add_argument("other")
+    p.set_defaults(func=cmd_sync)
+
+    p = sub.add_parser("sync-export", help="write the changes after a cursor to a delta bundle")
+    p.add_argument("file")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--since", type=int, default=0, help="change number (default: everything)")
+    group.add_argument("--peer", help="everything that device hasn't confirmed receiving")
+    p.set_defaults(func=cmd_sync_export)
+
+    p = sub.add_parser("sync-apply", help="apply delta bundles from another database")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=cmd_sync_apply)
+
+    p = sub.add_parser("sync-status", help="device id, sync peers and conflicts")
+    p.set_defaults(func=cmd_sync_status)
+
+    p = sub.add_parser("snapshot", help="write Arrow snapshots of profiles' sets (default: every profile)")
+    p.add_argument("profiles", nargs="*")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser("archive", help="move old records into yearly archive databases")
+    p.add_argument("--days", type=int, default=365, help="archive records older than this (default: %(default)s)")
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("auto-archive", help="show, set or turn off (\"off\") the app's background archiving horizon")
+    p.add_argument("days", nargs="?", help="archive records older than this many days, or \"off\"")
+    p.set_defaults(func=cmd_auto_archive)
+
+    p = sub.add_parser("maintain", help="release free pages and refresh query planner statistics")
+    p.set_defaults(func=cmd_maintain)
+
+    p = sub.add_parser("rebuild-rollups", help="recompute profiles' (default: all) volume rollups from their records")
+    p.add_argument("profiles", nargs="*")
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("shard-split", help="move profiles (default: all) into per-profile shard databases")
+    p.add_argument("profiles", nargs="*")
+    p.set_defaults(func=cmd_shard_split)
+
+    p = sub.add_parser("shard-merge", help="move sharded profiles (default: all) back into the main database")
+    p.add_argument("profiles", nargs="*")
+    p.set_defaults(func=cmd_shard_merge)
+
+    p = sub.add_parser("totals", help="volume, sets and reps of every profile, queried across shards in parallel")
+    p.add_argument("--from", dest="start", help="first date, YYYY-MM-DD")
+    p.add_argument("--to", dest="end", help="last date, YYYY-MM-DD")
+    p.set_defaults(func=cmd_totals)
+
+    p = sub.add_parser("serve", help="run the local HTTP/JSON API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    p.add_argument("--readers", type=int, default=4, help="reader threads (default: %(default)s)")
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.instrument:
+        instrument.enable()
+    if args.snapshots:
+        from . import snapshot
+
+        snapshot.enable()
+    db.DATABASE = args.db
+    init_db()
+    try:
+        with instrument.timed(f"cli.{args.command}"):
+            if args.cprofile:
+                with instrument.profiled(args.cprofile):
+                    args.func(args)
+            else:
+                args.func(args)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.cache_stats:
+            from . import querycache
+
+            stats = querycache.stats()
+            print("query cache: " + ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                              for k, v in stats.items()), file=sys.stderr)
+        if args.instrument == "-" or (args.instrument is None and instrument.ENABLED):
+            print(instrument.format_table(), file=sys.stderr)
+        elif args.instrument:
+            instrument.dump(args.instrument)
+        db.close_all()
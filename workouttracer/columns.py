@@ -0,0 +1,235 @@
+"""Per-profile, in-memory columns of every logged set.
+
+The first read loads a profile's sets from SQLite into NumPy arrays. After a write, only sets of
+records newer than the last one loaded are fetched and appended. Trends, summaries and analytics
+read from these arrays instead of querying SQLite again. Sets of archived records (see archive) are
+only loaded once a read asks for them. With snapshots on (see snapshot), a cold load starts from the
+profile's memory-mapped snapshot and only queries the sets added after it.
+"""
+import threading
+from itertools import chain
+
+import numpy as np
+
+from . import archive, db, shards, snapshot
+
+# Column -> dtype. `date` is seconds since 1970-01-01 (local wall-clock time), as records stores it.
+# rpe and heart_rate are NaN where not logged; record_id is the set's record.
+FIELDS = {
+    "date": np.int64,
+    "workout_id": np.int64,
+    "reps": np.float64,
+    "weight": np.float64,
+    "rpe": np.float64,
+    "heart_rate": np.float64,
+    "volume": np.float64,
+    "record_id": np.int64,
+}
+
+SETS_QUERY = """
+    SELECT r.date, r.workout_id, s.reps, s.weight, s.rpe, s.heart_rate,
+           s.volume, r.id
+    FROM records r
+    JOIN workouts w ON r.workout_id = w.id
+    JOIN record_sets s ON s.record_id = r.id
+    WHERE w.profile_id=? AND r.id > ?
+    ORDER BY r.id, s.set_no
+"""
+
+# The same sets from one attached archive ({schema})
+ARCHIVED_SETS_QUERY = """
+    SELECT r.date, r.workout_id, s.reps, s.weight, s.rpe, s.heart_rate,
+           s.volume, r.id
+    FROM {schema}.records r
+    JOIN workouts w ON r.workout_id = w.id
+    JOIN {schema}.record_sets s ON s.record_id = r.id
+    WHERE w.profile_id=?
+    ORDER BY r.id, s.set_no
+"""
+
+# Count and column sums of the profile's sets in one schema up to a record id, to check the buffers
+# against after another connection wrote the database
+FINGERPRINT_QUERY = """
+    SELECT COUNT(*), TOTAL(r.date), TOTAL(r.workout_id), TOTAL(s.reps), TOTAL(s.weight), TOTAL(s.rpe),
+           TOTAL(s.heart_rate), TOTAL(s.volume), TOTAL(r.id)
+    FROM {schema}.records r
+    JOIN workouts w ON r.workout_id = w.id
+    JOIN {schema}.record_sets s ON s.record_id = r.id
+    WHERE w.profile_id=? AND r.id <= ?
+"""
+
+WORKOUT_EXERCISES_QUERY = """
+    SELECT w.id, w.day_type, w.exercise_id, e.name FROM workouts w LEFT JOIN exercises e ON e.id = w.exercise_id
+    WHERE w.profile_id=?
+"""
+
+# Tables whose writes can change a profile's sets
+TABLES = ("workouts", "exercises", "records", "record_sets")
+
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+
+class ProfileColumns:
+    """Growable column arrays for one profile. Use for_profile() rather than constructing directly."""
+
+    def __init__(self, profile_id, path=None):
+        self.profile_id = profile_id
+        self.path = path
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.buffers = {name: np.empty(0, dtype) for name, dtype in FIELDS.items()}
+        self.size = 0
+        self.last_record = 0
+        self.generation = None
+        # Whether the archived sets are in the buffers, and the generation of the archives table then
+        self.archived = False
+        self.archives = None
+        # db.external_generation() the buffers were last checked at
+        self.external = None
+        # {workout id: (day_type, exercise id)} and {exercise id: name}
+        self.workouts = {}
+        self.exercises = {}
+
+    def refresh(self, archived=True):
+        """Append any sets written since the last refresh, and the archived ones if `archived` and not
+        loaded yet. Cheap when nothing has changed.
+        """
+        with self.lock:
+            generation = tables_generation(self.path)
+            if generation == self.generation and (self.archived or not archived):
+                return
+            workouts, exercises = {}, {}
+            for wid, day_type, exercise_id, name in db.query(WORKOUT_EXERCISES_QUERY, (self.profile_id,), self.path):
+                workouts[wid] = (day_type, exercise_id)
+                exercises[exercise_id] = name
+            archives = db.table_generation("archives", self.path)
+            external = db.external_generation(self.path)
+            # A write from another connection bumps every table, archives included; whether it changed
+            # sets the buffers already hold is told by their fingerprint instead
+            moved = archives != self.archives and archives != external
+            if (self.workouts.keys() - workouts.keys() or moved
+                    or external != self.external and self.size and not self._matches()):
+                # A workout was deleted, taking its sets with it, records moved between main and the
+                # archives, or loaded sets were changed elsewhere; appends can't express that
+                self.size = self.last_record = 0
+                self.archived = False
+            self.workouts = workouts
+            self.exercises = exercises
+            self.archives = archives
+            self.external = external
+            if self.size == 0 and snapshot.ENABLED:
+                loaded = snapshot.load(self.profile_id, self.path)
+                if loaded is not None:
+                    # The snapshot covers the archived sets too
+                    self.buffers, self.last_record = loaded
+                    self.size = len(self.buffers["date"])
+                    self.archived = True
+            if archived and not self.archived:
+                schemas = archive.attach(path=self.path)
+                if schemas:
+                    # Archived sets go first, then main's are read again after them
+                    self.size = self.last_record = 0
+                for schema in schemas:
+                    self._append_rows(db.query(ARCHIVED_SETS_QUERY.format(schema=schema), (self.profile_id,),
+                                               self.path), archived=True)
+                self.archived = True
+            self._append_rows(db.query(SETS_QUERY, (self.profile_id, self.last_record), self.path))
+            self.generation = generation
+
+    def _matches(self):
+        # Whether the buffers still hold exactly the sets the database has up to last_record (and every
+        # archived set, if those are loaded)
+        schemas = [("main", self.last_record)]
+        if self.archived:
+            schemas += [(schema, 2 ** 63 - 1) for schema in archive.attach(path=self.path)]
+        stored = np.zeros(len(FIELDS) + 1)
+        for schema, last in schemas:
+            stored += db.query_one(FINGERPRINT_QUERY.format(schema=schema), (self.profile_id, last), self.path)
+        loaded = [self.size] + [np.nansum(self.buffers[name][:self.size]) for name in FIELDS]
+        return np.allclose(stored, loaded, rtol=1e-12, atol=1e-6)
+
+    def _append_rows(self, rows, archived=False):
+        if rows:
+            width = len(FIELDS)
+            table = np.fromiter(chain.from_iterable(rows), dtype=float, count=len(rows) * width)
+            self._append(table.reshape(-1, width), archived)
+
+    def _append(self, table, archived=False):
+        needed = self.size + len(table)
+        capacity = len(self.buffers["date"])
+        if needed > capacity or not self.buffers["date"].flags.writeable:
+            # Grow geometrically so a run of small appends stays amortized O(1) per set. Buffers loaded
+            # from a snapshot are read-only mappings and get copied on the first append.
+            capacity = max(needed, 2 * capacity, 1024)
+            for name, buf in self.buffers.items():
+                grown = np.empty(capacity, buf.dtype)
+                grown[:self.size] = buf[:self.size]
+                self.buffers[name] = grown
+        for i, name in enumerate(FIELDS):
+            self.buffers[name][self.size:needed] = table[:, i]
+        self.size = needed
+        if not archived:
+            # Newer sets in main are fetched by record id; archived ones never grow that way
+            self.last_record = int(table[-1, -1])
+
+    def arrays(self, day_type=None, archived=True):
+        """Current columns as {name: array}, optionally only sets of one day type. With archived=False
+        the sets of archived records may be missing; for reads of recent dates.
+
+        The arrays are views of the buffers (or copies when filtered); callers must not modify them.
+        """
+        self.refresh(archived)
+        with self.lock:
+            out = {name: buf[:self.size] for name, buf in self.buffers.items()}
+            if day_type is not None:
+                ids = [wid for wid, (dt, _) in self.workouts.items() if dt == day_type]
+                mask = np.isin(out["workout_id"], ids)
+                out = {name: column[mask] for name, column in out.items()}
+            return out
+
+
+def for_profile(profile_id, path=None):
+    """The profile's set columns, read from its shard when it has one (see shards)."""
+    path = shards.database(profile_id, path)
+    key = (path or db.DATABASE, int(profile_id))
+    with _profiles_lock:
+        cols = _profiles.get(key)
+        if cols is None:
+            cols = _profiles[key] = ProfileColumns(int(profile_id), path)
+    return cols
+
+
+def invalidate(profile_id=None):
+    """Forget cached sets after rows were deleted or rewritten, which appends can't pick up."""
+    with _profiles_lock:
+        targets = [cols for (_, pid), cols in _profiles.items() if profile_id is None or pid == int(profile_id)]
+    for cols in targets:
+        with cols.lock:
+            cols.clear()
+
+
+def save_snapshot(profile_id, path=None):
+    """Write the profile's sets to its snapshot (see snapshot). Returns the number of sets written."""
+    # Taken first: a write racing the read below is in the columns and also after `seq`, which at
+    # worst makes the snapshot look stale
+    path = shards.database(profile_id, path)
+    seq = snapshot.cursor(path)
+    return snapshot.save(profile_id, for_profile(profile_id, path).arrays(), seq, path)
+
+
+def tables_generation(path=None):
+    """Changes whenever a write commits to any of TABLES."""
+    return tuple(db.table_generation(table, path) for table in TABLES)
+
+
+def profile_generation(profile_id, path=None):
+    """tables_generation() of the database holding the profile's sets."""
+    return tables_generation(shards.database(profile_id, path))
+
+
+def days(dates):
+    """Day numbers (days since 1970-01-01) for an array of `date` seconds."""
+    return dates // 86400
@@ -0,0 +1,274 @@
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from . import instrument
+
+DATABASE = "workouts.db"
+# When set, new connections open the database read-only (report worker processes)
+READ_ONLY = False
+
+# Applied to every new connection. WAL lets readers run alongside the writer,
+# NORMAL sync is safe under WAL, and the larger page cache / mmap window keep
+# hot pages of the records table resident between queries.
+PRAGMAS = (
+    # Only takes effect on a new, empty database, and must come before WAL; older files switch
+    # over in archive.maintain()
+    ("auto_vacuum", "INCREMENTAL"),
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -64000),  # negative = KiB, so ~64 MB
+    ("mmap_size", 268435456),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+)
+
+# Size of sqlite3's per-connection prepared statement LRU
+STATEMENT_CACHE_SIZE = 256
+
+# Tables that triggers write to whenever the key table is written (see schema, rollups and catalog)
+WRITE_CASCADES = {
+    "records": ("record_sets", "volume_rollups"),
+    "workouts": ("volume_rollups",),
+    "exercises": ("exercise_search",),
+    "exercise_aliases": ("exercise_search",),
+}
+
+_local = threading.local()
+_registry_lock = threading.Lock()
+_registry = []
+# Bumped by close_all(); other threads drop the connections they opened before it
+_epoch = 0
+# Bumped on every committed write transaction in this process; readers use it to spot stale caches
+_generation = 0
+_generation_lock = threading.Lock()
+# (path, table) -> _generation of the last commit that wrote the table; path -> last commit that
+# wrote tables it couldn't name, which counts as writing all of them
+_table_generations = {}
+_path_generations = {}
+# path -> _generation at which a commit by another connection (thread, process or tool) was last noticed
+_external_generations = {}
+
+_WRITE_TARGET = re.compile(r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)"
+                           r"\s+[\"'`\[]?(\w+)", re.IGNORECASE)
+
+
+def connect(path=None, read_only=None):
+    """Open a new, tuned connection. Most callers want get_connection()."""
+    path = path or DATABASE
+    options = dict(cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False, isolation_level=None,
+                   factory=instrument.Connection if instrument.ENABLED else sqlite3.Connection)
+    if READ_ONLY if read_only is None else read_only:
+        conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True, **options)
+        pragmas = [(name, value) for name, value in PRAGMAS if name not in ("auto_vacuum", "journal_mode")]
+    else:
+        conn = sqlite3.connect(path, **options)
+        pragmas = PRAGMAS
+    for name, value in pragmas:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def _connections():
+    # This thread's {path: connection}
+    if getattr(_local, "epoch", None) != _epoch:
+        _local.connections = {}
+        # path -> PRAGMA data_version last read on this thread's connection
+        _local.data_versions = {}
+        _local.epoch = _epoch
+    return _local.connections
+
+
+def get_connection(path=None):
+    """Return this thread's long-lived connection to `path` (default DATABASE)."""
+    path = path or DATABASE
+    conns = _connections()
+    conn = conns.get(path)
+    if conn is None:
+        conn = connect(path)
+        conn.set_progress_handler(*progress_handler())
+        conns[path] = conn
+        with _registry_lock:
+            _registry.append(conn)
+    return conn
+
+
+def progress_handler():
+    """(handler, steps) that progress() installed on this thread's connections, or (None, 0)."""
+    return getattr(_local, "progress", None) or (None, 0)
+
+
+def _set_progress(handler, steps):
+    _local.progress = None if handler is None else (handler, steps)
+    for conn in _connections().values():
+        conn.set_progress_handler(handler, steps)
+
+
+@contextmanager
+def progress(handler, steps):
+    """Call `handler` every `steps` SQLite VM steps on each of this thread's connections, including
+    ones get_connection() opens inside the block; a true result interrupts the running statement.
+    """
+    previous = progress_handler()
+    _set_progress(handler, steps)
+    try:
+        yield
+    finally:
+        _set_progress(*previous)
+
+
+def close_all():
+    """Close every connection opened through get_connection(), on any thread."""
+    global _epoch
+    with _registry_lock:
+        conns = list(_registry)
+        _registry.clear()
+        _epoch += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.__dict__.clear()
+
+
+def close(path=None):
+    """Close this thread's connection to `path`, e.g. before the file is removed."""
+    path = path or DATABASE
+    conn = _connections().pop(path, None)
+    _local.data_versions.pop(path, None)
+    if conn is not None:
+        with _registry_lock:
+            _registry.remove(conn)
+        conn.close()
+
+
+@contextmanager
+def transaction(path=None, tables=None):
+    """Run the block in one explicit write transaction (nested calls join the outer one).
+
+    `tables` names the tables the block writes, so caches of other tables stay valid. Leaving it
+    out marks every table of the database as written when the transaction commits.
+    """
+    path = path or DATABASE
+    conn = get_connection(path)
+    depths = getattr(_local, "tx_depth", None)
+    if depths is None:
+        depths = _local.tx_depth = {}
+        _local.tx_tables = {}
+    depth = depths.get(path, 0)
+    if depth == 0:
+        conn.execute("BEGIN IMMEDIATE")
+        _local.tx_tables[path] = set()
+    written = _local.tx_tables
+    if tables is None:
+        written[path] = None
+    elif written[path] is not None:
+        written[path].update(tables)
+    depths[path] = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        depths[path] = depth
+        if depth == 0:
+            conn.execute("ROLLBACK")
+        raise
+    depths[path] = depth
+    if depth == 0:
+        conn.execute("COMMIT")
+        _committed(path, written.pop(path))
+
+
+def in_transaction(path=None):
+    """Whether this thread is inside transaction() on `path`."""
+    depths = getattr(_local, "tx_depth", None)
+    return bool(depths and depths.get(path or DATABASE, 0))
+
+
+def _committed(path, tables):
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        if tables is None:
+            _path_generations[path] = _generation
+            return
+        for table in tables:
+            for name in (table,) + WRITE_CASCADES.get(table, ()):
+                _table_generations[(path, name)] = _generation
+
+
+def generation():
+    return _generation
+
+
+def poll(path=None):
+    """Notice commits to `path` made by any other connection since this thread last looked.
+
+    SQLite bumps a connection's data_version whenever another connection commits; which tables
+    that commit wrote can't be known, so it counts as writing all of them. A connection's first
+    poll counts too, as nothing tells what changed before it was opened.
+    """
+    global _generation
+    path = path or DATABASE
+    version = get_connection(path).execute("PRAGMA data_version").fetchone()[0]
+    seen = _local.data_versions
+    if seen.get(path) != version:
+        seen[path] = version
+        with _generation_lock:
+            _generation += 1
+            _path_generations[path] = _external_generations[path] = _generation
+
+
+def external_generation(path=None):
+    """Generation at which a commit to `path` from outside this thread's connection was last noticed."""
+    path = path or DATABASE
+    poll(path)
+    return _external_generations.get(path, 0)
+
+
+def table_generation(table, path=None):
+    """Generation of the last commit that wrote `table`; it changes on every such write, including
+    ones other processes make (seen through poll()).
+    """
+    path = path or DATABASE
+    poll(path)
+    return max(_table_generations.get((path, table), 0), _path_generations.get(path, 0))
+
+
+def written_table(sql):
+    """The table an INSERT/UPDATE/DELETE statement writes, or None if it can't be told from the SQL."""
+    match = _WRITE_TARGET.match(sql)
+    return match.group(1).lower() if match else None
+
+
+def query(sql, params=(), path=None):
+    return get_connection(path).execute(sql, params).fetchall()
+
+
+def query_one(sql, params=(), path=None):
+    return get_connection(path).execute(sql, params).fetchone()
+
+
+def _tables_of(sql):
+    table = written_table(sql)
+    return None if table is None else (table,)
+
+
+def execute(sql, params=(), path=None):
+    with transaction(path, _tables_of(sql)) as conn:
+        return conn.execute(sql, params)
+
+
+def executemany(sql, rows, path=None):
+    with transaction(path, _tables_of(sql)) as conn:
+        return conn.executemany(sql, rows)
+
+
+def read_frame(sql, params=(), path=None):
+    import pandas as pd
+    with instrument.timed("pandas.read_frame") as span:
+        frame = pd.read_sql_query(sql, get_connection(path), params=tuple(params))
+        span.rows = len(frame)
+    return frame
@@ -0,0 +1,235 @@
+import csv
+import heapq
+import os
+from itertools import islice
+from operator import itemgetter
+
+from . import archive, db, instrument, shards
+
+COLUMNS = ["profile", "day_type", "exercise", "sets", "date", "reps", "weight", "rest", "rpe", "heart_rate",
+           "volume"]
+
+# Rows fetched from the cursor per step; memory use is bounded by this, not by history size
+CHUNK_SIZE = 5000
+# Rows per reportlab Table, sized so one table fits a landscape letter page
+PDF_ROWS_PER_TABLE = 40
+
+FORMATS = {
+    "xlsx": "Excel Files (*.xlsx)",
+    "pdf": "PDF Files (*.pdf)",
+    "csv": "CSV Files (*.csv)",
+    "parquet": "Parquet Files (*.parquet)",
+}
+
+
+def _noop(done, total):
+    pass
+
+
+def _filters(profile_id, start=None, end=None, day_type=None):
+    where = "w.profile_id=?"
+    params = [profile_id]
+    # records.date is epoch seconds; the bounds convert once per statement, not per row
+    if start is not None:
+        where += " AND r.date >= CAST(strftime('%s', ?) AS INTEGER)"
+        params.append(start)
+    if end is not None:
+        where += " AND r.date < CAST(strftime('%s', ?, '+1 day') AS INTEGER)"
+        params.append(end)
+    if day_type is not None:
+        where += " AND w.day_type=?"
+        params.append(day_type)
+    return where, params
+
+
+def _schemas(start=None, end=None, path=None):
+    # main, then the archives of the years the range reaches (attached on first use)
+    if not archive.needed(start, path):
+        return ["main"]
+    return ["main"] + archive.attach(start and int(start[:4]), end and int(end[:4]), path)
+
+
+def count_rows(profile_id, start=None, end=None, day_type=None):
+    where, params = _filters(profile_id, start, end, day_type)
+    path = shards.database(profile_id)
+    return sum(db.query_one(f"SELECT COUNT(*) FROM {schema}.records r JOIN workouts w ON r.workout_id = w.id "
+                            f"WHERE {where}", params, path)[0] for schema in _schemas(start, end, path))
+
+
+# Export rows of every source come out newest first; merging on the date keeps that order
+_merge_key = itemgetter(COLUMNS.index("date"))
+
+
+def _select(where, schema="main", keyed=False):
+    # The scan is driven by the date index so rows come out already ordered and SQLite never has to
+    # sort (and buffer) the whole history. Keyed rows end with (date, id), the position page_after()
+    # continues from; ordering by id as well only sorts the rows that share a date.
+    key, order = (", r.date, r.id", ", r.id DESC") if keyed else ("", "")
+    return f"""
+    SELECT p.name as profile, w.day_type, e.name AS exercise, r.set_count AS sets,
+           datetime(r.date, 'unixepoch') AS date, r.reps, r.weight, r.rest, r.rpe, r.heart_rate, r.volume{key}
+    FROM {schema}.records r INDEXED BY idx_records_date
+    CROSS JOIN workouts w ON r.workout_id = w.id
+    CROSS JOIN profiles p ON w.profile_id = p.id
+    LEFT JOIN exercises e ON e.id = w.exercise_id
+    WHERE {where}
+    ORDER BY r.date DESC{order}
+    """
+
+
+def iter_chunks(profile_id, start=None, end=None, day_type=None, chunk_size=CHUNK_SIZE):
+    """Yield lists of export rows (newest first) straight off the cursors of main and the archives."""
+    where, params = _filters(profile_id, start, end, day_type)
+    path = shards.database(profile_id)
+    conn = db.get_connection(path)
+    cursors = [conn.execute(_select(where, schema), params) for schema in _schemas(start, end, path)]
+    rows = cursors[0] if len(cursors) == 1 else heapq.merge(*cursors, key=_merge_key, reverse=True)
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        for cur in cursors:
+            cur.close()
+
+
+def page_after(profile_id, day_type=None, after=None, limit=CHUNK_SIZE):
+    """Up to `limit` export rows, newest first, that follow the row keyed `after` (None: from the newest).
+
+    Returns (rows, key of the last row) for the next call. Each page is its own complete read, so no
+    statement is left open between pages to pin a read snapshot.
+    """
+    where, params = _filters(profile_id, day_type=day_type)
+    if after is not None:
+        where += " AND (r.date, r.id) < (?, ?)"
+        params += list(after)
+    path = shards.database(profile_id)
+    pages = [db.query(_select(where, schema, keyed=True) + " LIMIT ?", params + [limit], path)
+             for schema in _schemas(path=path)]
+    rows = list(islice(heapq.merge(*pages, key=itemgetter(-2, -1), reverse=True), limit))
+    return [row[:-2] for row in rows], rows[-1][-2:] if rows else after
+
+
+def fetch_page(profile_id, start=None, end=None, day_type=None, limit=CHUNK_SIZE, offset=0):
+    """One page of export rows, newest first."""
+    where, params = _filters(profile_id, start, end, day_type)
+    path = shards.database(profile_id)
+    schemas = _schemas(start, end, path)
+    if len(schemas) == 1:
+        return db.query(_select(where) + " LIMIT ? OFFSET ?", params + [limit, offset], path)
+    # No source can contribute more than the first offset + limit rows
+    pages = [db.query(_select(where, schema) + " LIMIT ?", params + [offset + limit], path) for schema in schemas]
+    return list(islice(heapq.merge(*pages, key=_merge_key, reverse=True), offset, offset + limit))
+
+
+def _write_xlsx(fname, chunks):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Workout Log")
+    ws.append(COLUMNS)
+    for rows in chunks:
+        for row in rows:
+            ws.append(row)
+    wb.save(fname)
+
+
+def _write_csv(fname, chunks):
+    with open(fname, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for rows in chunks:
+            writer.writerows(rows)
+
+
+def _write_parquet(fname, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs the pyarrow package.") from None
+
+    schema = pa.schema([("profile", pa.string()), ("day_type", pa.string()), ("exercise", pa.string()),
+                        ("sets", pa.int64()), ("date", pa.string()), ("reps", pa.int64()),
+                        ("weight", pa.float64()), ("rest", pa.int64()), ("rpe", pa.int64()),
+                        ("heart_rate", pa.int64()), ("volume", pa.float64())])
+    with pq.ParquetWriter(fname, schema) as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema))
+
+
+def _write_pdf(fname, chunks):
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.platypus import BaseDocTemplate, Table, TableStyle, Paragraph, Frame, PageTemplate
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('LEADING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 1),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ])
+    # Fixed widths spare reportlab from measuring every cell to size the columns
+    col_widths = [90, 50, 120, 30, 95, 35, 45, 35, 30, 50, 55]
+
+    def tables():
+        yield Paragraph("Workout Log", getSampleStyleSheet()["Title"])
+        for rows in chunks:
+            for i in range(0, len(rows), PDF_ROWS_PER_TABLE):
+                t = Table([COLUMNS] + [list(row) for row in rows[i:i + PDF_ROWS_PER_TABLE]],
+                          colWidths=col_widths, repeatRows=1)
+                t.setStyle(style)
+                yield t
+
+    source = tables()
+    # build() lays out the list it is given front to back and keeps going while it is non-empty, so
+    # topping it up from afterFlowable streams the document: only the next table waits in memory
+    pending = list(islice(source, 1))
+
+    class StreamingDocTemplate(BaseDocTemplate):
+        def afterFlowable(self, flowable):
+            if not pending:
+                pending.extend(islice(source, 1))
+
+    doc = StreamingDocTemplate(fname, pagesize=landscape(letter))
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+    doc.addPageTemplates([PageTemplate(id='normal', frames=frame)])
+    doc.build(pending)
+
+WRITERS = {
+    "xlsx": _write_xlsx,
+    "pdf": _write_pdf,
+    "csv": _write_csv,
+    "parquet": _write_parquet,
+}
+
+
+def export(profile_id, fname, fmt=None, start=None, end=None, day_type=None, progress=_noop):
+    """Stream a profile's records to `fname` as xlsx/pdf/csv/parquet (from the extension by default).
+
+    `start`/`end` are inclusive YYYY-MM-DD dates; `progress(done, total)` is called after every chunk.
+    """
+    fmt = fmt or os.path.splitext(fname)[1].lstrip(".").lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    total = count_rows(profile_id, start, end, day_type)
+    progress(0, total)
+
+    def chunks():
+        done = 0
+        for rows in iter_chunks(profile_id, start, end, day_type):
+            yield rows
+            done += len(rows)
+            progress(done, total)
+
+    with instrument.timed(f"export.{fmt}") as span:
+        WRITERS[fmt](fname, chunks())
+        span.rows = total
+    return fname
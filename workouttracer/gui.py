@@ -0,0 +1,692 @@
+import sys
+# import os
+import matplotlib
+
+from . import (analytics, archive, catalog, columns, export, instrument, plotting, shards, snapshot, store,
+               workers)
+from .models import ColumnTableModel, HistoryModel
+from .schema import init_db
+
+matplotlib.use('Agg')  # For off-screen before embedding in Qt
+
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
+                             QFormLayout, QLineEdit, QPushButton, QLabel, QTableView, QHeaderView,
+                             QMessageBox, QComboBox, QDateEdit, QSpinBox, QDialog,
+                             QFileDialog, QCheckBox, QCompleter)
+from PyQt5.QtCore import QDate, QStringListModel, Qt, QTimer
+
+# Exercise suggestions shown while typing a name
+COMPLETIONS = 15
+# Archiving and vacuum/ANALYZE run in the background this long after startup, then at this interval
+HOUSEKEEPING_DELAY_MS = 30 * 1000
+HOUSEKEEPING_INTERVAL_MS = 6 * 60 * 60 * 1000
+# How long a background failure stays in the status bar
+STATUS_TIMEOUT_MS = 10 * 1000
+
+
+class MplCanvas(FigureCanvas):
+    def __init__(self, parent=None, width=5, height=4, dpi=100):
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        self.ax = self.fig.add_subplot(111)
+        super(MplCanvas, self).__init__(self.fig)
+
+    @instrument.traced
+    def draw(self):
+        super().draw()
+
+
+def show_status(widget, message):
+    # For failures of background work the user didn't ask for; a dialog when there's no status bar to show it in
+    window = widget.window()
+    if isinstance(window, QMainWindow):
+        window.statusBar().showMessage(message, STATUS_TIMEOUT_MS)
+    else:
+        QMessageBox.warning(widget, "Error", message)
+
+
+def make_table_view(model, stretch=True):
+    view = QTableView()
+    view.setModel(model)
+    view.setSelectionBehavior(QTableView.SelectRows)
+    # Fixed row heights and non-content-based column sizing keep the view from measuring every row
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    if stretch:
+        view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    return view
+
+
+class ProfileDialog(QDialog):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Select or Create Profile")
+        layout = QVBoxLayout()
+
+        self.profiles = store.get_profiles()
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItem("Create New...")
+        for _, name in self.profiles:
+            self.profile_combo.addItem(name)
+
+        layout.addWidget(QLabel("Select a profile or create a new one:"))
+        layout.addWidget(self.profile_combo)
+
+        self.new_profile_line = QLineEdit()
+        self.new_profile_line.setPlaceholderText("Enter new profile name if creating new")
+        layout.addWidget(self.new_profile_line)
+
+        btn_layout = QHBoxLayout()
+        btn_ok = QPushButton("OK")
+        btn_ok.clicked.connect(self.accept)
+        btn_cancel = QPushButton("Cancel")
+        btn_cancel.clicked.connect(self.reject)
+        btn_layout.addWidget(btn_ok)
+        btn_layout.addWidget(btn_cancel)
+
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+
+    def get_profile_id(self):
+        sel = self.profile_combo.currentText()
+        if sel == "Create New...":
+            new_name = self.new_profile_line.text().strip()
+            if new_name:
+                store.create_profile(new_name)
+                return store.find_profile(new_name)
+            else:
+                return None
+        else:
+            # Look the name up in the rows the combo was filled from
+            return next(pid for pid, name in self.profiles if name == sel)
+
+
+class ExportDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export")
+        layout = QVBoxLayout()
+
+        form = QFormLayout()
+        self.format_combo = QComboBox()
+        for fmt, label in (("xlsx", "Excel"), ("pdf", "PDF"), ("csv", "CSV"), ("parquet", "Parquet")):
+            self.format_combo.addItem(label, fmt)
+        form.addRow("Format:", self.format_combo)
+
+        self.all_dates_check = QCheckBox("All dates")
+        self.all_dates_check.setChecked(True)
+        form.addRow(self.all_dates_check)
+        self.from_date = QDateEdit()
+        self.from_date.setDate(QDate.currentDate().addMonths(-1))
+        self.from_date.setCalendarPopup(True)
+        self.to_date = QDateEdit()
+        self.to_date.setDate(QDate.currentDate())
+        self.to_date.setCalendarPopup(True)
+        for edit in (self.from_date, self.to_date):
+            edit.setEnabled(False)
+            self.all_dates_check.toggled.connect(lambda checked, e=edit: e.setEnabled(not checked))
+        form.addRow("From:", self.from_date)
+        form.addRow("To:", self.to_date)
+
+        self.day_filter = QComboBox()
+        self.day_filter.addItem("All")
+        self.day_filter.addItems(["push", "pull", "legs"])
+        form.addRow("Day Filter:", self.day_filter)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        btn_ok = QPushButton("Export")
+        btn_ok.clicked.connect(self.accept)
+        btn_cancel = QPushButton("Cancel")
+        btn_cancel.clicked.connect(self.reject)
+        btn_layout.addWidget(btn_ok)
+        btn_layout.addWidget(btn_cancel)
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+
+    def filters(self):
+        # (start, end, day_type) for export.export(); None means unfiltered
+        start = end = None
+        if not self.all_dates_check.isChecked():
+            start = self.from_date.date().toString("yyyy-MM-dd")
+            end = self.to_date.date().toString("yyyy-MM-dd")
+        day_type = self.day_filter.currentText()
+        return start, end, None if day_type == "All" else day_type
+
+
+class AnalyticsDialog(QDialog):
+    def __init__(self, result, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Analytics")
+        layout = QVBoxLayout()
+
+        self.model = ColumnTableModel(["exercise", "best", "best_date", "latest", "prs", "slope"],
+                                      ["Exercise", "Best e1RM", "Best On", "Latest e1RM", "PRs", "kg/week"], parent=self)
+        self.model.set_rows([(name, f"{best:.1f}", best_date, f"{latest:.1f}", prs,
+                              analytics.format_slope(slope))
+                             for name, best, best_date, latest, prs, slope in result["exercises"]])
+        layout.addWidget(make_table_view(self.model))
+
+        load = result["load"]
+        if load:
+            layout.addWidget(QLabel(
+                f"Training load on {load['date']}: acute {load['acute']:.0f}, chronic {load['chronic']:.0f}, "
+                f"ACWR {analytics.format_metric(load['acwr'], '.2f')}, "
+                f"monotony {analytics.format_metric(load['monotony'], '.2f')}, "
+                f"strain {analytics.format_metric(load['strain'], '.0f')}"))
+
+        btn_close = QPushButton("Close")
+        btn_close.clicked.connect(self.accept)
+        layout.addWidget(btn_close)
+        self.setLayout(layout)
+        self.resize(700, 400)
+
+
+class ManageDaysTab(QWidget):
+    def __init__(self, profile_id):
+        super().__init__()
+        self.profile_id = profile_id
+        self.jobs = workers.JobRunner(self)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # Fields to create/update day
+        form = QFormLayout()
+        self.day_type_combo = QComboBox()
+        self.day_type_combo.addItems(["push", "pull", "legs"])
+        self.exercise_line = QLineEdit()
+        # Suggestions come from the catalog's search index as the user types, already ranked
+        self.suggestions = QStringListModel(self)
+        self.completer = QCompleter(self.suggestions, self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.exercise_line.setCompleter(self.completer)
+        self.exercise_line.textEdited.connect(self.suggest_exercises)
+        self.sets_spin = QSpinBox()
+        self.sets_spin.setRange(1, 100)
+
+        form.addRow("Day Type:", self.day_type_combo)
+        form.addRow("Exercise:", self.exercise_line)
+        form.addRow("Sets:", self.sets_spin)
+
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        self.add_btn = QPushButton("Add Exercise to Day")
+        self.add_btn.clicked.connect(self.add_exercise)
+        self.delete_btn = QPushButton("Delete Selected Day/Exercise")
+        self.delete_btn.clicked.connect(self.delete_selected)
+        btn_layout.addWidget(self.add_btn)
+        btn_layout.addWidget(self.delete_btn)
+
+        layout.addLayout(btn_layout)
+
+        # Table to display days
+        self.model = ColumnTableModel(["id", "day_type", "exercise", "sets"], ["ID", "Day", "Exercise", "Sets"],
+                                      parent=self)
+        self.table = make_table_view(self.model)
+        self.table.setColumnHidden(0, True)
+        layout.addWidget(self.table)
+
+        self.setLayout(layout)
+        self.load_table()
+
+    @instrument.traced
+    def load_table(self):
+        self.jobs.submit("load_table", store.list_workouts, self.profile_id, on_result=self.model.set_rows)
+
+    @instrument.traced
+    def suggest_exercises(self, text):
+        # From the profile's own catalog (its shard's when sharded), off the GUI thread; each keystroke
+        # supersedes the previous search
+        self.jobs.submit("suggest_exercises", catalog.search, text, COMPLETIONS,
+                         path=shards.database(self.profile_id), on_result=self.show_suggestions)
+
+    def show_suggestions(self, matches):
+        self.suggestions.setStringList([name for _, name in matches])
+        # The results arrive after the keystroke that asked for them, so the popup is reopened here
+        if matches and self.exercise_line.hasFocus():
+            self.completer.complete()
+
+    @instrument.traced
+    def add_exercise(self):
+        day_type = self.day_type_combo.currentText()
+        exercise = self.exercise_line.text().strip()
+        sets = self.sets_spin.value()
+        if not exercise:
+            QMessageBox.warning(self, "Error", "Exercise name cannot be empty.")
+            return
+
+        # Writes aren't keyed per click: the button stays disabled until this one is done, since
+        # submitting again under the key would cancel it
+        self.add_btn.setEnabled(False)
+        self.jobs.submit("add_exercise", store.add_workout, self.profile_id, day_type, exercise, sets,
+                         on_result=self.exercise_added, on_error=self.write_failed)
+
+    def exercise_added(self, _):
+        self.add_btn.setEnabled(True)
+        self.exercise_line.clear()
+        self.load_table()
+
+    def write_failed(self, error):
+        self.add_btn.setEnabled(True)
+        self.delete_btn.setEnabled(True)
+        QMessageBox.warning(self, "Error", str(error))
+
+    @instrument.traced
+    def delete_selected(self):
+        selected = self.table.currentIndex().row()
+        if selected < 0:
+            QMessageBox.warning(self, "Error", "No selection made.")
+            return
+        workout_id = self.model.value(selected, "id")
+        day_type = self.model.value(selected, "day_type")
+        exercise = self.model.value(selected, "exercise")
+
+        # Confirm deletion
+        ret = QMessageBox.question(self, "Confirm Delete",
+                                   f"Delete '{day_type}' with exercise '{exercise}'?",
+                                   QMessageBox.Yes | QMessageBox.No)
+        if ret == QMessageBox.Yes:
+            self.delete_btn.setEnabled(False)
+            self.jobs.submit("delete_workout", store.delete_workout_id, self.profile_id, workout_id,
+                             on_result=self.workout_deleted, on_error=self.write_failed)
+
+    def workout_deleted(self, _):
+        self.delete_btn.setEnabled(True)
+        self.load_table()
+
+
+class TrackProgressTab(QWidget):
+    def __init__(self, profile_id):
+        super().__init__()
+        self.profile_id = profile_id
+        self.jobs = workers.JobRunner(self)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # User selects day
+        hl_day = QHBoxLayout()
+        hl_day.addWidget(QLabel("Select Day:"))
+        self.day_combo = QComboBox()
+        hl_day.addWidget(self.day_combo)
+        self.load_days()
+        layout.addLayout(hl_day)
+
+        # Button to load exercises
+        self.load_ex_btn = QPushButton("Load Exercises")
+        self.load_ex_btn.clicked.connect(self.load_exercises)
+        layout.addWidget(self.load_ex_btn)
+
+        # Table of sets - user enters reps, weight, rest, RPE, HR for each
+        self.model = ColumnTableModel(store.SESSION_COLUMNS, ["Exercise", "Sets", "Reps", "Weight(kg)",
+                                                              "Rest(sec)", "RPE", "Heart Rate"],
+                                      editable=store.SESSION_COLUMNS[1:], parent=self)
+        self.table = make_table_view(self.model)
+        layout.addWidget(self.table)
+
+        # Buttons to save
+        hl_btn = QHBoxLayout()
+        self.save_btn = QPushButton("Save Records")
+        self.save_btn.clicked.connect(self.save_records)
+        hl_btn.addWidget(self.save_btn)
+
+        # Export options
+        self.export_btn = QPushButton("Export...")
+        self.export_btn.clicked.connect(self.export_data)
+        hl_btn.addWidget(self.export_btn)
+
+        layout.addLayout(hl_btn)
+
+        self.setLayout(layout)
+
+    @instrument.traced
+    def load_days(self):
+        self.jobs.submit("load_days", store.day_types, self.profile_id, on_result=self.populate_days)
+
+    @instrument.traced
+    def populate_days(self, rows):
+        self.day_combo.clear()
+        for (d,) in rows:
+            self.day_combo.addItem(d)
+
+    @instrument.traced
+    def load_exercises(self):
+        day_type = self.day_combo.currentText()
+        self.jobs.submit("load_exercises", store.day_exercises, self.profile_id, day_type,
+                         on_result=self.populate_exercises)
+
+    @instrument.traced
+    def populate_exercises(self, rows):
+        # One row per planned set; reps, weight, rest, RPE and heart rate start at 0 for the user to fill in.
+        # A row's Sets can be raised to log several identical sets at once.
+        self.model.set_rows([(exercise, "1", "0", "0", "0", "0", "0")
+                             for exercise, sets in rows for _ in range(max(sets or 0, 1))])
+
+    @instrument.traced
+    def save_records(self):
+        # Save user-entered data to DB
+        day_type = self.day_combo.currentText()
+        # Disabled until saved, so a second click can't supersede (and cancel) the save in flight
+        self.save_btn.setEnabled(False)
+        self.jobs.submit("save_records", store.save_session, self.profile_id, day_type, self.model.rows(),
+                         on_result=self.records_saved, on_error=self.save_failed)
+
+    def records_saved(self, _):
+        self.save_btn.setEnabled(True)
+        if snapshot.ENABLED:
+            self.jobs.submit("snapshot", columns.save_snapshot, self.profile_id,
+                             on_error=lambda e: show_status(self, f"Saving the column snapshot failed: {e}"))
+        QMessageBox.information(self, "Saved", "Records saved successfully!")
+
+    def save_failed(self, error):
+        self.save_btn.setEnabled(True)
+        if isinstance(error, ValueError):
+            QMessageBox.warning(self, "Invalid Entry", f"Nothing was saved.\n\n{error}")
+        else:
+            QMessageBox.warning(self, "Error", f"Nothing was saved.\n\n{error}")
+
+    @instrument.traced
+    def export_data(self):
+        # Export current profile's workout data, optionally narrowed by date range / day type
+        dialog = ExportDialog(self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        fmt = dialog.format_combo.currentData()
+        fname, _ = QFileDialog.getSaveFileName(self, "Save Export", "", export.FORMATS[fmt])
+        if fname:
+            if not fname.lower().endswith("." + fmt):
+                fname += "." + fmt
+            workers.run_with_progress(self.jobs, self, "export", "Exporting...", export.export,
+                                      self.profile_id, fname, fmt, *dialog.filters(), on_result=self.export_done)
+
+    @instrument.traced
+    def export_done(self, fname):
+        QMessageBox.information(self, "Exported", f"Data exported to {fname}")
+
+
+class HistoryTab(QWidget):
+    def __init__(self, profile_id):
+        super().__init__()
+        self.profile_id = profile_id
+        self.jobs = workers.JobRunner(self)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        filter_layout = QHBoxLayout()
+        self.day_filter = QComboBox()
+        self.day_filter.addItem("All")
+        self.day_filter.addItems(["push", "pull", "legs"])
+        filter_layout.addWidget(QLabel("Day Filter:"))
+        filter_layout.addWidget(self.day_filter)
+        self.refresh_btn = QPushButton("Refresh")
+        self.refresh_btn.clicked.connect(self.load_history)
+        filter_layout.addWidget(self.refresh_btn)
+        layout.addLayout(filter_layout)
+
+        # Records are pulled from the database a page at a time, off the GUI thread, as the view scrolls
+        self.model = HistoryModel(self.jobs, self)
+        self.table = make_table_view(self.model, stretch=False)
+        layout.addWidget(self.table)
+
+        self.setLayout(layout)
+        self.load_history()
+
+    @instrument.traced
+    def load_history(self):
+        day_filter = self.day_filter.currentText()
+        self.model.load(self.profile_id, None if day_filter == "All" else day_filter)
+
+
+class ViewTrendsTab(QWidget):
+    def __init__(self, profile_id):
+        super().__init__()
+        self.profile_id = profile_id
+        self.jobs = workers.JobRunner(self)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # Filters: date range, day type
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("From:"))
+        self.from_date = QDateEdit()
+        self.from_date.setDate(QDate.currentDate().addDays(-30))
+        self.from_date.setCalendarPopup(True)
+        filter_layout.addWidget(self.from_date)
+
+        filter_layout.addWidget(QLabel("To:"))
+        self.to_date = QDateEdit()
+        self.to_date.setDate(QDate.currentDate())
+        self.to_date.setCalendarPopup(True)
+        filter_layout.addWidget(self.to_date)
+
+        self.day_filter = QComboBox()
+        self.day_filter.addItem("All")
+        self.day_filter.addItems(["push", "pull", "legs"])
+        filter_layout.addWidget(QLabel("Day Filter:"))
+        filter_layout.addWidget(self.day_filter)
+
+        self.filter_btn = QPushButton("Apply Filter")
+        self.filter_btn.clicked.connect(self.plot_data)
+        filter_layout.addWidget(self.filter_btn)
+
+        layout.addLayout(filter_layout)
+
+        # Weekly/Monthly summaries
+        summary_layout = QHBoxLayout()
+        self.summary_btn = QPushButton("Weekly Summary")
+        self.summary_btn.clicked.connect(lambda: self.show_summary('weekly'))
+        summary_layout.addWidget(self.summary_btn)
+
+        self.monthly_btn = QPushButton("Monthly Summary")
+        self.monthly_btn.clicked.connect(lambda: self.show_summary('monthly'))
+        summary_layout.addWidget(self.monthly_btn)
+
+        self.formula_combo = QComboBox()
+        self.formula_combo.addItems(sorted(analytics.FORMULAS))
+        summary_layout.addWidget(QLabel("1RM Formula:"))
+        summary_layout.addWidget(self.formula_combo)
+        self.analytics_btn = QPushButton("Analytics")
+        self.analytics_btn.clicked.connect(self.show_analytics)
+        summary_layout.addWidget(self.analytics_btn)
+        layout.addLayout(summary_layout)
+
+        # Canvas for plot
+        self.canvas = MplCanvas(self, width=5, height=4)
+        layout.addWidget(self.canvas)
+        self.trend_plot = plotting.TrendPlot(self.canvas, self.canvas.ax)
+        self.series_cache = plotting.SeriesCache()
+
+        self.setLayout(layout)
+
+    @instrument.traced
+    def plot_data(self):
+        fdate = self.from_date.date().toString("yyyy-MM-dd")
+        tdate = self.to_date.date().toString("yyyy-MM-dd")
+        day_filter = self.day_filter.currentText()
+
+        # Daily totals from the profile's in-memory set columns.
+        # Re-applying the filter cancels a query that is still running.
+        key = (self.profile_id, fdate, tdate, None if day_filter == "All" else day_filter)
+        series = self.series_cache.get(key)
+        if series is not None:
+            self.draw_plot(series)
+            return
+        generation = columns.profile_generation(self.profile_id)
+
+        def loaded(series):
+            self.series_cache.put(key, series, generation)
+            self.draw_plot(series)
+
+        self.jobs.submit("plot", plotting.load_series, *key, on_result=loaded)
+
+    @instrument.traced
+    def draw_plot(self, series):
+        x, y = series
+        self.trend_plot.show(x, y, "Volume Over Time" if len(x) else "No data for selected range/type")
+
+    @instrument.traced
+    def show_summary(self, period):
+        # period can be 'weekly' or 'monthly'
+        self.jobs.submit("summary", analytics.period_summary, self.profile_id, period,
+                         on_result=lambda summary: self.display_summary(period, summary))
+
+    @instrument.traced
+    def display_summary(self, period, summary):
+        if not summary:
+            QMessageBox.information(self, "No Data", "No data to summarize.")
+            return
+
+        msg = f"{period.capitalize()} Summary:\n\n"
+        msg += "\n".join(f"{start}    {volume:.1f}" for start, volume in summary)
+        # Suggestion
+        advice = analytics.suggestion(summary)
+        if advice:
+            msg += "\n\n" + advice
+
+        QMessageBox.information(self, f"{period.capitalize()} Summary", msg)
+
+    @instrument.traced
+    def show_analytics(self):
+        day_filter = self.day_filter.currentText()
+        self.jobs.submit("analytics", analytics.report, self.profile_id, None if day_filter == "All" else day_filter,
+                         self.formula_combo.currentText(), on_result=self.display_analytics)
+
+    @instrument.traced
+    def display_analytics(self, result):
+        if not result["exercises"]:
+            QMessageBox.information(self, "No Data", "No data to analyze.")
+            return
+        AnalyticsDialog(result, self).exec_()
+
+
+class DebugTab(QWidget):
+    """Rolling latency stats from the instrument module, only shown when instrumentation is on."""
+
+    STATS = ["count", "rows", "total_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        self.model = ColumnTableModel(["name"] + self.STATS,
+                                      ["Name", "Calls", "Rows", "Total ms", "p50 ms", "p95 ms", "p99 ms", "Max ms"],
+                                      parent=self)
+        self.table = make_table_view(self.model, stretch=False)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        hl = QHBoxLayout()
+        for label, slot in (("Refresh", self.refresh), ("Reset", self.reset), ("Save JSON...", self.save_json)):
+            btn = QPushButton(label)
+            btn.clicked.connect(slot)
+            hl.addWidget(btn)
+        # Arms cProfile for the next call of the selected action
+        self.action_combo = QComboBox()
+        self.action_combo.setEditable(True)
+        hl.addWidget(self.action_combo, 1)
+        profile_btn = QPushButton("Profile Next Call")
+        profile_btn.clicked.connect(self.profile_next)
+        hl.addWidget(profile_btn)
+        layout.addLayout(hl)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(2000)
+        self.refresh()
+
+    def refresh(self):
+        stats = instrument.snapshot()
+        self.model.set_rows([(name,) + tuple(round(s[k], 2) if isinstance(s[k], float) else s[k] for k in self.STATS)
+                             for name, s in stats.items()])
+        current = self.action_combo.currentText()
+        actions = sorted(name for name in stats if not name.startswith("sql "))
+        if actions != [self.action_combo.itemText(i) for i in range(self.action_combo.count())]:
+            self.action_combo.clear()
+            self.action_combo.addItems(actions)
+            self.action_combo.setCurrentText(current)
+
+    def reset(self):
+        instrument.reset()
+        self.refresh()
+
+    def save_json(self):
+        fname, _ = QFileDialog.getSaveFileName(self, "Save Stats", "instrument.json", "JSON Files (*.json)")
+        if fname:
+            instrument.dump(fname)
+
+    def profile_next(self):
+        name = self.action_combo.currentText().strip()
+        if name:
+            instrument.profile_next(name)
+            QMessageBox.information(self, "Profiling", f"The next call of {name} will be written to "
+                                                       f"{instrument.PROFILE_DIR} as a .prof file.")
+
+
+class MainWindow(QMainWindow):
+    def __init__(self, profile_id):
+        super().__init__()
+        self.profile_id = profile_id
+        self.setWindowTitle("Workout Tracker")
+        self.tabs = QTabWidget()
+        self.manage_days_tab = ManageDaysTab(profile_id)
+        self.track_progress_tab = TrackProgressTab(profile_id)
+        self.history_tab = HistoryTab(profile_id)
+        self.view_trends_tab = ViewTrendsTab(profile_id)
+
+        self.tabs.addTab(self.manage_days_tab, "Manage Days")
+        self.tabs.addTab(self.track_progress_tab, "Track Progress")
+        self.tabs.addTab(self.history_tab, "History")
+        self.tabs.addTab(self.view_trends_tab, "View Trends")
+        if instrument.ENABLED:
+            self.tabs.addTab(DebugTab(), "Debug")
+
+        self.setCentralWidget(self.tabs)
+
+        # Notifications/Reminders: every 60 seconds a reminder could pop up
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.show_reminder)
+        self.timer.start(60000)  # every 60 seconds for demo; adjust as needed
+
+        self.jobs = workers.JobRunner(self)
+        QTimer.singleShot(HOUSEKEEPING_DELAY_MS, self.housekeeping)
+        self.housekeeping_timer = QTimer(self)
+        self.housekeeping_timer.timeout.connect(self.housekeeping)
+        self.housekeeping_timer.start(HOUSEKEEPING_INTERVAL_MS)
+
+    def show_reminder(self):
+        # Simple reminder
+        QMessageBox.information(self, "Reminder", "Time to exercise or log your progress?")
+
+    def housekeeping(self):
+        # Nothing to show unless it fails, and a failure leaves the data where it was. Records are only archived
+        # once a horizon is set (archive.set_horizon), a sharded profile's in its shard.
+        self.jobs.submit("housekeeping", archive.housekeeping, archive.horizon(), path=shards.database(self.profile_id),
+                         on_error=lambda e: show_status(self, f"Housekeeping failed: {e}"))
+
+
+def main():
+    init_db()
+    app = QApplication(sys.argv)
+    app.aboutToQuit.connect(workers.shutdown)
+    dialog = ProfileDialog()
+    if dialog.exec_() == QDialog.Accepted:
+        pid = dialog.get_profile_id()
+        if pid is None:
+            QMessageBox.warning(None, "Error", "No profile selected or created.")
+            sys.exit(0)
+        window = MainWindow(pid)
+        window.resize(800, 600)
+        window.show()
+        sys.exit(app.exec_())
+    else:
+        sys.exit(0)
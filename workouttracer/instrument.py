@@ -0,0 +1,291 @@
+"""Opt-in timing of SQL statements, background jobs, UI slots and exports.
+
+Off by default; set WORKOUTTRACER_INSTRUMENT=1 (or pass --instrument on the command line) before
+the first database connection opens. When off, connections are plain sqlite3 ones and the wrappers
+below return straight away.
+
+Every timed name keeps a rolling window of latencies; snapshot() summarizes them and dump() writes
+that as JSON. Statements slower than SLOW_QUERY_MS are logged with their EXPLAIN QUERY PLAN.
+profile_next(name) runs the next call of a traced action under cProfile and saves the stats.
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("WORKOUTTRACER_INSTRUMENT", "") not in ("", "0")
+SLOW_QUERY_MS = float(os.environ.get("WORKOUTTRACER_SLOW_MS", "50"))
+# Where profile_next() writes .prof files
+PROFILE_DIR = os.environ.get("WORKOUTTRACER_PROFILE_DIR", ".")
+# Latencies kept per name for the percentiles
+WINDOW = 1000
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_histograms = {}
+_armed = set()
+
+
+class Histogram:
+    """Call count, row count and total time since the last reset, plus the last WINDOW latencies."""
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.count = self.rows = 0
+        self.total = 0.0
+
+    def add(self, seconds, rows):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if rows is not None:
+            self.rows += rows
+
+    def summary(self):
+        samples = sorted(self.samples)
+
+        def pct(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+
+        return {"count": self.count, "rows": self.rows, "total_ms": self.total * 1000,
+                "mean_ms": self.total / self.count * 1000, "p50_ms": pct(0.5), "p95_ms": pct(0.95),
+                "p99_ms": pct(0.99), "max_ms": samples[-1] * 1000}
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def record(name, seconds, rows=None):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.add(seconds, rows)
+
+
+class Span:
+    rows = None
+
+
+@contextmanager
+def timed(name):
+    """Time the block under `name`. Set `.rows` on the yielded span to record a row count too."""
+    span = Span()
+    if not ENABLED:
+        yield span
+        return
+    t0 = time.perf_counter()
+    try:
+        with _profiling(name):
+            yield span
+    finally:
+        record(name, time.perf_counter() - t0, span.rows)
+
+
+def traced(fn=None, name=None):
+    """Decorator timing every call of `fn` as `name` (default "ui.<qualified name>").
+
+    Extra positional arguments beyond the ones `fn` takes are dropped, as Qt does when a signal
+    carries more arguments than the slot accepts (e.g. `checked` from QPushButton.clicked).
+    """
+    if fn is None:
+        return functools.partial(traced, name=name)
+    name = name or f"ui.{fn.__qualname__}"
+    code = fn.__code__
+    nargs = None if code.co_flags & 0x04 else code.co_argcount  # 0x04: takes *args
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if nargs is not None:
+            args = args[:nargs]
+        if not ENABLED:
+            return fn(*args, **kwargs)
+        with timed(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def profile_next(name):
+    """Run the next timed call of `name` under cProfile; its stats go to PROFILE_DIR/<name>-<time>.prof."""
+    with _lock:
+        _armed.add(name)
+
+
+@contextmanager
+def _profiling(name):
+    with _lock:
+        armed = name in _armed
+        _armed.discard(name)
+    if not armed:
+        yield
+        return
+    with profiled(os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")):
+        yield
+
+
+@contextmanager
+def profiled(fname):
+    """cProfile the block and save the stats to `fname` (open with pstats or snakeviz)."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(fname)), exist_ok=True)
+        profiler.dump_stats(fname)
+        log.info("profile of %s written to %s", os.path.basename(fname), fname)
+
+
+def snapshot():
+    """{name: {count, rows, total_ms, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}, slowest total first."""
+    with _lock:
+        stats = {name: hist.summary() for name, hist in _histograms.items()}
+    return dict(sorted(stats.items(), key=lambda item: -item[1]["total_ms"]))
+
+
+def dump(fname):
+    with open(fname, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def format_table(stats=None, limit=None):
+    stats = snapshot() if stats is None else stats
+    lines = [f"{'name':<60} {'count':>7} {'rows':>9} {'total ms':>10} {'p50':>8} {'p99':>8}"]
+    for name, s in list(stats.items())[:limit]:
+        lines.append(f"{name[:60]:<60} {s['count']:>7} {s['rows']:>9} {s['total_ms']:>10.1f} "
+                     f"{s['p50_ms']:>8.2f} {s['p99_ms']:>8.2f}")
+    return "\n".join(lines)
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_name(sql):
+    return "sql " + " ".join(sql.split())[:120]
+
+
+def query_plan(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN output as indented lines, or None for statements that have no plan."""
+    if sql.lstrip()[:6].upper() not in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLAC"):
+        return None
+    try:
+        # sqlite3.Connection.execute so the EXPLAIN itself isn't timed
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error:
+        return None
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return "\n".join(lines)
+
+
+def _statement_done(conn, sql, params, seconds, rows):
+    record(statement_name(sql), seconds, rows)
+    if seconds * 1000 >= SLOW_QUERY_MS and log.isEnabledFor(logging.WARNING):
+        plan = query_plan(conn, sql, params) if params is not None else None
+        log.warning("slow query (%.1f ms, %s rows): %s%s", seconds * 1000, rows, " ".join(sql.split()),
+                    f"\n{plan}" if plan else "")
+
+
+class Cursor(sqlite3.Cursor):
+    """A cursor that times each statement from execute() until its rows are fetched (or it is dropped)."""
+
+    _pending = None
+
+    def execute(self, sql, params=()):
+        self._flush()
+        t0 = time.perf_counter()
+        super().execute(sql, params)
+        elapsed = time.perf_counter() - t0
+        if self.description is None:
+            _statement_done(self.connection, sql, params, elapsed, max(self.rowcount, 0))
+        else:
+            self._pending = [sql, params, elapsed, 0]
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._flush()
+        t0 = time.perf_counter()
+        super().executemany(sql, seq_of_params)
+        _statement_done(self.connection, sql, None, time.perf_counter() - t0, max(self.rowcount, 0))
+        return self
+
+    def _fetched(self, t0, rows, exhausted):
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - t0
+            pending[3] += rows
+            if exhausted:
+                self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            _statement_done(self.connection, *pending)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        t0 = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(t0, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows), True)
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(t0, 0, True)
+            raise
+        self._fetched(t0, 1, False)
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._flush()
+        except sqlite3.Error:
+            pass
+
+
+class Connection(sqlite3.Connection):
+    """Connection factory whose statements all run through Cursor."""
+
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
@@ -0,0 +1,126 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from . import export, instrument
+
+# Rows pulled from the cursor each time a view scrolls near the end of what is loaded
+HISTORY_FETCH_SIZE = 500
+
+
+class ColumnTableModel(QAbstractTableModel):
+    """Table model over a column-oriented buffer: one Python list per column, no per-cell objects.
+
+    Views only ask for the cells they are painting, so population cost no longer scales with
+    rows x columns of widget items.
+    """
+
+    def __init__(self, columns, headers, editable=(), parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.headers = list(headers)
+        self.editable = {self.columns.index(c) for c in editable}
+        self.buffer = [[] for _ in self.columns]
+        self.row_count = 0
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.buffer = [list(col) for col in zip(*rows)] or [[] for _ in self.columns]
+        self.row_count = len(rows)
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + len(rows) - 1)
+        for buf, col in zip(self.buffer, zip(*rows)):
+            buf.extend(col)
+        self.row_count += len(rows)
+        self.endInsertRows()
+
+    def value(self, row, column):
+        return self.buffer[self.columns.index(column)][row]
+
+    def rows(self):
+        return list(zip(*self.buffer))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        value = self.buffer[index.column()][index.row()]
+        return "" if value is None else str(value)
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or index.column() not in self.editable:
+            return False
+        self.buffer[index.column()][index.row()] = value
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return str(section + 1)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in self.editable:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+
+class HistoryModel(ColumnTableModel):
+    """A profile's records, newest first, read a page at a time through `jobs` as the view scrolls.
+
+    Each page is a separate short read on a worker thread (export.page_after), so nothing holds a
+    statement open on the GUI thread's connection between pages. A page that fails is reported by
+    `jobs` and stops further fetches until the next load().
+    """
+
+    def __init__(self, jobs, parent=None):
+        columns = export.COLUMNS[1:]
+        super().__init__(columns, ["Day", "Exercise", "Sets", "Date", "Reps", "Weight(kg)", "Rest(sec)", "RPE",
+                                   "Heart Rate", "Volume"], parent=parent)
+        self.jobs = jobs
+        self.query = None
+        # Key of the last row loaded, and whether a page is on its way
+        self.after = None
+        self.fetching = False
+
+    def load(self, profile_id, day_type=None):
+        self.close()
+        self.set_rows([])
+        self.query = (profile_id, day_type)
+        self.after = None
+        self.fetchMore()
+
+    def close(self):
+        self.jobs.cancel("history.page")
+        self.query = None
+        self.fetching = False
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.query is not None and not self.fetching
+
+    @instrument.traced
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self.fetching = True
+        self.jobs.submit("history.page", export.page_after, *self.query, self.after, HISTORY_FETCH_SIZE,
+                         on_result=self.page_loaded)
+
+    def page_loaded(self, page):
+        rows, self.after = page
+        self.fetching = False
+        if len(rows) < HISTORY_FETCH_SIZE:
+            self.query = None
+        # Drop the leading profile column; the history view is per profile
+        self.append_rows([row[1:] for row in rows])
+
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+import numpy as np
+import matplotlib.dates as mdates
+
+from . import archive, columns
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of (x, y) to at most `threshold` points.
+
+    Keeps the first and last points and, from each bucket in between, the point forming the largest
+    triangle with the previously kept point and the next bucket's mean, which preserves peaks and dips.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def load_series(profile_id, start, end, day_type=None):
+    """Daily volume on days with sets between two YYYY-MM-DD dates, as (matplotlib date numbers, volumes).
+
+    Archived sets are only loaded once a range reaches an archived year.
+    """
+    cols = columns.for_profile(profile_id)
+    data = cols.arrays(day_type, archived=archive.needed(start, cols.path))
+    day = columns.days(data["date"])
+    first, last = (np.datetime64(d, "D").astype(np.int64) for d in (start, end))
+    mask = (day >= first) & (day <= last)
+    days, index = np.unique(day[mask], return_inverse=True)
+    volumes = np.bincount(index, weights=data["volume"][mask], minlength=len(days))
+    return mdates.date2num(days.astype("datetime64[D]")), volumes
+
+
+class SeriesCache:
+    """Small LRU of queried series, keyed by tuples that start with the profile id. Entries are dropped once a set or
+    workout write has committed to the profile's database since they were read.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        generation, value = entry
+        if generation != columns.profile_generation(key[0]):
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, generation):
+        # `generation` is columns.profile_generation() from before the query ran, so a write racing the query
+        # leaves the entry already stale
+        self.entries[key] = (generation, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class TrendPlot:
+    """One persistent Line2D on an axes, updated in place.
+
+    The line is animated, so it is left out of normal draws and blitted over a cached background.
+    When the axes limits and title don't change, an update restores that background and redraws only
+    the line. Otherwise it schedules a single draw_idle().
+    """
+
+    def __init__(self, canvas, ax):
+        self.canvas = canvas
+        self.ax = ax
+        self.line, = ax.plot([], [], marker='o', animated=True)
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        ax.set_xlabel("Date")
+        ax.set_ylabel("Volume (kg)")
+        ax.grid(True)
+        self.background = None
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def show(self, x, y, title):
+        # Never draw more points than there are pixels across the axes
+        x, y = lttb(x, y, max(int(self.ax.bbox.width), 3))
+        limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        self.line.set_data(x, y)
+        if len(x):
+            self.ax.relim()
+            self.ax.autoscale_view()
+        if (self.background is not None and title == self.ax.get_title()
+                and limits == (self.ax.get_xlim(), self.ax.get_ylim())):
+            self.canvas.restore_region(self.background)
+            self.ax.draw_artist(self.line)
+            self.canvas.blit(self.ax.bbox)
+        else:
+            self.ax.set_title(title)
+            self.canvas.draw_idle()
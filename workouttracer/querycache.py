@@ -0,0 +1,123 @@
+"""Memoized read queries, invalidated by the per-table write generations in db.
+
+A result is reused until a write commits to any table the query reads. Commits by other connections
+(another process, the CLI, an import) are noticed through SQLite's data_version and drop every
+result of that database. The cache is an LRU bounded
+both by entry count and by the total number of cached rows.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+from . import db
+
+MAX_ENTRIES = 256
+# Results larger than this are never cached, and the cache evicts to stay under it in total
+MAX_ROWS = 100000
+
+_FROM = re.compile(r"\b(?:FROM|JOIN)\s+", re.IGNORECASE)
+# One item of a FROM list: an optionally schema-qualified table name, an optional alias, and the comma
+# before the next item if there is one
+_ITEM = re.compile(r"""[\"'`\[]?(?:\w+[\"'`\]]?\.[\"'`\[]?)?([A-Za-z_]\w*)[\"'`\]]?"""
+                   r"(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|USING|LEFT|INNER|CROSS|NATURAL|GROUP|ORDER|LIMIT|HAVING"
+                   r"|WINDOW|UNION|EXCEPT|INTERSECT|INDEXED|NOT)\b)\w+)?(?:\s+INDEXED\s+BY\s+\w+|\s+NOT\s+INDEXED)?"
+                   r"\s*(,\s*)?", re.IGNORECASE)
+
+
+def read_tables(sql):
+    """Tables named after FROM/JOIN in a SELECT, including every item of a comma-separated FROM list;
+    subqueries in parentheses are looked into as well.
+    """
+    names = set()
+    for start in _FROM.finditer(sql):
+        pos = start.end()
+        while True:
+            item = _ITEM.match(sql, pos)
+            if item is None:
+                break
+            names.add(item.group(1).lower())
+            if item.group(2) is None:
+                break
+            pos = item.end()
+    return tuple(sorted(names))
+
+
+class QueryCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_rows=MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.entries = OrderedDict()
+        self.rows = 0
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def query(self, sql, params=(), path=None, tables=None):
+        """db.query() through the cache. Returns a tuple of rows; `tables` overrides the tables
+        parsed from the SQL as the ones whose writes invalidate the result.
+        """
+        path = path or db.DATABASE
+        if db.in_transaction(path):
+            # Reads inside a write transaction must see its uncommitted writes, which no entry reflects
+            return tuple(db.query(sql, params, path))
+        tables = read_tables(sql) if tables is None else tuple(tables)
+        key = (path, sql, tuple(params))
+        generations = tuple(db.table_generation(t, path) for t in tables)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] == generations:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._drop(key)
+                self.invalidations += 1
+            self.misses += 1
+        # `generations` were read before the query ran, so a write racing it leaves the entry stale
+        rows = tuple(db.query(sql, params, path))
+        if len(rows) <= self.max_rows:
+            with self.lock:
+                if key in self.entries:
+                    self._drop(key)
+                self.entries[key] = (generations, rows)
+                self.rows += len(rows)
+                while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+                    self._drop(next(iter(self.entries)))
+                    self.evictions += 1
+        return rows
+
+    def _drop(self, key):
+        _, rows = self.entries.pop(key)
+        self.rows -= len(rows)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.rows = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "rows": self.rows,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = QueryCache()
+
+
+def query(sql, params=(), path=None, tables=None):
+    return _cache.query(sql, params, path, tables)
+
+
+def stats():
+    return _cache.stats()
+
+
+def clear():
+    _cache.clear()
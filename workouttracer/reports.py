@@ -0,0 +1,212 @@
+"""Monthly per-profile reports (PDF and/or XLSX), generated for many profiles at once.
+
+Profiles are fanned out over a process pool. Each worker opens the database read-only and renders
+its charts with matplotlib's Agg canvas. Reports describe the profile as of the last day of the
+month and carry no timestamps, so the same database always produces byte-identical files.
+"""
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+
+from . import analytics, db, export, instrument
+
+FORMATS = ("pdf", "xlsx")
+# Weeks of history in the trend chart
+TREND_WEEKS = 52
+# Stamped on the XLSX properties and zip entries in place of the time of writing
+FIXED_TIME = datetime(2000, 1, 1)
+
+
+def month_range(month):
+    """(first, last) day numbers of a YYYY-MM month."""
+    try:
+        first = np.datetime64(datetime.strptime(month, "%Y-%m"), "M")
+    except ValueError:
+        raise ValueError(f"Month must be YYYY-MM, not {month!r}") from None
+    return int(first.astype("datetime64[D]").astype(np.int64)), \
+        int((first + 1).astype("datetime64[D]").astype(np.int64)) - 1
+
+
+def _file_stem(profile_id, name, month):
+    return f"{profile_id}_{re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_') or 'profile'}_{month}"
+
+
+def _content(profile_id, month, formula):
+    """Everything a report shows, computed from the profile's set columns up to the end of `month`."""
+    first, last = month_range(month)
+    data = analytics.load(profile_id)
+    upto = data["day"] <= last
+    data = {key: value[upto] if key != "exercises" else value for key, value in data.items()}
+    day, volume = data["day"], data["volume"]
+    in_month = day >= first
+    month_days = np.bincount(day[in_month] - first, weights=volume[in_month], minlength=last - first + 1)
+    recent = day > last - TREND_WEEKS * 7
+    week_starts, week_totals = analytics.period_totals(day[recent], volume[recent], "week")
+    _, metrics = analytics.load_metrics(day, analytics.rpe_load(volume, data["rpe"]), until=last)
+    load = {name: float(series[-1]) for name, series in metrics.items()}
+    return {
+        "month_days": month_days,
+        "weeks": (week_starts, week_totals),
+        "totals": (int(np.count_nonzero(month_days)), int(in_month.sum()), float(volume[in_month].sum())),
+        "exercises": analytics.exercise_stats(data, formula),
+        "load": load,
+        "records": [row for rows in export.iter_chunks(profile_id, analytics.day_string(first),
+                                                       analytics.day_string(last)) for row in rows],
+    }
+
+
+def render_chart(content, month):
+    """PNG bytes: the month's daily volume above the weekly volume trend."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5), dpi=100)
+    FigureCanvasAgg(fig)
+    top, bottom = fig.subplots(2, 1)
+    daily = content["month_days"]
+    top.bar(np.arange(1, len(daily) + 1), daily, color="tab:blue")
+    top.set_title(f"Daily volume, {month}")
+    top.set_xlim(0.5, len(daily) + 0.5)
+    starts, totals = content["weeks"]
+    bottom.plot(starts.astype("datetime64[D]"), totals, marker="o", markersize=3, color="tab:orange")
+    bottom.set_title(f"Weekly volume, last {TREND_WEEKS} weeks")
+    fig.tight_layout()
+    out = io.BytesIO()
+    # No "Software" chunk, which would carry the matplotlib version into the bytes
+    fig.savefig(out, format="png", metadata={"Software": None})
+    return out.getvalue()
+
+
+def _stat_rows(content):
+    return [[name, round(best, 1), on, round(latest, 1), prs, analytics.format_slope(slope)]
+            for name, best, on, latest, prs, slope in content["exercises"]]
+
+
+def load_line(load):
+    return (f"Training load at month end: acute {load['acute']:.0f}, chronic {load['chronic']:.0f}, "
+            f"ACWR {analytics.format_metric(load['acwr'], '.2f')}")
+
+
+STAT_COLUMNS = ["exercise", "best e1RM", "on", "latest", "PR days", "kg/week"]
+
+
+def write_pdf(fname, title, content, chart):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+    ])
+    days, sets, volume = content["totals"]
+    story = [Paragraph(title, styles["Title"]),
+             Paragraph(f"{days} training days, {sets} sets, {volume:.0f} kg total volume", styles["Normal"]),
+             Image(io.BytesIO(chart), width=576, height=360)]
+    if content["load"]:
+        story.append(Paragraph(load_line(content["load"]), styles["Normal"]))
+    for columns, rows in ((STAT_COLUMNS, _stat_rows(content)), (export.COLUMNS, content["records"])):
+        if rows:
+            table = Table([columns] + [list(row) for row in rows], repeatRows=1)
+            table.setStyle(style)
+            story += [Spacer(0, 12), table]
+    # invariant=1 leaves out the creation date and random document ID
+    SimpleDocTemplate(fname, pagesize=landscape(letter), invariant=1, title=title).build(story)
+
+
+def write_xlsx(fname, title, content, chart):
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image
+    from openpyxl.writer.excel import ExcelWriter
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Summary"
+    days, sets, volume = content["totals"]
+    ws.append([title])
+    ws.append(["training days", days])
+    ws.append(["sets", sets])
+    ws.append(["volume", round(volume, 1)])
+    for name, value in content["load"].items():
+        ws.append([name, None if np.isnan(value) else round(value, 3)])
+    ws.append([])
+    ws.append(STAT_COLUMNS)
+    for row in _stat_rows(content):
+        ws.append(row)
+    ws.add_image(Image(io.BytesIO(chart)), "I2")
+    log = wb.create_sheet("Workout Log")
+    log.append(export.COLUMNS)
+    for row in content["records"]:
+        log.append(list(row))
+
+    wb.properties.creator = "workouttracer"
+    wb.properties.created = wb.properties.modified = FIXED_TIME
+    raw = io.BytesIO()
+    # ExcelWriter rather than save_workbook(), which would stamp the current time on `modified`
+    with zipfile.ZipFile(raw, "w", zipfile.ZIP_DEFLATED) as archive:
+        ExcelWriter(wb, archive).save()
+    # Zip entries carry their write time too; copy them with a fixed one
+    with zipfile.ZipFile(raw) as src, zipfile.ZipFile(fname, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            dst.writestr(zipfile.ZipInfo(info.filename, FIXED_TIME.timetuple()[:6]), src.read(info.filename),
+                         zipfile.ZIP_DEFLATED)
+
+
+WRITERS = {"pdf": write_pdf, "xlsx": write_xlsx}
+
+
+def build(task):
+    """Write one profile's reports. `task` is (profile_id, name, month, out_dir, formats, formula).
+    Returns the written file names.
+    """
+    profile_id, name, month, out_dir, formats, formula = task
+    content = _content(profile_id, month, formula)
+    chart = render_chart(content, month)
+    title = f"{name}: {month}"
+    stem = os.path.join(out_dir, _file_stem(profile_id, name, month))
+    written = []
+    for fmt in formats:
+        with instrument.timed(f"report.{fmt}"):
+            WRITERS[fmt](f"{stem}.{fmt}", title, content, chart)
+        written.append(f"{stem}.{fmt}")
+    return written
+
+
+def _init_worker(path):
+    db.DATABASE = path
+    db.READ_ONLY = True
+
+
+def generate(month, out_dir, formats=("pdf",), workers=None, profile_ids=None, formula="epley"):
+    """Write `month` reports for every profile (or those in `profile_ids`) into `out_dir`.
+
+    `workers` processes build them in parallel (default: one per CPU); workers=1 builds them in this
+    process. Returns the written file names, in profile order.
+    """
+    from . import store
+
+    month_range(month)  # validates it
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unsupported report format: {', '.join(sorted(unknown))}")
+    os.makedirs(out_dir, exist_ok=True)
+    profiles = [(pid, name) for pid, name in store.get_profiles()
+                if profile_ids is None or pid in profile_ids]
+    tasks = [(pid, name, month, out_dir, tuple(formats), formula) for pid, name in profiles]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        results = map(build, tasks)
+        return [fname for files in results for fname in files]
+    # spawn: a forked child would inherit the parent's open SQLite connections and any Qt state
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                             initargs=(os.path.abspath(db.DATABASE),)) as pool:
+        return [fname for files in pool.map(build, tasks) for fname in files]
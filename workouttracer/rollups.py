@@ -0,0 +1,123 @@
+# Bucket expressions over a records.date value ({d} is the column plus, for epoch seconds, the
+# 'unixepoch' modifier); weeks start on the ISO Monday.
+PERIODS = {
+    "day": "date({d})",
+    "week": "date({d}, '-6 days', 'weekday 1')",
+    "month": "date({d}, 'start of month')",
+}
+
+_UPSERT = '''
+    INSERT INTO volume_rollups (profile_id, day_type, period, period_start, volume, sets, reps, entries)
+    {select}
+    ON CONFLICT (profile_id, period, period_start, day_type) DO UPDATE SET
+        volume = volume + excluded.volume,
+        sets = sets + excluded.sets,
+        reps = reps + excluded.reps,
+        entries = entries + excluded.entries;
+'''
+
+_PRUNE = "DELETE FROM volume_rollups WHERE entries <= 0;"
+
+
+_BUCKETS = " UNION ALL ".join(f"SELECT '{name}' AS period" for name in PERIODS)
+
+
+def _date(column, epoch):
+    # records.date holds epoch seconds from v6 on, TEXT timestamps before
+    return f"{column}, 'unixepoch'" if epoch else column
+
+
+def _period_start(date_expr):
+    whens = " ".join(f"WHEN '{name}' THEN {expr.format(d=date_expr)}" for name, expr in PERIODS.items())
+    return f"CASE b.period {whens} END"
+
+
+def _apply_record(rec, sign, epoch):
+    # Add (sign=1) or remove (sign=-1) a single record row referenced as rec.* inside a trigger
+    return _UPSERT.format(select=f'''
+        SELECT w.profile_id, COALESCE(w.day_type, ''), b.period, {_period_start(_date(f"{rec}.date", epoch))},
+               {sign} * {rec}.volume, {sign} * {rec}.set_count, {sign} * {rec}.total_reps, {sign}
+        FROM workouts w, ({_BUCKETS}) b
+        WHERE w.id = {rec}.workout_id''')
+
+
+def _apply_workout(w, sign, epoch):
+    # Add or remove every record of one workout row referenced as w.* inside a trigger
+    return _UPSERT.format(select=f'''
+        SELECT {w}.profile_id, COALESCE({w}.day_type, ''), b.period, {_period_start(_date("r.date", epoch))} AS start,
+               {sign} * SUM(r.volume), {sign} * SUM(r.set_count), {sign} * SUM(r.total_reps), {sign} * COUNT(*)
+        FROM records r, ({_BUCKETS}) b
+        WHERE r.workout_id = {w}.id
+        GROUP BY b.period, start''')
+
+
+def triggers(epoch=True):
+    """{name: (event, body)} of the triggers that keep volume_rollups current."""
+    return {
+        "trg_rollup_records_insert": ("AFTER INSERT ON records", _apply_record("NEW", 1, epoch)),
+        "trg_rollup_records_delete": ("AFTER DELETE ON records", _apply_record("OLD", -1, epoch) + _PRUNE),
+        "trg_rollup_records_update": ("AFTER UPDATE OF workout_id, date, volume, set_count, total_reps ON records",
+                                      _apply_record("OLD", -1, epoch) + _apply_record("NEW", 1, epoch) + _PRUNE),
+        "trg_rollup_workouts_delete": ("AFTER DELETE ON workouts", _apply_workout("OLD", -1, epoch) + _PRUNE),
+        "trg_rollup_workouts_update": ("AFTER UPDATE OF profile_id, day_type ON workouts",
+                                       _apply_workout("OLD", -1, epoch) + _apply_workout("NEW", 1, epoch) + _PRUNE),
+    }
+
+
+def create_table(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS volume_rollups (
+                 profile_id INTEGER NOT NULL,
+                 day_type TEXT NOT NULL,
+                 period TEXT NOT NULL, -- day/week/month
+                 period_start TEXT NOT NULL, -- YYYY-MM-DD
+                 volume REAL NOT NULL DEFAULT 0,
+                 sets INTEGER NOT NULL DEFAULT 0,
+                 reps INTEGER NOT NULL DEFAULT 0,
+                 entries INTEGER NOT NULL DEFAULT 0,
+                 PRIMARY KEY (profile_id, period, period_start, day_type)
+                 ) WITHOUT ROWID''')
+
+
+def create(c, epoch=True):
+    """The table and its triggers; `epoch` is False for databases still storing TEXT dates (before v6)."""
+    create_table(c)
+    for name, (event, body) in triggers(epoch).items():
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+
+
+def rebuild(c, profile_id=None, epoch=True, records="records"):
+    """Recompute the rollups from the raw records, for one profile or all of them.
+
+    `records` may name a view over more records than main's, e.g. archive's all_records. Runs on the
+    caller's connection `c`, inside its transaction.
+    """
+    where = "" if profile_id is None else "WHERE w.profile_id = ?"
+    params = () if profile_id is None else (profile_id,)
+    c.execute("DELETE FROM volume_rollups " + ("" if profile_id is None else "WHERE profile_id = ?"), params)
+    # Grouped by the source columns: from v6 on, records has a `day` column of its own
+    c.execute(f'''
+        INSERT INTO volume_rollups (profile_id, day_type, period, period_start, volume, sets, reps, entries)
+        SELECT w.profile_id, COALESCE(w.day_type, ''), b.period, {_period_start(_date("r.date", epoch))} AS start,
+               SUM(r.volume), SUM(r.set_count), SUM(r.total_reps), COUNT(*)
+        FROM {records} r
+        JOIN workouts w ON r.workout_id = w.id,
+             ({_BUCKETS}) b
+        {where}
+        GROUP BY w.profile_id, w.day_type, b.period, start''', params)
+
+
+def remove(c, records, where, params=()):
+    """Take the rows of another records table matching `where` (over `r`) out of the rollups, e.g. an
+    archive's, which no trigger watches. Runs on the caller's connection `c`, inside its transaction.
+    """
+    c.execute(_UPSERT.format(select=f'''
+        SELECT w.profile_id, COALESCE(w.day_type, ''), b.period, {_period_start(_date("r.date", True))} AS start,
+               -SUM(r.volume), -SUM(r.set_count), -SUM(r.total_reps), -COUNT(*)
+        FROM {records} r
+        JOIN workouts w ON r.workout_id = w.id,
+             ({_BUCKETS}) b
+        WHERE {where}
+        GROUP BY w.profile_id, w.day_type, b.period, start'''), params)
+    c.execute(_PRUNE)
+
@@ -0,0 +1,500 @@
+import sqlite3
+
+from . import db, shards
+
+# Every step below carries its own SQL as it first ran. Steps never call into the modules that own
+# these tables today: their code follows the current schema, and an old database upgrading through
+# a step must get exactly what that step created back then.
+
+_NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+_ROLLUPS_TABLE = '''CREATE TABLE IF NOT EXISTS volume_rollups (
+                 profile_id INTEGER NOT NULL,
+                 day_type TEXT NOT NULL,
+                 period TEXT NOT NULL, -- day/week/month
+                 period_start TEXT NOT NULL, -- YYYY-MM-DD
+                 volume REAL NOT NULL DEFAULT 0,
+                 sets INTEGER NOT NULL DEFAULT 0,
+                 reps INTEGER NOT NULL DEFAULT 0,
+                 entries INTEGER NOT NULL DEFAULT 0,
+                 PRIMARY KEY (profile_id, period, period_start, day_type)
+                 ) WITHOUT ROWID'''
+
+_ROLLUP_UPSERT = '''
+    INSERT INTO volume_rollups (profile_id, day_type, period, period_start, volume, sets, reps, entries)
+    {select}
+    ON CONFLICT (profile_id, period, period_start, day_type) DO UPDATE SET
+        volume = volume + excluded.volume,
+        sets = sets + excluded.sets,
+        reps = reps + excluded.reps,
+        entries = entries + excluded.entries;
+'''
+
+_ROLLUP_PRUNE = "DELETE FROM volume_rollups WHERE entries <= 0;"
+
+_ROLLUP_BUCKETS = "SELECT 'day' AS period UNION ALL SELECT 'week' AS period UNION ALL SELECT 'month' AS period"
+
+_ROLLUP_TRIGGERS = ("trg_rollup_records_insert", "trg_rollup_records_delete", "trg_rollup_records_update",
+                    "trg_rollup_workouts_delete", "trg_rollup_workouts_update")
+
+_CHANGELOG_TRIGGERS = tuple(f"trg_changelog_{table}_{event}" for table in ("profiles", "workouts", "records")
+                            for event in ("insert", "update", "delete"))
+
+
+def _rollup_start(column, epoch):
+    # The period bucket of a records.date value: TEXT timestamps before v6, epoch seconds from then on
+    d = f"{column}, 'unixepoch'" if epoch else column
+    return (f"CASE b.period WHEN 'day' THEN date({d}) WHEN 'week' THEN date({d}, '-6 days', 'weekday 1') "
+            f"WHEN 'month' THEN date({d}, 'start of month') END")
+
+
+def _create_rollup_triggers(c, epoch):
+    # The triggers keeping volume_rollups current, as v4 (epoch=False), v6 and v8 installed them
+    def record(rec, sign):
+        return _ROLLUP_UPSERT.format(select=f'''
+        SELECT w.profile_id, COALESCE(w.day_type, ''), b.period, {_rollup_start(f"{rec}.date", epoch)},
+               {sign} * {rec}.volume, {sign} * {rec}.set_count, {sign} * {rec}.total_reps, {sign}
+        FROM workouts w, ({_ROLLUP_BUCKETS}) b
+        WHERE w.id = {rec}.workout_id''')
+
+    def workout(w, sign):
+        return _ROLLUP_UPSERT.format(select=f'''
+        SELECT {w}.profile_id, COALESCE({w}.day_type, ''), b.period, {_rollup_start("r.date", epoch)} AS start,
+               {sign} * SUM(r.volume), {sign} * SUM(r.set_count), {sign} * SUM(r.total_reps), {sign} * COUNT(*)
+        FROM records r, ({_ROLLUP_BUCKETS}) b
+        WHERE r.workout_id = {w}.id
+        GROUP BY b.period, start''')
+
+    c.execute(_ROLLUPS_TABLE)
+    for name, event, body in [
+        ("trg_rollup_records_insert", "AFTER INSERT ON records", record("NEW", 1)),
+        ("trg_rollup_records_delete", "AFTER DELETE ON records", record("OLD", -1) + _ROLLUP_PRUNE),
+        ("trg_rollup_records_update", "AFTER UPDATE OF workout_id, date, volume, set_count, total_reps ON records",
+         record("OLD", -1) + record("NEW", 1) + _ROLLUP_PRUNE),
+        ("trg_rollup_workouts_delete", "AFTER DELETE ON workouts", workout("OLD", -1) + _ROLLUP_PRUNE),
+        ("trg_rollup_workouts_update", "AFTER UPDATE OF profile_id, day_type ON workouts",
+         workout("OLD", -1) + workout("NEW", 1) + _ROLLUP_PRUNE),
+    ]:
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+
+
+def _changelog_key(table, row, catalogued):
+    # A row's sync key; a workout's exercise name comes from its own column before v7, the catalog after
+    exercise = f"(SELECT name FROM exercises WHERE id = {row}.exercise_id)" if catalogued else f"{row}.exercise"
+    return {
+        "profiles": f"json_array({row}.name)",
+        "workouts": f"json_array((SELECT name FROM profiles WHERE id = {row}.profile_id), {row}.day_type, {exercise})",
+        "records": f"json_array({row}.origin, COALESCE({row}.origin_id, {row}.id))",
+    }[table]
+
+
+def _create_changelog_triggers(c, catalogued):
+    # The change-log triggers as v5 and v6 (catalogued=False), v7 and v8 installed them
+    def log(table, row, op):
+        return (f"INSERT INTO changelog (tbl, key, op, at) "
+                f"VALUES ('{table}', {_changelog_key(table, row, catalogued)}, '{op}', {_NOW_MS});")
+
+    def rekeyed(table):
+        old, new = _changelog_key(table, "OLD", catalogued), _changelog_key(table, "NEW", catalogued)
+        return (f"INSERT INTO changelog (tbl, key, op, at) SELECT '{table}', {old}, 'D', {_NOW_MS} "
+                f"WHERE {old} IS NOT {new};" + log(table, "NEW", "U"))
+
+    for name, event, body in [
+        ("trg_changelog_profiles_insert", "AFTER INSERT ON profiles", log("profiles", "NEW", "U")),
+        ("trg_changelog_profiles_update", "AFTER UPDATE OF name ON profiles", rekeyed("profiles")),
+        ("trg_changelog_profiles_delete", "AFTER DELETE ON profiles", log("profiles", "OLD", "D")),
+        ("trg_changelog_workouts_insert", "AFTER INSERT ON workouts", log("workouts", "NEW", "U")),
+        ("trg_changelog_workouts_update", "AFTER UPDATE ON workouts", rekeyed("workouts")),
+        ("trg_changelog_workouts_delete", "AFTER DELETE ON workouts", log("workouts", "OLD", "D")),
+        ("trg_changelog_records_insert", "AFTER INSERT ON records", log("records", "NEW", "U")),
+        ("trg_changelog_records_update", "AFTER UPDATE ON records", log("records", "NEW", "U")),
+        ("trg_changelog_records_delete", "AFTER DELETE ON records", log("records", "OLD", "D")),
+    ]:
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+
+
+# The exercises every catalog started with in v7: (name, aliases, muscle groups)
+_V7_SEED = [
+    ("Bench Press", ["Bench", "Flat Bench", "Barbell Bench Press"], ["chest", "triceps", "shoulders"]),
+    ("Incline Bench Press", ["Incline Bench"], ["chest", "shoulders", "triceps"]),
+    ("Dumbbell Bench Press", ["DB Bench"], ["chest", "triceps", "shoulders"]),
+    ("Overhead Press", ["OHP", "Military Press", "Shoulder Press"], ["shoulders", "triceps"]),
+    ("Dumbbell Shoulder Press", ["DB Shoulder Press"], ["shoulders", "triceps"]),
+    ("Push-up", ["Pushup", "Press-up"], ["chest", "triceps", "shoulders"]),
+    ("Dip", ["Dips", "Parallel Bar Dip"], ["chest", "triceps"]),
+    ("Chest Fly", ["Dumbbell Fly", "Pec Fly", "Cable Fly"], ["chest"]),
+    ("Lateral Raise", ["Side Raise", "Lateral Raises"], ["shoulders"]),
+    ("Front Raise", [], ["shoulders"]),
+    ("Triceps Pushdown", ["Pushdown", "Cable Pushdown"], ["triceps"]),
+    ("Skull Crusher", ["Lying Triceps Extension"], ["triceps"]),
+    ("Overhead Triceps Extension", ["French Press"], ["triceps"]),
+    ("Close-Grip Bench Press", ["CGBP"], ["triceps", "chest"]),
+    ("Deadlift", ["Conventional Deadlift", "DL"], ["back", "hamstrings", "glutes"]),
+    ("Sumo Deadlift", [], ["glutes", "quads", "back"]),
+    ("Romanian Deadlift", ["RDL", "Stiff-Leg Deadlift"], ["hamstrings", "glutes", "back"]),
+    ("Pull-up", ["Pullup", "Chin-up", "Chinup"], ["back", "biceps"]),
+    ("Lat Pulldown", ["Pulldown"], ["back", "biceps"]),
+    ("Barbell Row", ["Bent-Over Row", "BB Row"], ["back", "biceps"]),
+    ("Dumbbell Row", ["One-Arm Row", "DB Row"], ["back", "biceps"]),
+    ("Seated Cable Row", ["Cable Row"], ["back", "biceps"]),
+    ("Face Pull", [], ["shoulders", "back"]),
+    ("Shrug", ["Shrugs"], ["traps"]),
+    ("Barbell Curl", ["Curl", "Biceps Curl"], ["biceps"]),
+    ("Dumbbell Curl", ["DB Curl"], ["biceps"]),
+    ("Hammer Curl", [], ["biceps", "forearms"]),
+    ("Back Squat", ["Squat", "Barbell Squat"], ["quads", "glutes"]),
+    ("Front Squat", [], ["quads", "glutes"]),
+    ("Leg Press", [], ["quads", "glutes"]),
+    ("Lunge", ["Lunges", "Walking Lunge"], ["quads", "glutes"]),
+    ("Bulgarian Split Squat", ["Split Squat", "BSS"], ["quads", "glutes"]),
+    ("Leg Extension", [], ["quads"]),
+    ("Leg Curl", ["Hamstring Curl"], ["hamstrings"]),
+    ("Hip Thrust", ["Barbell Hip Thrust"], ["glutes", "hamstrings"]),
+    ("Calf Raise", ["Standing Calf Raise"], ["calves"]),
+    ("Plank", [], ["core"]),
+    ("Hanging Leg Raise", ["Leg Raise"], ["core"]),
+    ("Cable Crunch", ["Crunch"], ["core"]),
+]
+
+
+def _v7_add_exercise(c, name, aliases, muscles):
+    # Add an exercise, or merge aliases and muscle groups into the one `name` already resolves to
+    row = c.execute("SELECT id FROM exercises WHERE name = ?", (name,)).fetchone() \
+        or c.execute("SELECT exercise_id FROM exercise_aliases WHERE alias = ?", (name,)).fetchone()
+    exercise_id = row[0] if row else c.execute("INSERT INTO exercises (name) VALUES (?)", (name,)).lastrowid
+    if muscles:
+        current = c.execute("SELECT muscles FROM exercises WHERE id = ?", (exercise_id,)).fetchone()[0]
+        tags = [t for t in current.split(",") if t]
+        tags += [t for t in (m.strip().lower() for m in muscles) if t and t not in tags]
+        if ",".join(tags) != current:
+            c.execute("UPDATE exercises SET muscles = ? WHERE id = ?", (",".join(tags), exercise_id))
+    c.executemany("INSERT OR IGNORE INTO exercise_aliases (alias, exercise_id) "
+                  "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM exercises WHERE name = ?)",
+                  [(alias, exercise_id, alias) for alias in (a.strip() for a in aliases) if alias])
+
+
+def _v1_base_tables(c):
+    # Profiles
+    c.execute('''CREATE TABLE IF NOT EXISTS profiles (
+                 id INTEGER PRIMARY KEY,
+                 name TEXT UNIQUE NOT NULL
+                 )''')
+    # Workouts (template: sets, no reps/weight yet)
+    c.execute('''CREATE TABLE IF NOT EXISTS workouts (
+                 id INTEGER PRIMARY KEY,
+                 profile_id INTEGER,
+                 day_type TEXT, -- push/pull/legs
+                 exercise TEXT,
+                 sets INTEGER,
+                 FOREIGN KEY(profile_id) REFERENCES profiles(id)
+                 )''')
+    # Records: user tracks reps/weight/RPE, etc.
+    c.execute('''CREATE TABLE IF NOT EXISTS records (
+                 id INTEGER PRIMARY KEY,
+                 workout_id INTEGER,
+                 date TEXT,
+                 reps INTEGER,
+                 weight REAL,
+                 rest INTEGER,
+                 rpe INTEGER,
+                 heart_rate INTEGER,
+                 volume REAL,
+                 FOREIGN KEY(workout_id) REFERENCES workouts(id)
+                 )''')
+
+
+def _v2_indexes(c):
+    # Template lookups by profile / day
+    c.execute("CREATE INDEX IF NOT EXISTS idx_workouts_profile_day ON workouts(profile_id, day_type)")
+    # Joins from workouts into records, covering the date filter and the volume sum
+    c.execute("CREATE INDEX IF NOT EXISTS idx_records_workout_date ON records(workout_id, date, volume)")
+    # Date-range scans that don't start from a workout
+    c.execute("CREATE INDEX IF NOT EXISTS idx_records_date ON records(date, workout_id, volume)")
+    c.execute("ANALYZE")
+
+
+def _v3_volume_rollups(c):
+    # Per-profile/day_type volume at day, ISO-week and month granularity. The triggers that keep it
+    # current read columns added in v4, so they are installed (and the table filled) there.
+    c.execute(_ROLLUPS_TABLE)
+
+
+def _v4_record_sets(c):
+    # One row per performed set; records keeps one row per exercise per session with the set totals
+    c.execute("ALTER TABLE records ADD COLUMN set_count INTEGER NOT NULL DEFAULT 0")
+    c.execute("ALTER TABLE records ADD COLUMN total_reps INTEGER NOT NULL DEFAULT 0")
+    c.execute('''CREATE TABLE IF NOT EXISTS record_sets (
+                 record_id INTEGER NOT NULL,
+                 set_no INTEGER NOT NULL, -- 1-based, in the order performed
+                 reps INTEGER,
+                 weight REAL,
+                 rpe INTEGER,
+                 heart_rate INTEGER,
+                 volume REAL,
+                 PRIMARY KEY (record_id, set_no),
+                 FOREIGN KEY(record_id) REFERENCES records(id)
+                 ) WITHOUT ROWID''')
+    # Existing records were logged as `sets` identical sets of the workout template
+    c.execute('''UPDATE records SET
+                 set_count = COALESCE((SELECT sets FROM workouts w WHERE w.id = records.workout_id), 1),
+                 total_reps = reps * COALESCE((SELECT sets FROM workouts w WHERE w.id = records.workout_id), 1)''')
+    c.execute('''WITH RECURSIVE n(k) AS (SELECT 1 UNION ALL
+                                        SELECT k + 1 FROM n WHERE k < (SELECT MAX(set_count) FROM records))
+                 INSERT INTO record_sets (record_id, set_no, reps, weight, rpe, heart_rate, volume)
+                 SELECT r.id, n.k, r.reps, r.weight, r.rpe, r.heart_rate, r.reps * r.weight
+                 FROM records r JOIN n ON n.k <= r.set_count''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS trg_record_sets_delete AFTER DELETE ON records
+                 BEGIN DELETE FROM record_sets WHERE record_id = OLD.id; END''')
+    _create_rollup_triggers(c, epoch=False)
+    c.execute("DELETE FROM volume_rollups")
+    c.execute(f'''INSERT INTO volume_rollups (profile_id, day_type, period, period_start, volume, sets, reps, entries)
+                  SELECT w.profile_id, COALESCE(w.day_type, \'\'), b.period, {_rollup_start("r.date", False)} AS start,
+                         SUM(r.volume), SUM(r.set_count), SUM(r.total_reps), COUNT(*)
+                  FROM records r JOIN workouts w ON r.workout_id = w.id, ({_ROLLUP_BUCKETS}) b
+                  GROUP BY w.profile_id, w.day_type, b.period, start''')
+
+
+def _v5_changelog(c):
+    # Change tracking for sync: record origins, the change log and its triggers, sync bookkeeping.
+    # Every existing row is logged as a change.
+    c.execute("ALTER TABLE records ADD COLUMN origin TEXT")
+    c.execute("ALTER TABLE records ADD COLUMN origin_id INTEGER")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_records_origin ON records(origin, origin_id) "
+              "WHERE origin IS NOT NULL")
+    c.execute('''CREATE TABLE IF NOT EXISTS changelog (
+                 seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                 tbl TEXT NOT NULL,
+                 key TEXT NOT NULL, -- JSON array, see sync._KEYS
+                 op TEXT NOT NULL, -- 'U' (row written) or 'D' (row deleted)
+                 at INTEGER NOT NULL, -- ms since 1970-01-01 UTC
+                 source TEXT -- device that made the change; NULL for this one
+                 )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_changelog_key ON changelog(tbl, key, seq)")
+    c.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("INSERT OR IGNORE INTO sync_state VALUES ('device', lower(hex(randomblob(8))))")
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_peers (
+                 device TEXT PRIMARY KEY,
+                 received INTEGER NOT NULL DEFAULT 0, -- their last change applied here
+                 acked INTEGER NOT NULL DEFAULT 0 -- our last change they have applied
+                 )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_conflicts (
+                 id INTEGER PRIMARY KEY,
+                 tbl TEXT NOT NULL,
+                 key TEXT NOT NULL,
+                 device TEXT NOT NULL, -- the peer whose bundle conflicted
+                 winner TEXT NOT NULL, -- 'local' or 'remote'
+                 local TEXT, -- both versions as JSON (op, at, data)
+                 remote TEXT,
+                 at INTEGER NOT NULL
+                 )''')
+    for table in ("profiles", "workouts", "records"):
+        c.execute(f"INSERT INTO changelog (tbl, key, op, at) SELECT '{table}', {_changelog_key(table, table, False)}, "
+                  f"'U', {_NOW_MS} FROM {table} ORDER BY id")
+    _create_changelog_triggers(c, catalogued=False)
+
+
+def _v6_epoch_dates(c):
+    # records.date becomes INTEGER seconds since 1970-01-01 (wall-clock time, like the TEXT it replaces),
+    # with a derived day number and a session_id shared by the records logged together. Column types
+    # can't be altered in place, so the table is rebuilt; the rollup triggers on workouts read records
+    # and go first so the rename below finds nothing referring to the missing table.
+    for name in _ROLLUP_TRIGGERS:
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+    c.execute('''CREATE TABLE records_v6 (
+                 id INTEGER PRIMARY KEY,
+                 workout_id INTEGER,
+                 date INTEGER, -- seconds since 1970-01-01, local wall-clock time
+                 day INTEGER GENERATED ALWAYS AS (date / 86400) VIRTUAL, -- days since 1970-01-01
+                 session_id INTEGER, -- records of one profile logged at the same time
+                 reps INTEGER,
+                 weight REAL,
+                 rest INTEGER,
+                 rpe INTEGER,
+                 heart_rate INTEGER,
+                 volume REAL,
+                 set_count INTEGER NOT NULL DEFAULT 0,
+                 total_reps INTEGER NOT NULL DEFAULT 0,
+                 origin TEXT,
+                 origin_id INTEGER,
+                 FOREIGN KEY(workout_id) REFERENCES workouts(id)
+                 )''')
+    fields = "reps, weight, rest, rpe, heart_rate, volume, set_count, total_reps, origin, origin_id"
+    # Sessions were the records of a profile sharing one date string
+    c.execute(f'''INSERT INTO records_v6 (id, workout_id, date, session_id, {fields})
+                  SELECT r.id, r.workout_id, CAST(strftime('%s', r.date) AS INTEGER),
+                         DENSE_RANK() OVER (ORDER BY w.profile_id, r.date), r.{fields.replace(", ", ", r.")}
+                  FROM records r LEFT JOIN workouts w ON w.id = r.workout_id''')
+    c.execute("DROP TABLE records")
+    c.execute("ALTER TABLE records_v6 RENAME TO records")
+    # The v2 indexes again, the per-workout one also covering session grouping
+    c.execute("CREATE INDEX idx_records_workout_date ON records(workout_id, date, volume, session_id)")
+    c.execute("CREATE INDEX idx_records_date ON records(date, workout_id, volume)")
+    c.execute("CREATE INDEX idx_records_session ON records(session_id)")
+    c.execute("CREATE UNIQUE INDEX idx_records_origin ON records(origin, origin_id) WHERE origin IS NOT NULL")
+    c.execute("ANALYZE")
+    c.execute('''CREATE TRIGGER trg_record_sets_delete AFTER DELETE ON records
+                 BEGIN DELETE FROM record_sets WHERE record_id = OLD.id; END''')
+    _create_rollup_triggers(c, epoch=True)
+    _create_changelog_triggers(c, catalogued=False)
+
+
+def _v7_exercise_catalog(c):
+    # Exercises move from free text in workouts to the catalog and are referenced by id. A profile's
+    # day holds each exercise once, so duplicates (same name, ignoring case) merge into the oldest.
+    c.execute('''CREATE TABLE IF NOT EXISTS exercises (
+                 id INTEGER PRIMARY KEY,
+                 name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                 muscles TEXT NOT NULL DEFAULT '' -- comma-separated muscle groups
+                 )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS exercise_aliases (
+                 alias TEXT PRIMARY KEY COLLATE NOCASE,
+                 exercise_id INTEGER NOT NULL,
+                 FOREIGN KEY(exercise_id) REFERENCES exercises(id)
+                 ) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_exercise_aliases_exercise ON exercise_aliases(exercise_id)")
+    try:
+        c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS exercise_search USING fts5("
+                  "name, aliases, muscles, prefix='1 2 3', tokenize='unicode61 remove_diacritics 2')")
+    except sqlite3.OperationalError:
+        pass  # no FTS5 in this SQLite
+    else:
+        for name, event, exercise_id in [("trg_exercises_insert", "AFTER INSERT ON exercises", "NEW.id"),
+                                         ("trg_exercises_update", "AFTER UPDATE ON exercises", "NEW.id"),
+                                         ("trg_exercise_aliases_insert", "AFTER INSERT ON exercise_aliases",
+                                          "NEW.exercise_id"),
+                                         ("trg_exercise_aliases_delete", "AFTER DELETE ON exercise_aliases",
+                                          "OLD.exercise_id")]:
+            c.execute(f"DROP TRIGGER IF EXISTS {name}")
+            c.execute(f"CREATE TRIGGER {name} {event} BEGIN DELETE FROM exercise_search WHERE rowid = {exercise_id}; "
+                      f"INSERT INTO exercise_search (rowid, name, aliases, muscles) "
+                      f"SELECT id, name, (SELECT group_concat(alias, ' ') FROM exercise_aliases "
+                      f"WHERE exercise_id = exercises.id), muscles FROM exercises WHERE id = {exercise_id}; END")
+        c.execute("DROP TRIGGER IF EXISTS trg_exercises_delete")
+        c.execute("CREATE TRIGGER trg_exercises_delete AFTER DELETE ON exercises "
+                  "BEGIN DELETE FROM exercise_search WHERE rowid = OLD.id; END")
+    c.execute("INSERT OR IGNORE INTO exercises (name) SELECT exercise FROM workouts WHERE exercise IS NOT NULL "
+              "GROUP BY exercise ORDER BY MIN(id)")
+    for name, aliases, muscles in _V7_SEED:
+        _v7_add_exercise(c, name, aliases, muscles)
+    # The change-log triggers on workouts read the text column; they come back keyed through the catalog
+    for name in _CHANGELOG_TRIGGERS:
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+    c.execute("ALTER TABLE workouts ADD COLUMN exercise_id INTEGER REFERENCES exercises(id)")
+    c.execute("UPDATE workouts SET exercise_id = (SELECT id FROM exercises e WHERE e.name = workouts.exercise)")
+    # Workouts whose key changes now that names come from the catalog (names differing only in case
+    # merge) are logged as a delete of the old key and a write of the new one
+    old, new = _changelog_key("workouts", "workouts", False), _changelog_key("workouts", "workouts", True)
+    c.execute(f"CREATE TEMP TABLE rekeyed AS SELECT old, new FROM (SELECT {old} AS old, {new} AS new FROM workouts) "
+              f"WHERE old IS NOT new")
+    c.execute(f"INSERT INTO changelog (tbl, key, op, at) SELECT 'workouts', old, 'D', {_NOW_MS} FROM temp.rekeyed")
+    c.execute(f"INSERT INTO changelog (tbl, key, op, at) SELECT DISTINCT 'workouts', new, 'U', {_NOW_MS} "
+              f"FROM temp.rekeyed")
+    c.execute("DROP TABLE temp.rekeyed")
+    c.execute('''CREATE TEMP TABLE merged AS
+                 SELECT id, MIN(id) OVER (PARTITION BY profile_id, day_type, exercise_id) AS keep
+                 FROM workouts WHERE exercise_id IS NOT NULL''')
+    c.execute("DELETE FROM temp.merged WHERE id = keep")
+    c.execute("UPDATE records SET workout_id = (SELECT keep FROM temp.merged m WHERE m.id = records.workout_id) "
+              "WHERE workout_id IN (SELECT id FROM temp.merged)")
+    c.execute("DELETE FROM workouts WHERE id IN (SELECT id FROM temp.merged)")
+    c.execute("DROP TABLE temp.merged")
+    c.execute("ALTER TABLE workouts DROP COLUMN exercise")
+    c.execute("DROP INDEX IF EXISTS idx_workouts_profile_day")
+    c.execute("CREATE UNIQUE INDEX idx_workouts_day_exercise ON workouts(profile_id, day_type, exercise_id)")
+    _create_changelog_triggers(c, catalogued=True)
+
+
+def _v8_archives(c):
+    # Old records can move out to yearly archive databases (see archive). Their ids must never be
+    # handed out again once they are gone from main, which takes AUTOINCREMENT, so records is rebuilt
+    # as in v6 with the same columns.
+    for name in _ROLLUP_TRIGGERS:
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+    c.execute('''CREATE TABLE records_v8 (
+                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 workout_id INTEGER,
+                 date INTEGER, -- seconds since 1970-01-01, local wall-clock time
+                 day INTEGER GENERATED ALWAYS AS (date / 86400) VIRTUAL, -- days since 1970-01-01
+                 session_id INTEGER, -- records of one profile logged at the same time
+                 reps INTEGER,
+                 weight REAL,
+                 rest INTEGER,
+                 rpe INTEGER,
+                 heart_rate INTEGER,
+                 volume REAL,
+                 set_count INTEGER NOT NULL DEFAULT 0,
+                 total_reps INTEGER NOT NULL DEFAULT 0,
+                 origin TEXT,
+                 origin_id INTEGER,
+                 FOREIGN KEY(workout_id) REFERENCES workouts(id)
+                 )''')
+    fields = ("id, workout_id, date, session_id, reps, weight, rest, rpe, heart_rate, volume, set_count, total_reps, "
+              "origin, origin_id")
+    c.execute(f"INSERT INTO records_v8 ({fields}) SELECT {fields} FROM records ORDER BY id")
+    c.execute("DROP TABLE records")
+    c.execute("ALTER TABLE records_v8 RENAME TO records")
+    c.execute("CREATE INDEX idx_records_workout_date ON records(workout_id, date, volume, session_id)")
+    c.execute("CREATE INDEX idx_records_date ON records(date, workout_id, volume)")
+    c.execute("CREATE INDEX idx_records_session ON records(session_id)")
+    c.execute("CREATE UNIQUE INDEX idx_records_origin ON records(origin, origin_id) WHERE origin IS NOT NULL")
+    c.execute("ANALYZE")
+    c.execute('''CREATE TRIGGER trg_record_sets_delete AFTER DELETE ON records
+                 BEGIN DELETE FROM record_sets WHERE record_id = OLD.id; END''')
+    _create_rollup_triggers(c, epoch=True)
+    _create_changelog_triggers(c, catalogued=True)
+    c.execute('''CREATE TABLE IF NOT EXISTS archives (
+                 year INTEGER PRIMARY KEY,
+                 file TEXT NOT NULL, -- relative to the main database's directory
+                 records INTEGER NOT NULL DEFAULT 0,
+                 last_session INTEGER, -- highest session_id in it
+                 last_date INTEGER -- newest records.date in it
+                 )''')
+
+
+def _v9_shards(c):
+    # A profile's workouts and records can live in a database of their own (see shards); main keeps
+    # the profiles as a directory of them
+    c.execute("ALTER TABLE profiles ADD COLUMN shard TEXT")  # relative to main's directory; NULL = in main
+    c.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+
+
+# Ordered schema steps; after applying MIGRATIONS[i] the database is at user_version i + 1.
+# Only ever append to this list.
+MIGRATIONS = [
+    _v1_base_tables,
+    _v2_indexes,
+    _v3_volume_rollups,
+    _v4_record_sets,
+    _v5_changelog,
+    _v6_epoch_dates,
+    _v7_exercise_catalog,
+    _v8_archives,
+    _v9_shards,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(path=None):
+    return db.query_one("PRAGMA user_version", path=path)[0]
+
+
+def migrate(path=None, target=SCHEMA_VERSION):
+    """Upgrade the database in place to `target`, one transaction per step. Returns the new version."""
+    version = get_version(path)
+    while version < target:
+        with db.transaction(path) as c:
+            MIGRATIONS[version](c)
+            version += 1
+            c.execute(f"PRAGMA user_version={version}")
+    return version
+
+
+def init_db(path=None):
+    migrate(path)
+    # Shards are databases of the same schema
+    for target in shards.databases(path=path):
+        if target != path:
+            migrate(target)
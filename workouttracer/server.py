@@ -0,0 +1,424 @@
+"""Local HTTP/JSON API over the data layer, for running one database for many athletes.
+
+    python -m workouttracer --db gym.db serve --port 8765
+
+Reads run on a pool of threads, each with its own WAL connection, so they proceed in parallel.
+Writes go through one queue to a single writer thread. The writer commits whatever has queued up in
+one transaction, with a savepoint per request so one bad request doesn't fail the others.
+Connections are kept alive, and POST /batch runs several requests in one round trip.
+
+Routes (JSON bodies and responses):
+    GET    /profiles                            [{id, name}]
+    POST   /profiles                            {name} -> {id}
+    GET    /profiles/<id>/workouts              [{id, day_type, exercise, sets}]
+    POST   /profiles/<id>/workouts              {day_type, exercise, sets}
+    DELETE /profiles/<id>/workouts?day_type=&exercise=
+    GET    /profiles/<id>/records?from=&to=&day=&limit=&offset=
+    POST   /profiles/<id>/sessions              {day_type, date?, rows: [[exercise, sets, reps, weight, ...]]}
+    GET    /profiles/<id>/summary?period=weekly|monthly
+    GET    /profiles/<id>/analytics?day=&formula=
+    GET    /profiles/<id>/export?format=csv|xlsx|pdf|parquet&from=&to=&day=   (file download)
+    GET    /exercises?q=&limit=                 [{id, name}] catalog matches for autocomplete
+    GET    /totals?from=&to=                    [{id, name, volume, sets, reps, records}] for every profile
+    POST   /batch                               [{method, path, body?}] -> [{status, body}]
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from . import analytics, archive, catalog, db, export, shards, store
+
+READERS = 4
+# Most writes committed together in one transaction
+MAX_WRITE_BATCH = 64
+MAX_BODY = 16 * 1024 * 1024
+MAX_HEADERS = 100
+KEEPALIVE_TIMEOUT = 30
+FILE_CHUNK = 64 * 1024
+
+_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class FileResponse:
+    """A handler result streamed from a file on disk, which is deleted afterwards."""
+
+    def __init__(self, fname, content_type):
+        self.fname = fname
+        self.content_type = content_type
+
+
+def _profile_id(params):
+    pid = int(params["profile"])
+    if not any(p == pid for p, _ in store.get_profiles()):
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No such profile: {pid}")
+    return pid
+
+
+def _required(body, *names):
+    if not isinstance(body, dict):
+        raise ValueError("Expected a JSON object")
+    missing = [n for n in names if body.get(n) in (None, "")]
+    if missing:
+        raise ValueError(f"Missing field(s): {', '.join(missing)}")
+    return [body[n] for n in names]
+
+
+# Handlers take (path params, query params, JSON body) and return something JSON-serializable
+
+def list_profiles(params, query, body):
+    return [{"id": pid, "name": name} for pid, name in store.get_profiles()]
+
+
+def create_profile(params, query, body):
+    name, = _required(body, "name")
+    store.create_profile(str(name))
+    return {"id": store.find_profile(str(name))}
+
+
+def list_workouts(params, query, body):
+    rows = store.list_workouts(_profile_id(params))
+    return [{"id": wid, "day_type": day, "exercise": ex, "sets": sets} for wid, day, ex, sets in rows]
+
+
+def add_workout(params, query, body):
+    day_type, exercise = _required(body, "day_type", "exercise")
+    store.add_workout(_profile_id(params), day_type, exercise, int(body.get("sets") or 3))
+    return {"ok": True}
+
+
+def delete_workout(params, query, body):
+    store.delete_workout(_profile_id(params), query.get("day_type"), query.get("exercise"))
+    return {"ok": True}
+
+
+def search_exercises(params, query, body):
+    matches = catalog.search(query.get("q", ""), min(int(query.get("limit", 20)), 100))
+    return [{"id": eid, "name": name} for eid, name in matches]
+
+
+def list_records(params, query, body):
+    rows = export.fetch_page(_profile_id(params), query.get("from"), query.get("to"), query.get("day"),
+                             min(int(query.get("limit", 500)), export.CHUNK_SIZE), int(query.get("offset", 0)))
+    return [dict(zip(export.COLUMNS, row)) for row in rows]
+
+
+def _session_row(row):
+    # A list in SESSION_COLUMNS order or an object keyed by them; omitted trailing fields are 0
+    if isinstance(row, dict):
+        return [row.get(name, 0) for name in store.SESSION_COLUMNS]
+    return list(row) + [0] * (len(store.SESSION_COLUMNS) - len(row))
+
+
+def log_session(params, query, body):
+    day_type, rows = _required(body, "day_type", "rows")
+    date = datetime.fromisoformat(body["date"]) if body.get("date") else None
+    return {"records": store.save_session(_profile_id(params), day_type, [_session_row(r) for r in rows], date)}
+
+
+def summary(params, query, body):
+    period = query.get("period", "weekly")
+    if period not in ("weekly", "monthly"):
+        raise ValueError("period must be weekly or monthly")
+    rows = analytics.period_summary(_profile_id(params), period)
+    return {"periods": [{"start": start, "volume": volume} for start, volume in rows],
+            "suggestion": analytics.suggestion(rows)}
+
+
+def analytics_report(params, query, body):
+    formula = query.get("formula", "epley")
+    if formula not in analytics.FORMULAS:
+        raise ValueError(f"formula must be one of {', '.join(analytics.FORMULAS)}")
+    result = analytics.report(_profile_id(params), query.get("day"), formula)
+    keys = ("exercise", "best_e1rm", "best_date", "latest_e1rm", "prs", "kg_per_week")
+    exercises = [{k: (None if isinstance(v, float) and v != v else v) for k, v in zip(keys, row)}
+                 for row in result["exercises"]]
+    load = {k: (None if isinstance(v, float) and v != v else v) for k, v in result["load"].items()}
+    return {"exercises": exercises, "load": load}
+
+
+def export_file(params, query, body):
+    fmt = query.get("format", "csv")
+    if fmt not in export.WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    fd, fname = tempfile.mkstemp(suffix="." + fmt)
+    os.close(fd)
+    try:
+        export.export(_profile_id(params), fname, fmt, query.get("from"), query.get("to"), query.get("day"))
+    except BaseException:
+        os.remove(fname)
+        raise
+    return FileResponse(fname, _CONTENT_TYPES[fmt])
+
+
+def all_totals(params, query, body):
+    totals = shards.totals(query.get("from"), query.get("to"))
+    keys = ("volume", "sets", "reps", "records")
+    return [{"id": pid, "name": name, **dict(zip(keys, totals.get(pid, (0, 0, 0, 0))))}
+            for pid, name in store.get_profiles()]
+
+
+# (method, path pattern, handler, runs on the writer)
+ROUTES = [
+    ("GET", r"/profiles", list_profiles, False),
+    ("POST", r"/profiles", create_profile, True),
+    ("GET", r"/profiles/(?P<profile>\d+)/workouts", list_workouts, False),
+    ("POST", r"/profiles/(?P<profile>\d+)/workouts", add_workout, True),
+    ("DELETE", r"/profiles/(?P<profile>\d+)/workouts", delete_workout, True),
+    ("GET", r"/profiles/(?P<profile>\d+)/records", list_records, False),
+    ("POST", r"/profiles/(?P<profile>\d+)/sessions", log_session, True),
+    ("GET", r"/profiles/(?P<profile>\d+)/summary", summary, False),
+    ("GET", r"/profiles/(?P<profile>\d+)/analytics", analytics_report, False),
+    ("GET", r"/profiles/(?P<profile>\d+)/export", export_file, False),
+    ("GET", r"/exercises", search_exercises, False),
+    ("GET", r"/totals", all_totals, False),
+]
+_ROUTES = [(method, re.compile(pattern + r"/?"), handler, writes) for method, pattern, handler, writes in ROUTES]
+
+
+def _route(method, path):
+    allowed = False
+    for route_method, pattern, handler, writes in _ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            if route_method == method:
+                return handler, match.groupdict(), writes
+            allowed = True
+    if allowed:
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+    raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+
+def _error_status(exc):
+    if isinstance(exc, HTTPError):
+        return exc.status
+    if isinstance(exc, (ValueError, KeyError, TypeError)):
+        return HTTPStatus.BAD_REQUEST
+    return HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+class Server:
+    def __init__(self, path=None, readers=READERS, max_write_batch=MAX_WRITE_BATCH):
+        self.path = path
+        self.readers = ThreadPoolExecutor(readers, thread_name_prefix="reader")
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="writer")
+        self.max_write_batch = max_write_batch
+        self.writes = None
+        self.server = None
+        self.writer_task = None
+        # Handler task -> its stream writer, for every open client connection
+        self.connections = {}
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.writes = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self._write_loop())
+        self.server = await asyncio.start_server(self._serve_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # Closing the transports ends each connection's read loop, so its handler returns normally
+        for writer in self.connections.values():
+            writer.close()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+        self.readers.shutdown()
+        self.writer.shutdown()
+
+    # Dispatch
+
+    async def call(self, method, target, body):
+        """Run one request and return (status, result)."""
+        url = urlsplit(target)
+        try:
+            if url.path.rstrip("/") == "/batch":
+                if method != "POST":
+                    raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on /batch")
+                return HTTPStatus.OK, await self._batch(body)
+            handler, params, writes = _route(method, url.path)
+            query = dict(parse_qsl(url.query))
+            if writes:
+                future = asyncio.get_running_loop().create_future()
+                await self.writes.put((handler, params, query, body, future))
+                result = await future
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self.readers, handler, params, query, body)
+            return HTTPStatus.OK, result
+        except Exception as e:
+            return _error_status(e), {"error": str(e)}
+
+    async def _batch(self, body):
+        if not isinstance(body, list):
+            raise ValueError("Expected a JSON list of requests")
+        # Sub-requests run concurrently; queued writes land in the same commit
+        results = await asyncio.gather(*(self.call(str(item.get("method", "GET")).upper(), item["path"],
+                                                   item.get("body")) for item in body))
+        out = []
+        for status, result in results:
+            if isinstance(result, FileResponse):
+                os.remove(result.fname)
+                status, result = HTTPStatus.BAD_REQUEST, {"error": "Exports can't be batched"}
+            out.append({"status": int(status), "body": result})
+        return out
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.writes.get()]
+            while len(batch) < self.max_write_batch and not self.writes.empty():
+                batch.append(self.writes.get_nowait())
+            outcomes = await loop.run_in_executor(self.writer, self._run_writes, batch)
+            for (*_, future), (ok, value) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _run_writes(self, batch):
+        # One commit for the whole batch; each request gets a savepoint it can be rolled back to alone
+        outcomes = []
+        try:
+            # Archives can't be attached once the transaction is open, and deletes reach into them.
+            # Writes for a sharded profile (see shards) commit in its shard, each on its own.
+            archive.attach(path=self.path)
+            with db.transaction(self.path, tables=()) as c:
+                for handler, params, query, body, _ in batch:
+                    c.execute("SAVEPOINT request")
+                    try:
+                        outcomes.append((True, handler(params, query, body)))
+                    except Exception as e:
+                        c.execute("ROLLBACK TO request")
+                        outcomes.append((False, e))
+                    c.execute("RELEASE request")
+        except Exception as e:
+            return [(False, e)] * len(batch)
+        return outcomes
+
+    # HTTP
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as e:
+                    await _write_json(writer, e.status, {"error": str(e)}, False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, raw, keep_alive = request
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    status, result = HTTPStatus.BAD_REQUEST, {"error": "Body is not valid JSON"}
+                else:
+                    status, result = await self.call(method, target, body)
+                if isinstance(result, FileResponse):
+                    await _write_file(writer, result, keep_alive)
+                else:
+                    await _write_json(writer, status, result, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            del self.connections[task]
+            writer.close()
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+    raw = await reader.readexactly(length) if length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method.upper(), target, headers, raw, keep_alive
+
+
+def _head(status, content_type, length, keep_alive):
+    status = HTTPStatus(status)
+    return (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {length}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1")
+
+
+async def _write_json(writer, status, result, keep_alive):
+    payload = json.dumps(result, separators=(",", ":")).encode()
+    writer.write(_head(status, "application/json", len(payload), keep_alive) + payload)
+    await writer.drain()
+
+
+async def _write_file(writer, response, keep_alive):
+    try:
+        with open(response.fname, "rb") as f:
+            writer.write(_head(HTTPStatus.OK, response.content_type, os.fstat(f.fileno()).st_size, keep_alive))
+            while True:
+                chunk = f.read(FILE_CHUNK)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+    finally:
+        os.remove(response.fname)
+
+
+def serve(host="127.0.0.1", port=8765, readers=READERS):
+    """Run the server until interrupted."""
+    async def run():
+        server = Server(readers=readers)
+        address = await server.start(host, port)
+        print(f"Serving {db.DATABASE} on http://{address[0]}:{address[1]}", file=sys.stderr)
+        try:
+            await server.server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
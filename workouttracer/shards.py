@@ -0,0 +1,304 @@
+"""Per-profile shard databases, so one athlete's imports, exports and logging never wait on another's.
+
+In a sharded database the main file keeps the profiles table as a directory: `profiles.shard` names
+the SQLite file, next to main, holding that profile's workouts, records, rollups and archives, e.g.
+workouts.shards/profile-3.db. A shard is a complete database of its own, with the profile's row
+under the same id and a copy of the exercise catalog taken when it was created. store, columns,
+export and the app reach a profile's data through database(), so the rest of the code doesn't
+know where it lives, and a write to one shard locks only that file.
+
+split() moves profiles out of main into shards and marks the database sharded, so profiles created
+after it get a shard too; merge() brings them back. Both are maintenance steps, for when the app
+and server are stopped. totals() summarises every athlete with one query per database, in parallel.
+
+Record ids stay the same through split and merge: each shard takes its new ids from a block that
+main's sequence skips (ID_BLOCK). merge() also adds what the shard logged to main's change log. Sync
+works on single databases, so merge the shards back before syncing; the next sync sends everything
+that changed while they were apart.
+"""
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from . import archive, catalog, db, querycache, snapshot
+
+# Threads running one query per database in each(); each keeps its own connections (see db)
+WORKERS = min(8, os.cpu_count() or 1)
+
+WORKOUT_FIELDS = "id, profile_id, day_type, sets, exercise_id"
+ROLLUP_FIELDS = "profile_id, day_type, period, period_start, volume, sets, reps, entries"
+# Rows per executemany() when split() copies a profile into its shard
+COPY_BATCH = 5000
+# Record ids set aside in main for each new shard
+ID_BLOCK = 1 << 32
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def sharded(path=None):
+    """Whether profiles created in this database get a shard of their own."""
+    return bool(querycache.query("SELECT 1 FROM settings WHERE key = 'sharded' AND value = '1'", path=path))
+
+
+def _directory(path):
+    return os.path.dirname(os.path.abspath(path or db.DATABASE))
+
+
+def shard_file(profile_id, path=None):
+    """File name of a profile's shard, relative to the main database's directory."""
+    root, ext = os.path.splitext(os.path.basename(path or db.DATABASE))
+    return os.path.join(f"{root}.shards", f"profile-{int(profile_id)}{ext or '.db'}")
+
+
+def database(profile_id, path=None):
+    """The database holding a profile's workouts and records: its shard, or else `path` itself."""
+    rows = querycache.query("SELECT shard FROM profiles WHERE id = ?", (int(profile_id),), path)
+    if not rows or rows[0][0] is None:
+        return path
+    return os.path.join(_directory(path), rows[0][0])
+
+
+def databases(profile_ids=None, path=None):
+    """{database: [profile ids]} for these profiles (default: every one), main (`path`) first."""
+    groups = {path: []}
+    for pid, shard in querycache.query("SELECT id, shard FROM profiles ORDER BY shard IS NOT NULL, id", path=path):
+        if profile_ids is None or pid in profile_ids:
+            groups.setdefault(path if shard is None else os.path.join(_directory(path), shard), []).append(pid)
+    return {target: ids for target, ids in groups.items() if ids}
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(WORKERS, thread_name_prefix="shards")
+        return _pool
+
+
+def each(fn, profile_ids=None, path=None):
+    """[fn(database, profile ids)] for every database holding some of these profiles, run in parallel."""
+    groups = databases(profile_ids, path)
+    if len(groups) <= 1:
+        return [fn(target, ids) for target, ids in groups.items()]
+    # The caller's progress handler (e.g. a job's cancellation check) goes along to the pool threads
+    handler = db.progress_handler()
+
+    def call(target, ids):
+        with db.progress(*handler):
+            return fn(target, ids)
+    return list(_executor().map(call, groups.keys(), groups.values()))
+
+
+def totals(start=None, end=None, path=None):
+    """{profile id: (volume, sets, reps, records)} of every profile over the days in [start, end]
+    (YYYY-MM-DD, inclusive; None = unbounded), from the daily rollups of each database in parallel.
+    """
+    def query(target, ids):
+        rows = db.query(f"""
+            SELECT profile_id, SUM(volume), SUM(sets), SUM(reps), SUM(entries) FROM volume_rollups
+            WHERE period = 'day' AND profile_id IN ({",".join("?" * len(ids))})
+              AND period_start >= COALESCE(?, '') AND period_start <= COALESCE(?, '9999')
+            GROUP BY profile_id""", ids + [start, end], target)
+        return {pid: tuple(values) for pid, *values in rows}
+
+    out = {}
+    for part in each(query, path=path):
+        out.update(part)
+    return out
+
+
+@contextmanager
+def _untracked(c):
+    # Moving a profile between databases isn't a change to sync, nor new volume for the rollups: the
+    # change-log and rollup triggers are dropped for the move and recreated in the same transaction
+    saved = c.execute("SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger' "
+                      "AND tbl_name IN ('profiles', 'workouts', 'records') "
+                      "AND name != 'trg_record_sets_delete'").fetchall()
+    for name, _ in saved:
+        c.execute(f"DROP TRIGGER main.{name}")
+    yield
+    for _, sql in saved:
+        c.execute(sql)
+
+
+def _remove(target):
+    # A shard and everything next to it that belongs to it
+    db.close(target)
+    for fname in (target, target + "-wal", target + "-shm", target + "-journal"):
+        try:
+            os.remove(fname)
+        except OSError:
+            pass
+    shutil.rmtree(snapshot.directory(target), ignore_errors=True)
+
+
+def _copy(c, t, select, insert, params=()):
+    # Rows of a query on main's connection into the shard, a batch at a time
+    cur = c.execute(select, params)
+    while True:
+        rows = cur.fetchmany(COPY_BATCH)
+        if not rows:
+            break
+        t.executemany(insert, rows)
+
+
+def _reserve(path):
+    # The first id of a block of ID_BLOCK record ids for a new shard; main's sequence skips past it
+    with db.transaction(path, ()) as c:
+        base = c.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'records'").fetchone()[0]
+        c.execute("DELETE FROM sqlite_sequence WHERE name = 'records'")
+        c.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('records', ?)", (base + ID_BLOCK,))
+    return base + 1
+
+
+def _copy_out(profile_id, name, target, first_id, path):
+    # Into the new shard, in one transaction: main's catalog (under the same ids, so workouts keep
+    # theirs), the profile, its workouts and rollups, and its records from main and every archive.
+    # The rows are read on main's own connection, which may be inside a transaction of the caller's.
+    # Records logged in the shard get ids from `first_id` on.
+    c = db.get_connection(path)
+    fields = archive.FIELDS.split(", ")
+    mine = f"(SELECT id FROM workouts WHERE profile_id = {int(profile_id)})"
+    with db.transaction(target) as t, _untracked(t):
+        t.execute("DELETE FROM exercise_aliases")
+        t.execute("DELETE FROM exercises")
+        _copy(c, t, "SELECT id, name, muscles FROM exercises",
+              "INSERT INTO exercises (id, name, muscles) VALUES (?,?,?)")
+        _copy(c, t, "SELECT alias, exercise_id FROM exercise_aliases",
+              "INSERT INTO exercise_aliases (alias, exercise_id) VALUES (?,?)")
+        t.execute("INSERT INTO profiles (id, name) VALUES (?, ?)", (profile_id, name))
+        _copy(c, t, f"SELECT {WORKOUT_FIELDS} FROM workouts WHERE profile_id = ?",
+              f"INSERT INTO workouts ({WORKOUT_FIELDS}) VALUES (?,?,?,?,?)", (profile_id,))
+        _copy(c, t, f"SELECT {ROLLUP_FIELDS} FROM volume_rollups WHERE profile_id = ?",
+              f"INSERT INTO volume_rollups ({ROLLUP_FIELDS}) VALUES (?,?,?,?,?,?,?,?)", (profile_id,))
+        for schema in ["main"] + archive.attach(path=path):
+            _copy(c, t, f"SELECT {archive.FIELDS} FROM {schema}.records WHERE workout_id IN {mine}",
+                  f"INSERT INTO records ({archive.FIELDS}) VALUES ({','.join('?' * len(fields))})")
+            _copy(c, t, f"SELECT {archive.SET_FIELDS} FROM {schema}.record_sets WHERE record_id IN "
+                        f"(SELECT id FROM {schema}.records WHERE workout_id IN {mine})",
+                  f"INSERT INTO record_sets ({archive.SET_FIELDS}) VALUES (?,?,?,?,?,?,?)")
+        t.execute("DELETE FROM sqlite_sequence WHERE name = 'records'")
+        t.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('records', ?)", (first_id - 1,))
+
+
+def _forget(profile_id, file, path):
+    # Main's copy of the profile's data, archived records included, and the pointer to its shard
+    archive.attach(path=path)
+    with db.transaction(path) as c, _untracked(c):
+        ids = [wid for (wid,) in c.execute("SELECT id FROM workouts WHERE profile_id = ?", (profile_id,))]
+        if ids:
+            archive.forget_workouts(c, ids)
+        c.execute("DELETE FROM records WHERE workout_id IN (SELECT id FROM workouts WHERE profile_id = ?)",
+                  (profile_id,))
+        c.execute("DELETE FROM volume_rollups WHERE profile_id = ?", (profile_id,))
+        c.execute("DELETE FROM workouts WHERE profile_id = ?", (profile_id,))
+        c.execute("UPDATE profiles SET shard = ? WHERE id = ?", (file, profile_id))
+        c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('sharded', '1')")
+
+
+def split(profile_ids=None, path=None):
+    """Move these profiles (default: every one still in main) into shards of their own, and mark the
+    database sharded so profiles created from now on get one. Returns {profile id: shard file}.
+    """
+    # Imported here, as both import modules that route through this one
+    from . import columns, schema
+
+    moved = {}
+    for pid, name in db.query("SELECT id, name FROM profiles WHERE shard IS NULL ORDER BY id", path=path):
+        if profile_ids is not None and pid not in profile_ids:
+            continue
+        file = shard_file(pid, path)
+        target = os.path.join(_directory(path), file)
+        # Nothing points at a file there yet; it is what an interrupted split left behind
+        _remove(target)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            schema.init_db(target)
+            _copy_out(pid, name, target, _reserve(path), path)
+        except BaseException:
+            _remove(target)
+            raise
+        _forget(pid, file, path)
+        snapshot.remove(pid, path)
+        columns.invalidate(pid)
+        moved[pid] = file
+    if profile_ids is None and not moved:
+        db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('sharded', '1')", path=path)
+    # Archives that only held the moved profiles' records are empty now
+    archive.drop_empty(path)
+    return moved
+
+
+def _copy_in(c, profile_id):
+    # From the shard attached as `src`, on main's connection and transaction. Records keep their ids,
+    # which come from the shard's block. Workout and session ids go above main's, which may have handed
+    # out the shard's own since the split; neither is part of what sync matches rows on. The exercises
+    # are matched to main's catalog by name.
+    offsets = {
+        "workouts": c.execute("SELECT COALESCE(MAX(id), 0) FROM workouts").fetchone()[0],
+        "sessions": max(c.execute("SELECT COALESCE(MAX(session_id), 0) FROM records").fetchone()[0],
+                        archive.last_session(c)),
+    }
+    c.execute("CREATE TEMP TABLE exercise_map (shard_id INTEGER PRIMARY KEY, id INTEGER)")
+    for eid, name, muscles in c.execute("SELECT id, name, muscles FROM src.exercises "
+                                        "WHERE id IN (SELECT exercise_id FROM src.workouts)").fetchall():
+        aliases = [a for (a,) in c.execute("SELECT alias FROM src.exercise_aliases WHERE exercise_id = ?", (eid,))]
+        c.execute("INSERT INTO temp.exercise_map VALUES (?, ?)",
+                  (eid, catalog.add(c, name, aliases, (muscles or "").split(","))))
+    c.execute(f"INSERT INTO workouts ({WORKOUT_FIELDS}) "
+              f"SELECT w.id + :workouts, w.profile_id, w.day_type, w.sets, m.id FROM src.workouts w "
+              f"LEFT JOIN temp.exercise_map m ON m.shard_id = w.exercise_id WHERE w.profile_id = :profile",
+              {**offsets, "profile": profile_id})
+    c.execute("DROP TABLE temp.exercise_map")
+    shifted = {"workout_id": "workout_id + :workouts", "session_id": "session_id + :sessions"}
+    fields = [shifted.get(name, name) for name in archive.FIELDS.split(", ")]
+    moved = c.execute(f"INSERT INTO records ({archive.FIELDS}) SELECT {', '.join(fields)} FROM src.records",
+                      offsets).rowcount
+    c.execute(f"INSERT INTO record_sets ({archive.SET_FIELDS}) SELECT {archive.SET_FIELDS} FROM src.record_sets")
+    c.execute(f"INSERT OR REPLACE INTO volume_rollups ({ROLLUP_FIELDS}) SELECT {ROLLUP_FIELDS} "
+              f"FROM src.volume_rollups WHERE profile_id = ?", (profile_id,))
+    # Changes made in the shard become main's, for its peers to pick up at the next sync. Neither copy
+    # was logged, so this is just what changed while the profile was in the shard.
+    c.execute("INSERT INTO changelog (tbl, key, op, at, source) "
+              "SELECT tbl, key, op, at, source FROM src.changelog ORDER BY seq")
+    c.execute("UPDATE profiles SET shard = NULL WHERE id = ?", (profile_id,))
+    return moved
+
+
+def merge(profile_ids=None, path=None):
+    """Move these profiles (default: every sharded one) back into main and delete their shards. Once
+    none is left, profiles are created in main again. Returns {profile id: records moved}.
+    """
+    from . import columns
+
+    moved = {}
+    for pid, file in db.query("SELECT id, shard FROM profiles WHERE shard IS NOT NULL ORDER BY id", path=path):
+        if profile_ids is not None and pid not in profile_ids:
+            continue
+        target = os.path.join(_directory(path), file)
+        # One attachment for the whole shard: its archived records go back into it first
+        archive.restore_all(target)
+        db.close(target)
+        archive.detach(path)
+        c = db.get_connection(path)
+        c.execute("ATTACH DATABASE ? AS src", (target,))
+        try:
+            with db.transaction(path) as c, _untracked(c):
+                moved[pid] = _copy_in(c, pid)
+        finally:
+            c.execute("DETACH DATABASE src")
+        _remove(target)
+        snapshot.remove(pid, path)
+        columns.invalidate(pid)
+    # Main's own archives may have been emptied by an earlier split
+    archive.drop_empty(path)
+    if db.query_one("SELECT 1 FROM profiles WHERE shard IS NOT NULL", path=path) is None:
+        db.execute("DELETE FROM settings WHERE key = 'sharded'", path=path)
+        try:
+            os.rmdir(os.path.dirname(os.path.join(_directory(path), shard_file(0, path))))
+        except OSError:
+            pass
+    return moved
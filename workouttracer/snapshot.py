@@ -0,0 +1,170 @@
+"""Arrow snapshots of each profile's set columns, for fast cold loads and for tools outside the app.
+
+save() writes a profile's columns (see columns) to Arrow IPC files in a directory next to the
+database, e.g. workouts.snapshots/profile-3-000001.arrow. Later saves append the sets of newer
+records as further pieces, and write a new base once the snapshot is stale or has MAX_PIECES
+pieces. load() memory-maps the pieces, so a cold read takes the columns from the page cache instead
+of the sets query; with a single piece the arrays are views of the mapping, not copies.
+
+A snapshot is stale once the change log (see sync) shows a record it holds updated or any record
+or workout deleted, or once a record of the profile newer than it has been archived. Records added
+since it was written are not in it; columns reads those from SQLite. The files are plain Arrow,
+so pyarrow, pandas, polars or DuckDB can read them without opening the live database.
+"""
+import glob
+import os
+
+from . import archive, db
+
+ENABLED = os.environ.get("WORKOUTTRACER_SNAPSHOTS", "") not in ("", "0")
+# A base and the deltas after it; the next save() past this writes a new base
+MAX_PIECES = 8
+# Stored in each piece; bumped when the columns change
+FORMAT = "1"
+
+# Any change after the snapshot that appending newer records can't express. `+tbl` keeps the planner
+# on the seq range rather than the key index, which would visit every change to the table.
+_STALE = """
+    SELECT 1 FROM changelog l
+    WHERE seq > :seq AND +tbl IN ('workouts', 'records') AND (
+        op = 'D'
+        OR (tbl = 'records' AND json_extract(key, '$[0]') IS NULL AND json_extract(key, '$[1]') <= :last)
+        OR (tbl = 'records' AND json_extract(key, '$[0]') IS NOT NULL AND EXISTS (
+            SELECT 1 FROM records r WHERE r.origin = json_extract(l.key, '$[0]')
+            AND r.origin_id = json_extract(l.key, '$[1]') AND r.id <= :last)))
+    LIMIT 1
+"""
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def _arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+    except ImportError:
+        raise RuntimeError("Snapshots need the pyarrow package.") from None
+    return pa, ipc
+
+
+def directory(path=None):
+    root, _ = os.path.splitext(os.path.abspath(path or db.DATABASE))
+    return root + ".snapshots"
+
+
+def _pieces(profile_id, path):
+    # Piece numbers are zero-padded, so name order is write order
+    return sorted(glob.glob(os.path.join(directory(path), f"profile-{int(profile_id)}-*.arrow")))
+
+
+def remove(profile_id, path=None):
+    """Delete the profile's snapshot, e.g. once its records have moved to another database."""
+    for piece in _pieces(profile_id, path):
+        try:
+            os.remove(piece)
+        except OSError:
+            pass
+
+
+def cursor(path=None):
+    """The latest change number; pass it to save() when taken before the columns were read."""
+    return db.query_one("SELECT COALESCE(MAX(seq), 0) FROM changelog", path=path)[0]
+
+
+def _usable(profile_id, meta, path):
+    # `meta` is the newest piece's metadata
+    if meta is None or meta.get(b"format") != FORMAT.encode():
+        return False
+    seq, last = int(meta[b"seq"]), int(meta[b"last_record"])
+    if db.query_one(_STALE, {"seq": seq, "last": last}, path) is not None:
+        return False
+    # Records of this profile added after the snapshot and archived since would be missed by both
+    c = db.get_connection(path)
+    return not any(c.execute(f"SELECT 1 FROM {schema}.records r JOIN workouts w ON w.id = r.workout_id "
+                             f"WHERE r.id > ? AND w.profile_id = ? LIMIT 1", (last, profile_id)).fetchone()
+                   for schema in archive.attach(path=path))
+
+
+def _current(pieces, ipc, pa):
+    # The newest base and the deltas after it, as (metadata of the newest, [readers])
+    if not pieces:
+        return None, []
+    readers = [ipc.open_file(pa.memory_map(pieces[-1]))]
+    meta = readers[0].schema.metadata or {}
+    base = os.path.join(os.path.dirname(pieces[-1]), meta.get(b"base", b"").decode())
+    if base not in pieces:
+        return None, []
+    readers[:0] = [ipc.open_file(pa.memory_map(f)) for f in pieces[pieces.index(base):-1]]
+    return meta, readers
+
+
+def load(profile_id, path=None):
+    """({name: array}, last record id) from the profile's snapshot, or None if there is no usable one
+    (missing, stale, replaced while being read, or pyarrow isn't installed).
+    """
+    import numpy as np
+
+    try:
+        pa, ipc = _arrow()
+    except RuntimeError:
+        return None
+    try:
+        meta, readers = _current(_pieces(profile_id, path), ipc, pa)
+        if not _usable(profile_id, meta, path):
+            return None
+        tables = [reader.read_all() for reader in readers]
+    except (OSError, pa.ArrowInvalid):
+        # A save() replaced the pieces while they were being listed; SQLite it is this time
+        return None
+    columns = {}
+    for name in tables[0].column_names:
+        chunks = [chunk.to_numpy() for table in tables for chunk in table.column(name).chunks]
+        if not chunks:
+            columns[name] = tables[0].column(name).to_numpy()
+        else:
+            columns[name] = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+    return columns, int(meta[b"last_record"])
+
+
+def _write(fname, columns, meta, pa, ipc):
+    table = pa.table({name: pa.array(column) for name, column in columns.items()},
+                     metadata={k: str(v) for k, v in meta.items()})
+    tmp = fname + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, fname)
+
+
+def save(profile_id, columns, seq, path=None):
+    """Bring the profile's snapshot up to date with `columns`, all of its sets as read after change
+    `seq` (see cursor()). Writes a delta with the sets of records newer than the snapshot, or a new
+    base. Returns the number of sets written.
+    """
+    pa, ipc = _arrow()
+    os.makedirs(directory(path), exist_ok=True)
+    pieces = _pieces(profile_id, path)
+    meta, readers = _current(pieces, ipc, pa)
+    number = int(pieces[-1].rsplit("-", 1)[1].split(".")[0]) + 1 if pieces else 1
+    fname = os.path.join(directory(path), f"profile-{int(profile_id)}-{number:06d}.arrow")
+    ids = columns["record_id"]
+    last = int(ids.max()) if len(ids) else 0
+    if _usable(profile_id, meta, path) and len(readers) < MAX_PIECES:
+        new = ids > int(meta[b"last_record"])
+        if not new.any():
+            return 0
+        columns = {name: column[new] for name, column in columns.items()}
+        base = meta[b"base"].decode()
+    else:
+        base = os.path.basename(fname)
+    del readers
+    _write(fname, columns, {"format": FORMAT, "seq": seq, "last_record": last, "base": base}, pa, ipc)
+    if base == os.path.basename(fname):
+        for old in pieces:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # still mapped elsewhere (Windows); the next new base removes it
+    return len(columns["record_id"])
@@ -0,0 +1,353 @@
+import calendar
+import csv
+import json
+import os
+import sqlite3
+from contextlib import ExitStack
+from datetime import datetime
+
+from . import archive, catalog, db, querycache, shards
+
+# How dates are written in exports and accepted in imports; records.date itself is epoch seconds
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Column order of the Track Progress grid and of session rows passed to save_session()
+SESSION_COLUMNS = ("exercise", "sets", "reps", "weight", "rest", "rpe", "heart_rate")
+_CONVERTERS = {
+    "sets": int,
+    "reps": int,
+    "weight": float,
+    "rest": int,
+    "rpe": int,
+    "heart_rate": int,
+}
+_LABELS = {
+    "sets": "Sets",
+    "reps": "Reps",
+    "weight": "Weight(kg)",
+    "rest": "Rest(sec)",
+    "rpe": "RPE",
+    "heart_rate": "Heart Rate",
+}
+
+INSERT_RECORD = ("INSERT INTO records (workout_id, date, reps, weight, rest, rpe, heart_rate, volume, set_count, "
+                 "total_reps, session_id) VALUES (?,?,?,?,?,?,?,?,?,?,?)")
+INSERT_SET = ("INSERT INTO record_sets (record_id, set_no, reps, weight, rpe, heart_rate, volume) "
+              "VALUES (?,?,?,?,?,?,?)")
+
+# Records after `?` that have no set rows yet, expanded into `set_count` identical sets
+_EXPAND_SETS = '''
+    WITH RECURSIVE n(k) AS (
+        SELECT 1 UNION ALL SELECT k + 1 FROM n WHERE k < (SELECT MAX(set_count) FROM records WHERE id > :after)
+    )
+    INSERT INTO record_sets (record_id, set_no, reps, weight, rpe, heart_rate, volume)
+    SELECT r.id, n.k, r.reps, r.weight, r.rpe, r.heart_rate, r.reps * r.weight
+    FROM records r JOIN n ON n.k <= r.set_count
+    WHERE r.id > :after
+'''
+
+IMPORT_BATCH_SIZE = 10000
+
+
+def get_profiles():
+    """[(id, name)] of every profile, in creation order."""
+    return querycache.query("SELECT id, name FROM profiles ORDER BY id")
+
+
+def create_profile(name):
+    try:
+        db.execute("INSERT INTO profiles (name) VALUES (?)", (name,))
+    except sqlite3.IntegrityError:
+        return
+    if shards.sharded():
+        shards.split([find_profile(name)])
+
+
+def find_profile(name):
+    return next((pid for pid, pname in get_profiles() if pname == name), None)
+
+
+# A profile's workouts with their exercise names, in the order they were added
+WORKOUTS_QUERY = """
+    SELECT w.id, w.day_type, e.name, w.sets FROM workouts w LEFT JOIN exercises e ON e.id = w.exercise_id
+    WHERE w.profile_id = ? ORDER BY w.id
+"""
+
+
+def list_workouts(profile_id):
+    """[(workout_id, day_type, exercise, sets)] of WORKOUTS_QUERY for one profile."""
+    return querycache.query(WORKOUTS_QUERY, (int(profile_id),), shards.database(profile_id))
+
+
+def day_types(profile_id):
+    """[(day_type,)] the profile has workouts for."""
+    return querycache.query("SELECT DISTINCT day_type FROM workouts WHERE profile_id = ?", (int(profile_id),),
+                            shards.database(profile_id))
+
+
+def day_exercises(profile_id, day_type):
+    """[(exercise, sets)] planned for one of the profile's days, in the order they were added."""
+    return querycache.query("SELECT e.name, w.sets FROM workouts w JOIN exercises e ON e.id = w.exercise_id "
+                            "WHERE w.profile_id = ? AND w.day_type = ? ORDER BY w.id",
+                            (int(profile_id), day_type), shards.database(profile_id))
+
+
+def workout_map(profile_id, day_type):
+    """{exercise_id: (workout_id, sets)} for one profile's day."""
+    rows = querycache.query("SELECT exercise_id, id, sets FROM workouts WHERE profile_id = ? AND day_type = ?",
+                            (int(profile_id), day_type), shards.database(profile_id))
+    return {exercise_id: (wid, sets) for exercise_id, wid, sets in rows}
+
+
+def ensure_workout(c, profile_id, day_type, exercise, sets):
+    """Id of the profile's workout for `exercise` (a catalog name or alias) on `day_type`, created with
+    `sets` if the day doesn't have it yet. Runs on the caller's connection.
+    """
+    exercise_id = None if exercise is None else catalog.intern(c, exercise)
+    row = c.execute("SELECT id FROM workouts WHERE profile_id = ? AND day_type IS ? AND exercise_id IS ?",
+                    (profile_id, day_type, exercise_id)).fetchone()
+    if row is not None:
+        return row[0]
+    return c.execute("INSERT INTO workouts (profile_id, day_type, exercise_id, sets) VALUES (?,?,?,?)",
+                     (profile_id, day_type, exercise_id, sets)).lastrowid
+
+
+def add_workout(profile_id, day_type, exercise, sets):
+    """Add an exercise to a profile's day; if the day already has it, update its sets instead."""
+    with db.transaction(shards.database(profile_id), ("exercises", "workouts")) as c:
+        wid = ensure_workout(c, profile_id, day_type, exercise, sets)
+        c.execute("UPDATE workouts SET sets = ? WHERE id = ? AND sets IS NOT ?", (sets, wid, sets))
+    return wid
+
+
+def delete_workout(profile_id, day_type, exercise):
+    path = shards.database(profile_id)
+    row = db.query_one("SELECT id FROM workouts WHERE profile_id = ? AND day_type = ? AND exercise_id = ?",
+                       (profile_id, day_type, catalog.lookup(db.get_connection(path), exercise)), path)
+    if row is not None:
+        delete_workout_id(profile_id, row[0])
+
+
+def delete_workout_id(profile_id, workout_id):
+    from . import columns
+
+    # The workout's archived records go with it; archives are attached before the transaction starts
+    path = shards.database(profile_id)
+    archive.attach(path=path)
+    with db.transaction(path, ("workouts", "volume_rollups", "archives")) as c:
+        if c.execute("SELECT 1 FROM workouts WHERE id = ? AND profile_id = ?", (workout_id, profile_id)).fetchone():
+            archive.forget_workouts(c, [workout_id])
+            c.execute("DELETE FROM workouts WHERE id = ?", (workout_id,))
+    columns.invalidate(profile_id)
+
+
+def validate_session(rows):
+    """Convert raw session rows (cell text or numbers) to typed tuples.
+
+    Every cell is checked before anything is returned; a ValueError lists all the bad cells at once.
+    """
+    errors = []
+    parsed = []
+    for i, row in enumerate(rows, 1):
+        values = dict(zip(SESSION_COLUMNS, row))
+        exercise = str(values.get("exercise") or "").strip()
+        if not exercise:
+            errors.append(f"Row {i}: exercise is missing")
+        out = [exercise]
+        for name in SESSION_COLUMNS[1:]:
+            raw = values.get(name)
+            text = "" if raw is None else str(raw).strip()
+            try:
+                value = _CONVERTERS[name](text)
+            except ValueError:
+                errors.append(f"Row {i}, {_LABELS[name]}: '{text}' is not a valid number")
+                continue
+            if value < 0:
+                errors.append(f"Row {i}, {_LABELS[name]}: must not be negative")
+            elif name == "sets" and value < 1:
+                errors.append(f"Row {i}, {_LABELS[name]}: must be at least 1")
+            out.append(value)
+        parsed.append(tuple(out))
+    if errors:
+        raise ValueError("\n".join(errors))
+    return parsed
+
+
+def save_session(profile_id, day_type, rows, date=None):
+    """Validate and write one logged session in a single transaction. Returns the number of records.
+
+    Each row is `sets` identical sets of an exercise. Rows for the same exercise are its consecutive
+    sets and become one record, which holds the set totals and the top set's reps and weight.
+    """
+    parsed = validate_session(rows)
+    path = shards.database(profile_id)
+    workouts = workout_map(profile_id, day_type)
+    # Names go through the catalog, so any capitalisation of an exercise or of one of its aliases matches
+    conn = db.get_connection(path)
+    exercise_ids = {name: catalog.lookup(conn, name) for name in {row[0] for row in parsed}}
+    missing = sorted(name for name, exercise_id in exercise_ids.items() if exercise_id not in workouts)
+    if missing:
+        raise ValueError(f"Unknown exercise(s) for '{day_type}': {', '.join(missing)}")
+
+    # Keyed by workout, so a name and its alias count as the same exercise
+    by_workout = {}
+    for exercise, sets, reps, weight, rest, rpe, hr in parsed:
+        by_workout.setdefault(workouts[exercise_ids[exercise]][0], []).extend([(reps, weight, rest, rpe, hr)] * sets)
+
+    if not by_workout:
+        return 0
+    when = timestamp(date or datetime.now())
+    with db.transaction(path, ("records", "record_sets")) as c:
+        session = logged_session(c, next(iter(by_workout)), when) or new_session(c)
+        for workout_id, performed in by_workout.items():
+            reps, weight, rest, rpe, hr = zip(*performed) if performed else ((),) * 5
+            # The top set is the heaviest, then the one with the most reps
+            top_weight, top_reps = max(zip(weight, reps), default=(0.0, 0))
+            record_id = c.execute(INSERT_RECORD, (
+                workout_id, when, top_reps, top_weight, max(rest, default=0),
+                max(rpe, default=0), max(hr, default=0), sum(r * w for r, w in zip(reps, weight)),
+                len(performed), sum(reps), session)).lastrowid
+            c.executemany(INSERT_SET, [(record_id, n, r, w, e, h, r * w)
+                                       for n, (r, w, _, e, h) in enumerate(performed, 1)])
+    return len(by_workout)
+
+
+def expand_sets(c, after_id=0):
+    """Give every record with id > after_id `set_count` identical rows in record_sets.
+
+    For data logged one row per exercise (imports, pre-v4 history). Runs on the caller's connection.
+    """
+    c.execute(_EXPAND_SETS, {"after": after_id})
+
+
+def timestamp(dt):
+    """records.date for a naive datetime: its wall-clock time as seconds since 1970-01-01."""
+    return calendar.timegm(dt.timetuple())
+
+
+def logged_session(c, workout_id, date):
+    """session_id of the records logged at exactly `date` for the profile of `workout_id`, or None."""
+    row = c.execute('''SELECT r.session_id FROM records r JOIN workouts w ON w.id = r.workout_id
+                       WHERE r.date = ? AND w.profile_id = (SELECT profile_id FROM workouts WHERE id = ?)
+                       LIMIT 1''', (date, workout_id)).fetchone()
+    return None if row is None else row[0]
+
+
+def new_session(c):
+    # Above every archived session too, so a new one never joins an old session's records
+    latest = c.execute("SELECT COALESCE(MAX(session_id), 0) FROM records").fetchone()[0]
+    return max(latest, archive.last_session(c)) + 1
+
+
+def _normalize_date(value):
+    return timestamp(datetime.fromisoformat(str(value).strip()))
+
+
+def _iter_log_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if ext == ".csv":
+            yield from csv.DictReader(f)
+        elif ext in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif ext == ".json":
+            yield from json.load(f)
+        else:
+            raise ValueError(f"Unsupported log format: {path}")
+
+
+class _Loader:
+    """Import state for one database: its transaction's connection, the workouts and sessions seen so
+    far, and the batch of records waiting to be inserted.
+    """
+
+    def __init__(self, c):
+        self.c = c
+        self.last_id = c.execute("SELECT COALESCE(MAX(id), 0) FROM records").fetchone()[0]
+        self.next_session = new_session(c)
+        # Only these profiles can have a session logged at a given time already
+        self.logged = {pid for (pid,) in c.execute("SELECT id FROM profiles p WHERE EXISTS (SELECT 1 FROM workouts w "
+                                                   "JOIN records r ON r.workout_id = w.id WHERE w.profile_id = p.id)")}
+        # Keyed by the names as written in the log; aliases resolve through the catalog on first use
+        self.workouts = {}
+        # (profile id, date) -> session_id; rows of one profile logged at the same time are one session
+        self.sessions = {}
+        self.batch = []
+        self.count = 0
+
+    def add(self, pid, row):
+        sets = int(row.get("sets") or 1)
+        key = (pid, row["day_type"], row["exercise"])
+        wid = self.workouts.get(key)
+        if wid is None:
+            wid = self.workouts[key] = ensure_workout(self.c, *key, sets)
+        reps = int(row["reps"])
+        weight = float(row["weight"])
+        volume = row.get("volume")
+        volume = float(volume) if volume not in (None, "") else sets * reps * weight
+        when = _normalize_date(row["date"])
+        session = self.sessions.get((pid, when))
+        if session is None:
+            session = logged_session(self.c, wid, when) if pid in self.logged else None
+            if session is None:
+                session, self.next_session = self.next_session, self.next_session + 1
+            self.sessions[pid, when] = session
+        self.batch.append((wid, when, reps, weight, int(row.get("rest") or 0), int(row.get("rpe") or 0),
+                           int(row.get("heart_rate") or 0), volume, sets, sets * reps, session))
+        if len(self.batch) >= IMPORT_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.c.executemany(INSERT_RECORD, self.batch)
+        self.count += len(self.batch)
+        self.batch.clear()
+
+    def finish(self):
+        self.flush()
+        expand_sets(self.c, self.last_id)
+        return self.count
+
+
+def import_records(path):
+    """Bulk-load a historical CSV/JSON log in one transaction. Returns the number of records.
+
+    Rows use the export column names (profile, day_type, exercise, sets, date, reps, weight, rest, rpe,
+    heart_rate, volume) and stand for `sets` identical sets. Unknown profiles and exercises are created on
+    the fly; volume is derived when absent.
+
+    In a sharded database (see shards) each profile's rows go to its shard, in one transaction per
+    shard. They all commit once the whole log has been read, but profiles it creates stay if it fails.
+    """
+    tables = ("profiles", "exercises", "workouts", "records", "record_sets")
+    profiles = {name: pid for pid, name in get_profiles()}
+    sharded = shards.sharded()
+    with ExitStack() as stack:
+        # database -> its _Loader, and profile id -> the _Loader of its database
+        loaders = {}
+        routes = {}
+
+        def loader(database):
+            key = database or db.DATABASE
+            if key not in loaders:
+                loaders[key] = _Loader(stack.enter_context(db.transaction(database, tables)))
+            return loaders[key]
+
+        main = None if sharded else loader(None)
+        for line, row in enumerate(_iter_log_rows(path), 1):
+            try:
+                name = row["profile"]
+                pid = profiles.get(name)
+                if pid is None and sharded:
+                    create_profile(name)
+                    pid = profiles[name] = find_profile(name)
+                elif pid is None:
+                    pid = profiles[name] = main.c.execute("INSERT INTO profiles (name) VALUES (?)", (name,)).lastrowid
+                target = routes.get(pid)
+                if target is None:
+                    target = routes[pid] = main or loader(shards.database(pid))
+                target.add(pid, row)
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path}, record {line}: {e}") from e
+        return sum(target.finish() for target in loaders.values())
@@ -0,0 +1,440 @@
+"""Incremental sync between workout databases through change-log delta bundles.
+
+Triggers append every insert, update and delete of profiles, workouts and records to `changelog`
+under a monotonic sequence number. A bundle holds the latest state of each row changed after a
+cursor (one of those sequence numbers), so syncing a session costs as much as the session.
+
+Rows are matched across databases by keys that don't depend on local ids: a profile by name, a
+workout by (profile, day type, exercise name), a record by the device that first wrote it and its id
+there. Each database has a random device id for this.
+
+Concurrent edits (both sides changed a row since the other last heard from them) are resolved
+last-writer-wins on change time, with device id as tie-break so both sides pick the same winner.
+Every such conflict is kept in `sync_conflicts` with both versions.
+"""
+import json
+import zlib
+
+from . import archive, catalog, db, store
+
+MAGIC = b"WTSYNC"
+# Bumped when bundle contents change; 2 has record dates as epoch seconds (schema v6)
+FORMAT = 2
+# Dependency order, which is also the order bundles apply in
+TABLES = ("profiles", "workouts", "records")
+CHUNK = 500
+
+_NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+_KEYS = {
+    "profiles": "json_array({r}.name)",
+    "workouts": "json_array((SELECT name FROM profiles WHERE id = {r}.profile_id), {r}.day_type, {exercise})",
+    # origin is NULL for records written on this device
+    "records": "json_array({r}.origin, COALESCE({r}.origin_id, {r}.id))",
+}
+
+# Key expressions for keys arriving in bundles, so they compare equal to the ones triggers wrote
+_KEY_SQL = {
+    "profiles": "SELECT json_array(?)",
+    "workouts": "SELECT json_array(?, ?, ?)",
+    "records": "SELECT json_array(?, ?)",
+}
+
+# A workout's exercise name: its own column before the v7 catalog, looked up by id from then on
+_EXERCISE = {
+    False: "{r}.exercise",
+    True: "(SELECT name FROM exercises WHERE id = {r}.exercise_id)",
+}
+
+
+def _key(table, row, catalogued=True):
+    return _KEYS[table].format(r=row, exercise=_EXERCISE[catalogued].format(r=row))
+
+
+_RECORD_FIELDS = "date, reps, weight, rest, rpe, heart_rate, volume, set_count, total_reps"
+
+
+def _log(table, row, op, catalogued):
+    return (f"INSERT INTO changelog (tbl, key, op, at) "
+            f"VALUES ('{table}', {_key(table, row, catalogued)}, '{op}', {_NOW_MS});")
+
+
+def _log_rekeyed(table, catalogued):
+    # An update that changes a row's key deletes the old key and writes the new one
+    old, new = _key(table, "OLD", catalogued), _key(table, "NEW", catalogued)
+    return (f"INSERT INTO changelog (tbl, key, op, at) SELECT '{table}', {old}, 'D', {_NOW_MS} "
+            f"WHERE {old} IS NOT {new};" + _log(table, "NEW", "U", catalogued))
+
+
+def triggers(catalogued=True):
+    """{name: (event, body)} of the change-log triggers; `catalogued` is False before schema v7."""
+    return {
+        "trg_changelog_profiles_insert": ("AFTER INSERT ON profiles", _log("profiles", "NEW", "U", catalogued)),
+        "trg_changelog_profiles_update": ("AFTER UPDATE OF name ON profiles", _log_rekeyed("profiles", catalogued)),
+        "trg_changelog_profiles_delete": ("AFTER DELETE ON profiles", _log("profiles", "OLD", "D", catalogued)),
+        "trg_changelog_workouts_insert": ("AFTER INSERT ON workouts", _log("workouts", "NEW", "U", catalogued)),
+        "trg_changelog_workouts_update": ("AFTER UPDATE ON workouts", _log_rekeyed("workouts", catalogued)),
+        "trg_changelog_workouts_delete": ("AFTER DELETE ON workouts", _log("workouts", "OLD", "D", catalogued)),
+        "trg_changelog_records_insert": ("AFTER INSERT ON records", _log("records", "NEW", "U", catalogued)),
+        "trg_changelog_records_update": ("AFTER UPDATE ON records", _log("records", "NEW", "U", catalogued)),
+        "trg_changelog_records_delete": ("AFTER DELETE ON records", _log("records", "OLD", "D", catalogued)),
+    }
+
+
+def create(c, catalogued=True):
+    """Tables and triggers for change tracking, with every existing row logged as a change."""
+    c.execute("ALTER TABLE records ADD COLUMN origin TEXT")
+    c.execute("ALTER TABLE records ADD COLUMN origin_id INTEGER")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_records_origin ON records(origin, origin_id) "
+              "WHERE origin IS NOT NULL")
+    c.execute('''CREATE TABLE IF NOT EXISTS changelog (
+                 seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                 tbl TEXT NOT NULL,
+                 key TEXT NOT NULL, -- JSON array, see _KEYS
+                 op TEXT NOT NULL, -- 'U' (row written) or 'D' (row deleted)
+                 at INTEGER NOT NULL, -- ms since 1970-01-01 UTC
+                 source TEXT -- device that made the change; NULL for this one
+                 )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_changelog_key ON changelog(tbl, key, seq)")
+    c.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("INSERT OR IGNORE INTO sync_state VALUES ('device', lower(hex(randomblob(8))))")
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_peers (
+                 device TEXT PRIMARY KEY,
+                 received INTEGER NOT NULL DEFAULT 0, -- their last change applied here
+                 acked INTEGER NOT NULL DEFAULT 0 -- our last change they have applied
+                 )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS sync_conflicts (
+                 id INTEGER PRIMARY KEY,
+                 tbl TEXT NOT NULL,
+                 key TEXT NOT NULL,
+                 device TEXT NOT NULL, -- the peer whose bundle conflicted
+                 winner TEXT NOT NULL, -- 'local' or 'remote'
+                 local TEXT, -- both versions as JSON (op, at, data)
+                 remote TEXT,
+                 at INTEGER NOT NULL
+                 )''')
+    for table in TABLES:
+        c.execute(f"INSERT INTO changelog (tbl, key, op, at) SELECT '{table}', {_key(table, table, catalogued)}, "
+                  f"'U', {_NOW_MS} FROM {table} ORDER BY id")
+    create_triggers(c, catalogued)
+
+
+def create_triggers(c, catalogued=True):
+    for name, (event, body) in triggers(catalogued).items():
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+
+
+def log_catalog_rekeys(c):
+    """Log workouts whose key changes once exercise names come from the catalog (schema v7, where
+    names differing only in case merge) as a delete of the old key and a write of the new one.
+    """
+    old, new = _key("workouts", "workouts", False), _key("workouts", "workouts", True)
+    c.execute(f"CREATE TEMP TABLE rekeyed AS SELECT old, new FROM (SELECT {old} AS old, {new} AS new FROM workouts) "
+              f"WHERE old IS NOT new")
+    c.execute(f"INSERT INTO changelog (tbl, key, op, at) SELECT 'workouts', old, 'D', {_NOW_MS} FROM temp.rekeyed")
+    c.execute(f"INSERT INTO changelog (tbl, key, op, at) SELECT DISTINCT 'workouts', new, 'U', {_NOW_MS} "
+              f"FROM temp.rekeyed")
+    c.execute("DROP TABLE temp.rekeyed")
+
+
+def device_id(path=None):
+    return db.query_one("SELECT value FROM sync_state WHERE key = 'device'", path=path)[0]
+
+
+def cursor(path=None):
+    """Sequence number of the last change in this database."""
+    return db.query_one("SELECT COALESCE(MAX(seq), 0) FROM changelog", path=path)[0]
+
+
+def peers(path=None):
+    """[(device, received, acked)] for every database this one has synced with."""
+    return db.query("SELECT device, received, acked FROM sync_peers ORDER BY device", path=path)
+
+
+def conflicts(path=None):
+    return db.query("SELECT id, tbl, key, device, winner, local, remote, at FROM sync_conflicts ORDER BY id",
+                    path=path)
+
+
+def _workout_sets(c, profile, day_type, exercise):
+    row = c.execute('''SELECT w.sets FROM workouts w JOIN profiles p ON p.id = w.profile_id
+                       WHERE p.name = ? AND w.day_type IS ? AND w.exercise_id IS ?''',
+                    (profile, day_type, _exercise_id(c, exercise))).fetchone()
+    return None if row is None else [row[0]]
+
+
+def _exercise_id(c, name):
+    return None if name is None else catalog.lookup(c, name)
+
+
+def _record_id(c, key, own):
+    # Records are looked up in main and the archives (see archive.attach())
+    origin, origin_id = key
+    if origin is None or origin == own:
+        row = c.execute("SELECT id FROM all_records WHERE id = ? AND origin IS NULL", (origin_id,)).fetchone()
+    else:
+        row = c.execute("SELECT id FROM all_records WHERE origin = ? AND origin_id = ?", (origin, origin_id)
+                        ).fetchone()
+    return None if row is None else row[0]
+
+
+def _record_data(c, ids):
+    """{record id: [profile, day_type, exercise, date, ..., total_reps, [[set_no, reps, ...], ...]]}."""
+    out = {}
+    for i in range(0, len(ids), CHUNK):
+        chunk = ids[i:i + CHUNK]
+        marks = ",".join("?" * len(chunk))
+        # Records whose workout was deleted are invisible in the app and have nothing to sync against
+        for rid, *row in c.execute(f'''
+                SELECT r.id, p.name, w.day_type, e.name, {", ".join("r." + f for f in _RECORD_FIELDS.split(", "))}
+                FROM all_records r JOIN workouts w ON w.id = r.workout_id JOIN profiles p ON p.id = w.profile_id
+                LEFT JOIN exercises e ON e.id = w.exercise_id
+                WHERE r.id IN ({marks})''', chunk):
+            out[rid] = row + [[]]
+        for rid, *row in c.execute(f'''SELECT record_id, set_no, reps, weight, rpe, heart_rate, volume
+                                       FROM all_record_sets WHERE record_id IN ({marks}) ORDER BY record_id, set_no''',
+                                   chunk):
+            if rid in out:
+                out[rid][-1].append(row)
+    return out
+
+
+def _single(path):
+    # Each shard has a change log of its own, and main's doesn't cover the profiles moved out to them
+    if db.query_one("SELECT 1 FROM profiles WHERE shard IS NOT NULL", path=path) is not None:
+        raise ValueError("Sync needs a single-file database; merge the shards back first (shard-merge)")
+
+
+def export_changes(since=0, path=None, peer=None):
+    """A bundle (a dict) of every row changed after change `since`, at its current state.
+
+    Rows whose latest change came from `peer` are left out of a bundle meant for it: it has them.
+    """
+    _single(path)
+    c = db.get_connection(path)
+    archive.attach(path=path)
+    own = device_id(path)
+    latest = c.execute('''SELECT tbl, key, op, at, source, MAX(seq) AS seq FROM changelog
+                          WHERE seq > ? GROUP BY tbl, key''', (since,)).fetchall()
+    latest.sort(key=lambda row: (TABLES.index(row[0]), row[5]))
+    entries = []
+    record_ids = {}
+    for table, key, op, at, source, seq in latest:
+        if peer is not None and source == peer:
+            continue
+        key = json.loads(key)
+        data = None
+        if op == "U":
+            if table == "workouts":
+                data = _workout_sets(c, *key)
+            elif table == "records":
+                # Our own records are found by id; _record_data() skips ones that are gone
+                rid = key[1] if key[0] is None else _record_id(c, key, own)
+                if rid is not None:
+                    record_ids[len(entries)] = rid
+            else:
+                data = []
+            if data is None and table != "records":
+                continue  # renamed away since; a later change carries the new key
+        if table == "records" and key[0] is None:
+            key[0] = own
+        entries.append([table, key, op, at, source or own, seq, data])
+    found = _record_data(c, list(record_ids.values()))
+    for index, rid in record_ids.items():
+        entries[index][6] = found.get(rid)
+    entries = [e for e in entries if e[2] == "D" or e[6] is not None]
+    return {
+        "format": FORMAT,
+        "device": own,
+        "since": since,
+        "cursor": latest and max(row[5] for row in latest) or since,
+        "acks": {device: received for device, received, _ in peers(path)},
+        "entries": entries,
+    }
+
+
+def encode(bundle):
+    return MAGIC + bytes([FORMAT]) + zlib.compress(json.dumps(bundle, separators=(",", ":")).encode(), 6)
+
+
+def decode(data):
+    if data[:len(MAGIC) + 1] != MAGIC + bytes([FORMAT]):
+        raise ValueError("Not a workout sync bundle, or one of a newer format")
+    return json.loads(zlib.decompress(data[len(MAGIC) + 1:]))
+
+
+def write_bundle(fname, since=0, path=None, peer=None):
+    bundle = export_changes(since, path, peer)
+    with open(fname, "wb") as f:
+        f.write(encode(bundle))
+    return bundle
+
+
+def read_bundle(fname):
+    with open(fname, "rb") as f:
+        return decode(f.read())
+
+
+def _ensure_profile(c, name):
+    c.execute("INSERT OR IGNORE INTO profiles (name) VALUES (?)", (name,))
+    return c.execute("SELECT id FROM profiles WHERE name = ?", (name,)).fetchone()[0]
+
+
+def _ensure_workout(c, profile, day_type, exercise, sets, cache=None):
+    if cache is not None:
+        wid = cache.get((profile, day_type, exercise))
+        if wid is None:
+            wid = cache[profile, day_type, exercise] = _ensure_workout(c, profile, day_type, exercise, sets)
+        return wid
+    return store.ensure_workout(c, _ensure_profile(c, profile), day_type, exercise, sets)
+
+
+def _apply(c, table, key, op, data, own, workouts):
+    """Bring one row to the state in a bundle entry. Writes nothing when it is already there.
+
+    `workouts` caches workout ids for records; bundles apply records last, so they stay valid.
+    """
+    if table == "profiles":
+        if op == "U":
+            _ensure_profile(c, key[0])
+        else:
+            c.execute("DELETE FROM profiles WHERE name = ?", key)
+    elif table == "workouts":
+        if op == "U":
+            wid = _ensure_workout(c, *key, data[0])
+            c.execute("UPDATE workouts SET sets = ? WHERE id = ? AND sets IS NOT ?", (data[0], wid, data[0]))
+        else:
+            ids = [wid for (wid,) in c.execute(
+                "SELECT id FROM workouts WHERE profile_id = (SELECT id FROM profiles WHERE name = ?) "
+                "AND day_type IS ? AND exercise_id IS ?", key[:2] + [_exercise_id(c, key[2])])]
+            if ids:
+                archive.forget_workouts(c, ids)
+                c.execute(f"DELETE FROM workouts WHERE id IN ({','.join('?' * len(ids))})", ids)
+    else:
+        rid = _record_id(c, key, own)
+        if rid is not None:
+            # Changing an archived record brings it back to main first
+            archive.restore(c, [rid])
+        if op == "D":
+            if rid is not None:
+                c.execute("DELETE FROM records WHERE id = ?", (rid,))
+            return
+        profile, day_type, exercise, *fields, sets = data
+        wid = _ensure_workout(c, profile, day_type, exercise, fields[7], workouts)
+        if rid is not None:
+            current = _record_data(c, [rid]).get(rid)
+            if current is not None and current[:3] == data[:3] and current[3:-1] == fields \
+                    and [list(s) for s in current[-1]] == sets:
+                return
+        # Session ids are local; records of a profile logged at the same time share one
+        session = store.logged_session(c, wid, fields[0]) or store.new_session(c)
+        if rid is not None:
+            c.execute(f"UPDATE records SET workout_id = ?, session_id = ?, "
+                      f"{' = ?, '.join(_RECORD_FIELDS.split(', '))} = ? WHERE id = ?", [wid, session] + fields + [rid])
+            c.execute("DELETE FROM record_sets WHERE record_id = ?", (rid,))
+        elif key[0] == own:
+            # One of ours that was deleted here; it comes back under its old id
+            rid = c.execute(f"INSERT INTO records (id, workout_id, session_id, {_RECORD_FIELDS}) "
+                            f"VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", [key[1], wid, session] + fields).lastrowid
+        else:
+            rid = c.execute(f"INSERT INTO records (workout_id, session_id, {_RECORD_FIELDS}, origin, origin_id) "
+                            f"VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", [wid, session] + fields + key).lastrowid
+        c.executemany("INSERT INTO record_sets (record_id, set_no, reps, weight, rpe, heart_rate, volume) "
+                      "VALUES (?,?,?,?,?,?,?)", [[rid] + s for s in sets])
+
+
+def _local_state(c, table, key, own):
+    if table == "profiles":
+        return [] if c.execute("SELECT 1 FROM profiles WHERE name = ?", key).fetchone() else None
+    if table == "workouts":
+        return _workout_sets(c, *key)
+    rid = _record_id(c, key, own)
+    return None if rid is None else _record_data(c, [rid]).get(rid)
+
+
+def apply_changes(bundle, path=None):
+    """Apply a bundle from another database. Returns {"applied", "skipped", "conflicts"} counts.
+
+    Re-applying a bundle, or an older one from the same device, changes nothing. A bundle that
+    starts after changes from its device that haven't been applied here raises ValueError.
+    """
+    from . import columns
+
+    if bundle.get("format") != FORMAT:
+        raise ValueError("Unsupported sync bundle format")
+    _single(path)
+    own = device_id(path)
+    peer = bundle["device"]
+    if peer == own:
+        raise ValueError("This bundle was exported from this database")
+    row = db.query_one("SELECT received, acked FROM sync_peers WHERE device = ?", (peer,), path)
+    received, acked = row or (0, 0)
+    if bundle["since"] > received:
+        raise ValueError(f"Bundle starts after change {bundle['since']} of {peer}, but only changes up to "
+                         f"{received} have been applied here; export it again with --since {received}")
+    acked = max(acked, bundle["acks"].get(own, 0))
+    stats = {"applied": 0, "skipped": 0, "conflicts": 0}
+    workouts = {}
+    # Every archive, as records found there may be restored or deleted
+    archive.attach(path=path)
+    with db.transaction(path) as c:
+        top = c.execute("SELECT COALESCE(MAX(seq), 0) FROM changelog").fetchone()[0]
+        for table, key, op, at, source, seq, data in bundle["entries"]:
+            if seq <= received:
+                continue
+            # Our own records are logged here with a NULL origin
+            local_key = [None, key[1]] if table == "records" and key[0] == own else key
+            text_key = c.execute(_KEY_SQL[table], local_key).fetchone()[0]
+            local = c.execute("SELECT seq, op, at, COALESCE(source, ?) FROM changelog WHERE tbl = ? AND key = ? "
+                              "ORDER BY seq DESC LIMIT 1", (own, table, text_key)).fetchone()
+            if local is not None:
+                local_seq, local_op, local_at, local_source = local
+                newer = (at, source) > (local_at, local_source)
+                if local_source not in (peer, source) and local_seq > acked:
+                    # Changed here too, and the peer hadn't seen it when it made its change
+                    stats["conflicts"] += 1
+                    c.execute("INSERT INTO sync_conflicts (tbl, key, device, winner, local, remote, at) "
+                              f"VALUES (?,?,?,?,?,?,{_NOW_MS})",
+                              (table, text_key, peer, "remote" if newer else "local",
+                               json.dumps([local_op, local_at, _local_state(c, table, key, own)]),
+                               json.dumps([op, at, data])))
+                    if not newer:
+                        stats["skipped"] += 1
+                        continue
+                elif local_source == source and not newer:
+                    stats["skipped"] += 1  # already have this change or a later one from its device
+                    continue
+            _apply(c, table, key, op, data, own, workouts)
+            stats["applied"] += 1
+            # The triggers logged that write as ours; it is the peer's change, made when the peer made it
+            c.execute("UPDATE changelog SET at = ?, source = ? WHERE seq > ?",
+                      (at, None if source == own else source, top))
+            top = c.execute("SELECT COALESCE(MAX(seq), 0) FROM changelog").fetchone()[0]
+        c.execute('''INSERT INTO sync_peers (device, received, acked) VALUES (?, ?, ?)
+                     ON CONFLICT (device) DO UPDATE SET received = MAX(received, excluded.received),
+                                                        acked = MAX(acked, excluded.acked)''',
+                  (peer, bundle["cursor"], acked))
+    if stats["applied"]:
+        # Updated and deleted records can't be picked up by appending to the cached columns
+        columns.invalidate()
+    return stats
+
+
+def sync(path_a, path_b):
+    """Two-way sync between two database files. Returns the apply stats for (a -> b, b -> a)."""
+    a, b = device_id(path_a), device_id(path_b)
+
+    def received(path, device):
+        row = db.query_one("SELECT received FROM sync_peers WHERE device = ?", (device,), path)
+        return row[0] if row else 0
+
+    a_to_b = apply_changes(export_changes(received(path_b, a), path_a, b), path_b)
+    b_to_a = apply_changes(export_changes(received(path_a, b), path_b, a), path_a)
+    return a_to_b, b_to_a
+
+
+def export_for(peer, path=None):
+    """`since` for a bundle to `peer`: our last change it has confirmed applying (0 if it never has)."""
+    row = db.query_one("SELECT acked FROM sync_peers WHERE device = ?", (peer,), path)
+    return row[0] if row else 0
@@ -0,0 +1,168 @@
+import sqlite3
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QMessageBox, QProgressDialog, QWidget
+
+from . import db, instrument
+
+# How many SQLite VM steps run between cancellation checks
+CANCEL_CHECK_STEPS = 10000
+
+
+class Cancelled(Exception):
+    pass
+
+
+class JobSignals(QObject):
+    progress = pyqtSignal(object, int, int)  # job, done, total
+    finished = pyqtSignal(object, object)  # job, result
+    failed = pyqtSignal(object, object)  # job, exception
+    done = pyqtSignal(object)  # job; always last, also after cancellation
+
+
+class Job(QRunnable):
+    """Runs fn(*args, **kwargs) on a pool thread, using that thread's own database connection.
+
+    With with_progress=True, fn also receives progress=callable(done, total); calling it after
+    cancel() raises Cancelled. SQL running at the time of cancel() is interrupted, on any connection.
+    """
+
+    def __init__(self, fn, *args, with_progress=False, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.with_progress = with_progress
+        self.cancelled = False
+        self.name = getattr(fn, "__name__", "job")
+        self.signals = JobSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, done, total):
+        if self.cancelled:
+            raise Cancelled()
+        self.signals.progress.emit(self, done, total)
+
+    def run(self):
+        try:
+            kwargs = dict(self.kwargs, progress=self.report) if self.with_progress else self.kwargs
+            # On every connection the job uses, shards' included (see db.progress)
+            with db.progress(lambda: self.cancelled, CANCEL_CHECK_STEPS), instrument.timed(f"job.{self.name}"):
+                result = self.fn(*self.args, **kwargs)
+            if not self.cancelled:
+                self.signals.finished.emit(self, result)
+        except Cancelled:
+            pass
+        except Exception as e:
+            # An interrupted query surfaces as OperationalError; that's a cancellation, not a failure
+            if not (self.cancelled and isinstance(e, sqlite3.OperationalError)):
+                self.signals.failed.emit(self, e)
+        finally:
+            self.signals.done.emit(self)
+
+
+class JobRunner(QObject):
+    """Submits jobs to the shared thread pool and delivers their results on the GUI thread.
+
+    Jobs are keyed; submitting a new job under a key cancels the one it supersedes, and results of
+    superseded jobs are dropped. Errors without an on_error handler are shown over the parent widget.
+    """
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.jobs = {}
+        self.callbacks = {}
+        # Every submitted job until it has returned, so cancelled ones aren't collected mid-run
+        self.running = set()
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None, on_progress=None, **kwargs):
+        self.cancel(key)
+        job = Job(fn, *args, with_progress=on_progress is not None, **kwargs)
+        job.name = key
+        job.setAutoDelete(False)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        job.signals.progress.connect(self._on_progress)
+        job.signals.done.connect(self._on_done)
+        self.running.add(job)
+        self.jobs[key] = job
+        self.callbacks[job] = (key, on_result, on_error, on_progress)
+        self.pool.start(job)
+        return job
+
+    def cancel(self, key):
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            job.cancel()
+            self.callbacks.pop(job, None)
+
+    def cancel_all(self):
+        for key in list(self.jobs):
+            self.cancel(key)
+
+    def _take(self, job):
+        key, on_result, on_error, _ = self.callbacks.pop(job, (None, None, None, None))
+        if key is not None and self.jobs.get(key) is job:
+            del self.jobs[key]
+        return on_result, on_error
+
+    @pyqtSlot(object, object)
+    def _on_finished(self, job, result):
+        on_result, _ = self._take(job)
+        if on_result is not None:
+            with instrument.timed(f"ui.result.{job.name}") as span:
+                on_result(result)
+                # Row count for query results (sequences of row tuples), not for e.g. an (x, y) series
+                if isinstance(result, (list, tuple)) and (not result or isinstance(result[0], tuple)):
+                    span.rows = len(result)
+
+    @pyqtSlot(object, object)
+    def _on_failed(self, job, error):
+        _, on_error = self._take(job)
+        if on_error is not None:
+            on_error(error)
+        elif isinstance(self.parent(), QWidget):
+            QMessageBox.warning(self.parent(), "Error", str(error))
+
+    @pyqtSlot(object)
+    def _on_done(self, job):
+        self.running.discard(job)
+
+    @pyqtSlot(object, int, int)
+    def _on_progress(self, job, done, total):
+        if job in self.callbacks:
+            on_progress = self.callbacks[job][3]
+            if on_progress is not None:
+                on_progress(done, total)
+
+
+def run_with_progress(runner, parent, key, label, fn, *args, on_result=None, on_error=None, **kwargs):
+    """Submit a job whose progress is shown in a dialog; its Cancel button cancels the job."""
+    dialog = QProgressDialog(label, "Cancel", 0, 0, parent)
+    dialog.setMinimumDuration(500)
+    dialog.canceled.connect(lambda: runner.cancel(key))
+
+    def update(done, total):
+        dialog.setMaximum(total)
+        dialog.setValue(done)
+
+    def finish(callback):
+        def handler(value):
+            # hide() rather than close(): closing a QProgressDialog emits canceled
+            dialog.hide()
+            dialog.deleteLater()
+            if callback is not None:
+                callback(value)
+        return handler
+
+    return runner.submit(key, fn, *args, on_result=finish(on_result), on_error=finish(on_error),
+                         on_progress=update, **kwargs)
+
+
+def shutdown():
+    # Let running jobs finish before their connections are closed
+    QThreadPool.globalInstance().waitForDone()
+    db.close_all()